@@ -0,0 +1,77 @@
+"""
+Benchmark of HTML parser backends over saved category pages.
+
+Run from the app directory:
+    $ python3 -m benchmarks.parsers [REPEAT]
+"""
+
+# Python
+import sys
+import time
+from typing import Callable
+
+# App
+from pages import FalabellaPage, SodimacPage
+from parsing import PARSER_BACKENDS
+
+SAVED_PAGES_PATH = './tests/mocks/html/'
+
+
+def measure(function: Callable, repeat: int) -> float:
+    """Get the average milliseconds a function takes to run.
+
+    Parameters
+    ----------
+    function : Callable
+        Function to run.
+
+    repeat : int
+        Times to run the function.
+
+    Return
+    ------
+    float : Average milliseconds per run.
+    """
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - begin) * 1000 / repeat
+
+
+def main(repeat: int) -> None:
+    """Print per page parse and extraction time of every backend.
+
+    Parameters
+    ----------
+    repeat : int
+        Times to parse every page.
+    """
+    for page in (FalabellaPage(), SodimacPage()):
+        filename = f'{SAVED_PAGES_PATH}{page.get_page_name().lower()}-category.html'
+        with open(filename) as file:
+            html = file.read()
+        plan = page.get_product_extraction_plan()
+        print(f'{page.get_page_name()} ({len(html) / 1024:.0f} KB, {repeat} runs)')
+        for name, backend in PARSER_BACKENDS.items():
+            for parse_only in (None, page.PRODUCTS_LOOKUP):
+                try:
+                    parse_ms = measure(lambda: backend.parse(html, parse_only), repeat)
+                except ImportError:
+                    print(f' * {name:<12} not installed')
+                    break
+
+                def parse_and_extract() -> None:
+                    page.soup = backend.parse(html, parse_only)
+                    for product in page.get_products_in_page():
+                        plan.extract(product)
+
+                total_ms = measure(parse_and_extract, repeat)
+                scope = 'products' if parse_only else 'full page'
+                print(
+                    f' * {name:<12} {scope:<9} parse {parse_ms:8.2f} ms/page, '
+                    f'parse + extract {total_ms:8.2f} ms/page'
+                )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -4,22 +4,26 @@ Handle scripts with execution command lines.
 
 # Python
 from enum import Enum
-from multiprocessing import Process
 import sys
-from typing import List
+from typing import Dict, List, Optional
 
 # App
-from pages import FalabellaPage, SodimacPage
+from pages import PAGES
 from utils.decorators import timer
 from utils.exceptions import CommandExecutionException
+from utils.scheduler import Scheduler
 
 
 class SubCommand:
     """Handle subcommands logic.
     """
 
-    USAGE = " * Usage: manage.py --pages='$PAGE_1 $PAGE_2 $PAGE_N' --tasks='$TASK_1 $TASK_2 $TASK_N'"
+    USAGE = (
+        " * Usage: manage.py --pages='$PAGE_1 $PAGE_2 $PAGE_N' --tasks='$TASK_1 $TASK_2 $TASK_N'"
+        " [--refresh]"
+    )
     HELP_COMMAND = '-help'
+    REFRESH_OPTION = 'refresh'
 
     class Pages(Enum):
         """Enum with pages options to execute tasks from.
@@ -32,6 +36,20 @@ class SubCommand:
         """
         COLLECTCATEGORIES = 'collectcategories'
         COLLECTPRODUCTS = 'collectproducts'
+        IMPORTHISTORY = 'importhistory'
+        COMPACTHISTORY = 'compacthistory'
+        DIFFPRODUCTS = 'diffproducts'
+        REBUILDROLLUPS = 'rebuildrollups'
+
+    # Page method that runs every task
+    TASKS_METHODS = {
+        Tasks.COLLECTCATEGORIES.value: 'store_categories',
+        Tasks.COLLECTPRODUCTS.value: 'store_products',
+        Tasks.IMPORTHISTORY.value: 'import_csv_history',
+        Tasks.COMPACTHISTORY.value: 'compact_history',
+        Tasks.DIFFPRODUCTS.value: 'store_products_diff',
+        Tasks.REBUILDROLLUPS.value: 'rebuild_rollups',
+    }
 
     @staticmethod
     def tasks_to_page_methods(tasks: List[str]) -> List[str]:
@@ -48,29 +66,23 @@ class SubCommand:
         List[str] : Collection of method expressions.
         """
 
-        return [
-            'store_products' if task.lower() == SubCommand.Tasks.COLLECTPRODUCTS.value
-            else
-            'store_categories' if task.lower() == SubCommand.Tasks.COLLECTCATEGORIES.value
-            else None
-            for task in tasks
-        ]
+        return [SubCommand.TASKS_METHODS.get(task.lower()) for task in tasks]
 
     @staticmethod
-    def pages_to_page_objects(pages: List[str]) -> List[str]:
+    def pages_to_page_names(pages: List[str]) -> List[str]:
         """Convert pages passed as subcommand into the corresponding
-        page object name.
+        name in the pages registry.
 
         Parameters
         ----------
         pages : List[str]
-            Pages to convert to the corresponding page class expression.
+            Pages to convert to the corresponding registry name.
 
         Return
         ------
-        List[str] : Collection of page class expressions.
+        List[str] : Collection of page names.
         """
-        return [page.title() + 'Page' for page in pages]
+        return [page.lower() for page in pages]
 
     def __init__(self, argv: List[str]) -> None:
         """Constructor.
@@ -85,6 +97,7 @@ class SubCommand:
             return
         self.pages = None
         self.tasks = None
+        self.force_refresh = False
         arguments = self.validate_arguments(argv)
         self.set_pages_and_tasks(arguments)
         if self.pages is None or self.tasks is None:
@@ -104,12 +117,9 @@ class SubCommand:
         ------
         str : Concatenated argv values.
         """
-        try:
-            first_arg = argv[1]
-            second_arg = argv[2]
-        except IndexError:
+        if len(argv) < 3:
             self.throw_common_exception()
-        return first_arg + second_arg
+        return ''.join(argv[1:])
 
     def validate_data(self) -> None:
         """Validate that pages and tasks sent as subcommands are valid.
@@ -150,6 +160,8 @@ class SubCommand:
                 self.pages = val.replace('pages=', '').strip().split(' ')
             if val.startswith('tasks='):
                 self.tasks = val.replace('tasks=', '').strip().split(' ')
+            if val.strip() == self.REFRESH_OPTION:
+                self.force_refresh = True
 
     @classmethod
     def check_if_called_help(cls, argv: List[str]) -> bool:
@@ -169,7 +181,8 @@ class SubCommand:
                 print(
                     f'{cls.USAGE}\n'
                     f'--pages options: {cls.get_pages_pretty()}\n'
-                    f'--tasks options: {cls.get_tasks_pretty()}'
+                    f'--tasks options: {cls.get_tasks_pretty()}\n'
+                    f'--{cls.REFRESH_OPTION}: discover categories even if the latest ones are fresh'
                 )
                 return True
         except IndexError:
@@ -186,29 +199,28 @@ class SubCommand:
 
 
 @timer
-def run(pages: List[str], methods: List[str]) -> None:
-    """Execute pages with their own tasks in the order sent by user.
+def run(pages: List[str], methods: List[str],
+        options: Optional[Dict[str, Dict]] = None) -> None:
+    """Execute pages with their own tasks in the order sent by user. Every
+    page runs its tasks in a worker of its own, without waiting for the
+    tasks of other pages.
 
     Parameters
     ----------
     pages : List[str]
-        Expressions of page classes to execute tasks from.
+        Names of the pages in the pages registry to execute tasks from.
 
     methods : List[str]
-        Expressions of page methods to run.
+        Names of the page methods to run.
+
+    options : Dict[str, Dict]
+        Keyword arguments of the page methods that take any.
     """
-    for method in methods:
-        if method:
-            this_iteration = []
-            for page in pages:
-                this_iteration.append(f'{page}().{method}')  # E.G. FalabellaPage().store_products
-            processes = []
-            for process in this_iteration:  # Gather the results in a List[Process]
-                processes.append(Process(target=eval(process)))
-            for process in processes:
-                process.start()
-            for process in processes:
-                process.join()
+    options = {} if options is None else options
+    tasks = [(method, options.get(method, {})) for method in methods if method]
+    scheduler = Scheduler(PAGES)
+    scheduler.run(pages, tasks)
+    scheduler.print()
 
 
 def main() -> None:
@@ -218,9 +230,12 @@ def main() -> None:
     sub_command = SubCommand(sys.argv)
     if sub_command.called_help:
         return
-    pages = SubCommand.pages_to_page_objects(sub_command.pages)
+    pages = SubCommand.pages_to_page_names(sub_command.pages)
     methods = SubCommand.tasks_to_page_methods(sub_command.tasks)
-    run(pages, methods)
+    options = {}
+    if sub_command.force_refresh:
+        options['store_categories'] = {'force_refresh': True}
+    run(pages, methods, options)
 
 
 if __name__ == '__main__':
@@ -1,3 +1,6 @@
+# Python
+from typing import List
+
 
 class PageProduct:
     """
@@ -17,3 +20,25 @@ class PageProduct:
         self.product_url = product_url.strip()
         self.product_name = product_name.strip()
         self.product_price = product_price
+
+    @classmethod
+    def from_csv_row(cls, row: List[str]) -> 'PageProduct':
+        """Create a product from the values of a products CSV row.
+
+        Parameters
+        ----------
+        row : List[str]
+            Values of the row.
+
+        Return
+        ------
+        PageProduct : Product of the row.
+        """
+        return cls(
+            page_name=row[0],
+            category_id=row[1],
+            product_id=row[2],
+            product_url=row[3],
+            product_name=row[4],
+            product_price=row[5],
+        )
@@ -0,0 +1,7 @@
+from .browser import BrowserPool, BrowserStats, get_browser_pool
+from .engine import AsyncFetchEngine
+from .session import ConnectionStats, PageSession
+from .cache import CachedResponse, HTTPCache
+from .latency import HedgeBudget, HostLatencies, LatencyTracker
+from .ratelimit import HostLimiter, RateLimiter, TokenBucket, get_outcome
+from .retry import CircuitBreaker, CircuitBreakers, RetryPolicy
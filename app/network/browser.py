@@ -0,0 +1,231 @@
+"""
+Pooled headless browsers.
+
+Starting Chrome is by far the slowest step of collecting categories, so
+browsers are started once per process, kept in a pool shared by every page
+and task, and quit when the process exits. Images, fonts and analytics
+requests are blocked, since they are never needed to find categories.
+"""
+
+# Python
+import atexit
+from contextlib import contextmanager
+import threading
+import time
+from typing import Callable, Generator, List, Optional
+
+# Selenium
+from selenium.webdriver import Chrome, ChromeOptions
+from selenium.webdriver.remote.webdriver import WebDriver
+
+# App
+from settings import (
+    BROWSER_BLOCKED_URLS,
+    BROWSER_POOL_SIZE,
+    BROWSER_WINDOW_SIZE,
+    SELENIUM_DRIVER_PATH,
+    SELENIUM_HEADLESS
+)
+
+
+def create_chrome_driver(headless: bool = SELENIUM_HEADLESS,
+                         blocked_urls: Optional[List[str]] = None) -> WebDriver:
+    """Start a Chrome browser that doesn't load images, fonts or analytics.
+
+    Parameters
+    ----------
+    headless : bool
+        Whether to start the browser without a window.
+
+    blocked_urls : List[str]
+        URL patterns never requested, BROWSER_BLOCKED_URLS by default.
+
+    Return
+    ------
+    WebDriver : Started browser.
+    """
+    options = ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+    options.add_argument(f'--window-size={BROWSER_WINDOW_SIZE}')
+    options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+    })
+    driver = Chrome(executable_path=SELENIUM_DRIVER_PATH, options=options)
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {
+        'urls': BROWSER_BLOCKED_URLS if blocked_urls is None else blocked_urls
+    })
+    return driver
+
+
+class BrowserStats:
+    """Thread safe counters and timings of browser startups and navigations.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.startups = 0
+        self.startup_seconds = 0.0
+        self.navigations = 0
+        self.navigation_seconds = 0.0
+        self.reuses = 0
+
+    def add_startup(self, seconds: float) -> None:
+        with self.lock:
+            self.startups += 1
+            self.startup_seconds += seconds
+
+    def add_navigation(self, seconds: float) -> None:
+        with self.lock:
+            self.navigations += 1
+            self.navigation_seconds += seconds
+
+    def add_reuse(self) -> None:
+        with self.lock:
+            self.reuses += 1
+
+    def __str__(self) -> str:
+        return (
+            f'{self.startups} browser startups in {self.startup_seconds:.2f}s, '
+            f'{self.reuses} reused, {self.navigations} navigations in '
+            f'{self.navigation_seconds:.2f}s'
+        )
+
+
+class BrowserPool:
+    """Pool of started browsers, lent to one user at a time.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE,
+                 create_driver: Callable[[], WebDriver] = create_chrome_driver) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        size : int
+            Maximum browsers started at once.
+
+        create_driver : Callable[[], WebDriver]
+            Function that starts a browser.
+        """
+        self.size = size
+        self.create_driver = create_driver
+        self.stats = BrowserStats()
+        self.condition = threading.Condition()
+        self.idle: List[WebDriver] = []
+        self.started: List[WebDriver] = []
+        self.closed = False
+
+    def acquire(self) -> WebDriver:
+        """Take an idle browser, start one if the pool isn't full or wait
+        until one is released.
+
+        Return
+        ------
+        WebDriver : Browser to use until it's released.
+        """
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError('Browser pool is closed')
+                if self.idle:
+                    self.stats.add_reuse()
+                    return self.idle.pop()
+                if len(self.started) < self.size:
+                    self.started.append(None)  # Reserve the slot while starting
+                    break
+                self.condition.wait()
+        try:
+            start = time.perf_counter()
+            driver = self.create_driver()
+            self.stats.add_startup(time.perf_counter() - start)
+        except Exception:
+            with self.condition:
+                self.started.remove(None)
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.started[self.started.index(None)] = driver
+        return driver
+
+    def release(self, driver: WebDriver, discard: bool = False) -> None:
+        """Give a browser back to the pool.
+
+        Parameters
+        ----------
+        driver : WebDriver
+            Browser taken with acquire.
+
+        discard : bool
+            Whether to quit the browser instead, E.G. after it crashed.
+        """
+        with self.condition:
+            if discard or self.closed:
+                self.started.remove(driver)
+                self.quit(driver)
+            else:
+                self.idle.append(driver)
+            self.condition.notify()
+
+    @contextmanager
+    def browser(self) -> Generator:
+        """Borrow a browser, discarding it if it fails while in use.
+
+        Return
+        ------
+        Generator : yield the browser.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        self.release(driver)
+
+    def navigate(self, driver: WebDriver, url: str) -> None:
+        """Load a url, timing how long it takes.
+        """
+        start = time.perf_counter()
+        driver.get(url)
+        self.stats.add_navigation(time.perf_counter() - start)
+
+    @staticmethod
+    def quit(driver: WebDriver) -> None:
+        try:
+            driver.quit()
+        except Exception:  # Already dead, nothing left to tear down
+            pass
+
+    def close(self) -> None:
+        """Quit every idle browser, and the ones in use once released.
+        """
+        with self.condition:
+            self.closed = True
+            for driver in self.idle:
+                self.started.remove(driver)
+                self.quit(driver)
+            self.idle = []
+            self.condition.notify_all()
+
+
+# Browsers shared by every page of the process
+_browser_pool: Optional[BrowserPool] = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Get the process browser pool, quit when the process exits.
+
+    Return
+    ------
+    BrowserPool : Shared browser pool.
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None or _browser_pool.closed:
+            _browser_pool = BrowserPool()
+            atexit.register(_browser_pool.close)
+        return _browser_pool
@@ -0,0 +1,187 @@
+"""
+Persistent HTTP cache with conditional requests.
+"""
+
+# Python
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+# Requests
+from requests import Response
+
+
+class CachedResponse:
+    """Body and validators of a cached response.
+    """
+
+    def __init__(self, url: str, body: str, etag: Optional[str],
+                 last_modified: Optional[str]) -> None:
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def get_conditional_headers(self) -> Dict[str, str]:
+        """Headers to ask the server for the body only if it changed.
+
+        Return
+        ------
+        Dict[str, str] : Conditional request headers.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """Cache of response bodies and their validators stored in a directory,
+    evicting the least recently used entries above a maximum size.
+
+    Every entry is stored in two files named after the url hash: the body and
+    its metadata in JSON.
+    """
+
+    BODY_EXTENSION = '.body'
+    METADATA_EXTENSION = '.json'
+
+    def __init__(self, path: str, max_size: int) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        path : str
+            Directory where entries are stored.
+
+        max_size : int
+            Maximum bytes of bodies to keep.
+        """
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.sizes = None  # Body size of every entry key, loaded lazily
+
+    @staticmethod
+    def get_key(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def get_file(self, key: str, extension: str) -> str:
+        return os.path.join(self.path, key + extension)
+
+    def load_sizes(self) -> Dict[str, int]:
+        """Find the entries already stored in the cache directory.
+
+        Return
+        ------
+        Dict[str, int] : Body size of every entry key.
+        """
+        if self.sizes is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.sizes = {}
+            for filename in os.listdir(self.path):
+                if filename.endswith(self.BODY_EXTENSION):
+                    key = filename[:-len(self.BODY_EXTENSION)]
+                    self.sizes[key] = os.path.getsize(os.path.join(self.path, filename))
+        return self.sizes
+
+    @property
+    def size(self) -> int:
+        with self.lock:
+            return sum(self.load_sizes().values())
+
+    def write_file(self, filename: str, content: bytes) -> None:
+        """Write a file atomically, so readers never get partial content.
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.replace(temporary, filename)
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Get the cached response of an url.
+
+        Parameters
+        ----------
+        url : str
+            Url of the response.
+
+        Return
+        ------
+        CachedResponse : Cached response.
+        None : The url is not cached.
+        """
+        key = self.get_key(url)
+        with self.lock:
+            if key not in self.load_sizes():
+                return None
+            try:
+                with open(self.get_file(key, self.METADATA_EXTENSION)) as file:
+                    metadata = json.load(file)
+                with open(self.get_file(key, self.BODY_EXTENSION), 'rb') as file:
+                    body = file.read().decode()
+            except (OSError, ValueError):
+                self.remove(key)
+                return None
+            # Touch the body so that eviction keeps recently used entries
+            os.utime(self.get_file(key, self.BODY_EXTENSION))
+        return CachedResponse(url, body, metadata.get('etag'), metadata.get('last_modified'))
+
+    def store(self, url: str, response: Response) -> None:
+        """Cache a response if it can be revalidated later.
+
+        Parameters
+        ----------
+        url : str
+            Url of the response.
+
+        response : Response
+            Successful response to cache.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        key = self.get_key(url)
+        body = response.text.encode()
+        metadata = {'url': url, 'etag': etag, 'last_modified': last_modified}
+        with self.lock:
+            self.load_sizes()
+            self.write_file(
+                self.get_file(key, self.METADATA_EXTENSION), json.dumps(metadata).encode()
+            )
+            self.write_file(self.get_file(key, self.BODY_EXTENSION), body)
+            self.sizes[key] = len(body)
+            self.evict()
+
+    def remove(self, key: str) -> None:
+        """Delete an entry files. The lock must be held by the caller.
+        """
+        for extension in (self.BODY_EXTENSION, self.METADATA_EXTENSION):
+            try:
+                os.remove(self.get_file(key, extension))
+            except FileNotFoundError:
+                pass
+        self.sizes.pop(key, None)
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits its
+        maximum size. The lock must be held by the caller.
+        """
+        total = sum(self.sizes.values())
+        if total <= self.max_size:
+            return
+        by_last_use = sorted(
+            self.sizes,
+            key=lambda key: os.path.getmtime(self.get_file(key, self.BODY_EXTENSION))
+        )
+        for key in by_last_use:
+            if total <= self.max_size:
+                break
+            total -= self.sizes[key]
+            self.remove(key)
@@ -0,0 +1,312 @@
+"""
+Asyncio engine to keep several HTTP requests in flight at once.
+"""
+
+# Python
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generator, Iterable, List, Optional
+from urllib.parse import urlparse
+
+# App
+from .ratelimit import HostLimiter, RateLimiter
+
+
+class AsyncFetchEngine:
+    """Run blocking fetch calls concurrently from an asyncio event loop.
+
+    Every fetch is executed in a thread pool, so any blocking HTTP client can
+    be used, while the event loop limits how many of them are in flight at
+    the same time, both globally and against each single host. With a rate
+    limiter, the requests against each host are also limited to its current
+    adaptive rate and concurrency.
+    """
+
+    def __init__(self, fetch: Callable[[str], Any], max_concurrency: int,
+                 max_per_host: int, rate_limiter: Optional[RateLimiter] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        fetch : Callable[[str], Any]
+            Blocking function that receives an url and returns its result.
+
+        max_concurrency : int
+            Maximum amount of requests in flight at the same time.
+
+        max_per_host : int
+            Maximum amount of requests in flight against the same host.
+
+        rate_limiter : RateLimiter
+            Adaptive limits of every host, fed with the responses by the
+            fetch function.
+        """
+        self.fetch_function = fetch
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_host = max(1, max_per_host)
+        self.rate_limiter = rate_limiter
+        self.semaphore = None
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.host_conditions: Dict[str, asyncio.Condition] = {}
+        self.listeners: Dict[str, Callable[[], None]] = {}
+        self.loop = None
+        self.loop_thread = None
+        self.executor = None
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        """Get the host an url points to.
+
+        Parameters
+        ----------
+        url : str
+            Url to get the host from.
+
+        Return
+        ------
+        str : Host of the url.
+        """
+        return urlparse(url).netloc
+
+    def get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore limiting the requests against the url's host.
+
+        Parameters
+        ----------
+        url : str
+            Url about to be requested.
+
+        Return
+        ------
+        asyncio.Semaphore : Semaphore of the url's host.
+        """
+        host = self.get_host(url)
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self.host_semaphores[host]
+
+    async def fetch(self, url: str) -> Any:
+        """Fetch the url as soon as both the host and global limits allow it.
+
+        Parameters
+        ----------
+        url : str
+            Url to fetch.
+
+        Return
+        ------
+        Any : Result of the blocking fetch function.
+        """
+        async with self.get_host_semaphore(url):
+            if self.rate_limiter is not None:
+                return await self.fetch_limited(url)
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self.executor, self.fetch_function, url
+                )
+
+    async def notify_host(self, host: str) -> None:
+        condition = self.host_conditions[host]
+        async with condition:
+            condition.notify_all()
+
+    def get_host_condition(self, host: str, limiter: HostLimiter) -> asyncio.Condition:
+        """Get the condition requests against a host wait on for a free
+        slot, notified whenever any thread releases one.
+
+        Parameters
+        ----------
+        host : str
+            Host about to be requested.
+
+        limiter : HostLimiter
+            Limits of the host.
+
+        Return
+        ------
+        asyncio.Condition : Condition of the host.
+        """
+        if host not in self.host_conditions:
+            self.host_conditions[host] = asyncio.Condition()
+            loop = self.loop
+
+            def listener() -> None:
+                if threading.get_ident() == self.loop_thread:  # Notified by fetch_limited()
+                    return
+                try:
+                    loop.call_soon_threadsafe(
+                        lambda: asyncio.ensure_future(self.notify_host(host))
+                    )
+                except RuntimeError:  # The loop finished, nothing waits anymore
+                    pass
+
+            self.listeners[host] = listener
+            limiter.listeners.append(listener)
+        return self.host_conditions[host]
+
+    async def fetch_limited(self, url: str) -> Any:
+        """Fetch the url once its host is below its adaptive concurrency
+        and a token of its rate is available.
+
+        Parameters
+        ----------
+        url : str
+            Url to fetch.
+
+        Return
+        ------
+        Any : Result of the blocking fetch function.
+        """
+        host = self.get_host(url)
+        limiter = self.rate_limiter.get(host)
+        condition = self.get_host_condition(host, limiter)
+        async with condition:
+            await condition.wait_for(limiter.try_acquire)
+        try:
+            await asyncio.sleep(limiter.bucket.reserve())
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self.executor, self.fetch_function, url
+                )
+        finally:
+            async with condition:
+                limiter.release()
+                condition.notify_all()
+
+    def open(self) -> None:
+        """Create the semaphores and the thread pool for a new event loop.
+        """
+        # Semaphores must be created inside the running loop
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.host_semaphores = {}
+        self.host_conditions = {}
+        self.listeners = {}
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def close(self) -> None:
+        """Release the thread pool and stop listening to the host limiters.
+        """
+        for host, listener in self.listeners.items():
+            self.rate_limiter.get(host).listeners.remove(listener)
+        self.listeners = {}
+        self.executor.shutdown(wait=False)
+
+    def run(self, main: Callable[[], Awaitable]) -> Any:
+        """Run an event loop until the given coroutine function finishes.
+
+        Parameters
+        ----------
+        main : Callable[[], Awaitable]
+            Coroutine function that awaits fetch() calls of this engine.
+
+        Return
+        ------
+        Any : Result of the coroutine.
+        """
+        async def run_main() -> Any:
+            self.open()
+            try:
+                return await main()
+            finally:
+                self.close()
+
+        return asyncio.run(run_main())
+
+    def fetch_all(self, urls: List[str]) -> List[Any]:
+        """Run an event loop until all the urls are fetched.
+
+        Parameters
+        ----------
+        urls : List[str]
+            Urls to fetch.
+
+        Return
+        ------
+        List[Any] : Results in the same order as the given urls.
+        """
+        return self.run(
+            lambda: asyncio.gather(*[self.fetch(url) for url in urls])
+        )
+
+    def stream(self, items: Iterable[Any], job: Callable[[Any], Awaitable],
+               max_pending: int) -> Generator:
+        """Run a coroutine function for every item in a background event loop
+        and yield its results as soon as they are ready.
+
+        Results wait in a queue of max_pending slots, and no more than
+        max_pending jobs run at the same time, so a slow consumer stops the
+        loop from starting new jobs instead of piling results up in memory.
+
+        Parameters
+        ----------
+        items : Iterable[Any]
+            Items to run the job for.
+
+        job : Callable[[Any], Awaitable]
+            Coroutine function that awaits fetch() calls of this engine.
+
+        max_pending : int
+            Maximum jobs running or waiting to be consumed.
+
+        Return
+        ------
+        Generator : yield from job results in completion order.
+        """
+        max_pending = max(1, max_pending)
+        results = queue.Queue(maxsize=max_pending)
+        stop = threading.Event()
+        done = object()
+
+        def put(result: Any) -> None:
+            while not stop.is_set():
+                try:
+                    results.put(result, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        async def main() -> None:
+            loop = asyncio.get_running_loop()
+            pending = asyncio.Semaphore(max_pending)
+
+            async def run_job(item: Any) -> None:
+                try:
+                    result = await job(item)
+                    await loop.run_in_executor(None, put, (result, None))
+                finally:
+                    pending.release()
+
+            tasks = []
+            for item in items:
+                await pending.acquire()
+                if stop.is_set():
+                    break
+                tasks.append(asyncio.ensure_future(run_job(item)))
+            await asyncio.gather(*tasks)
+
+        def produce() -> None:
+            try:
+                self.run(main)
+                put((done, None))
+            except BaseException as e:
+                put((done, e))
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                result, error = results.get()
+                if error is not None:
+                    raise error
+                if result is done:
+                    break
+                yield result
+        finally:
+            stop.set()
+            producer.join()
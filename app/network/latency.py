@@ -0,0 +1,158 @@
+"""
+Per host latency percentiles.
+
+The latencies of the latest responses of every host give its timeouts: a
+few times its p99 latency, so typical requests don't wait the whole fixed
+timeout to fail, and hosts that are slow for a reason still get the time
+they need. Requests still pending after the p95 latency are hedged with a
+duplicate request, limited to a share of all the requests sent.
+"""
+
+# Python
+from collections import deque
+import math
+import threading
+from typing import Any, Dict, Optional
+
+# App
+from settings import (
+    ADAPTIVE_TIMEOUT_MAX,
+    ADAPTIVE_TIMEOUT_MIN,
+    ADAPTIVE_TIMEOUT_MULTIPLIER,
+    HEDGE_MAX_RATIO,
+    LATENCY_MIN_SAMPLES,
+    LATENCY_SAMPLE_SIZE
+)
+
+
+class LatencyTracker:
+    """Thread safe latencies of the latest responses of a host.
+    """
+
+    def __init__(self, size: int = LATENCY_SAMPLE_SIZE,
+                 min_samples: int = LATENCY_MIN_SAMPLES) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        size : int
+            Latest latencies kept.
+
+        min_samples : int
+            Latencies needed before percentiles are given.
+        """
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=max(1, size))
+        self.min_samples = max(1, min_samples)
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        """Get a percentile of the latest latencies, with the nearest rank
+        method.
+
+        Parameters
+        ----------
+        percentile : float
+            Percentile between 0 and 100, E.G. 95.
+
+        Return
+        ------
+        float : Latency in seconds.
+        None : Not enough latencies were recorded yet.
+        """
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            samples = sorted(self.samples)
+        return samples[max(0, math.ceil(len(samples) * percentile / 100) - 1)]
+
+    def get_timeout(self, default: float) -> float:
+        """Get the seconds to wait for a response of the host.
+
+        Parameters
+        ----------
+        default : float
+            Timeout until enough latencies are recorded.
+
+        Return
+        ------
+        float : p99 latency times ADAPTIVE_TIMEOUT_MULTIPLIER, between
+            ADAPTIVE_TIMEOUT_MIN and ADAPTIVE_TIMEOUT_MAX.
+        """
+        p99 = self.get_percentile(99)
+        if p99 is None:
+            return default
+        return min(ADAPTIVE_TIMEOUT_MAX, max(ADAPTIVE_TIMEOUT_MIN, p99 * ADAPTIVE_TIMEOUT_MULTIPLIER))
+
+    def to_dict(self, default_timeout: float) -> Dict[str, Any]:
+        with self.lock:
+            count = len(self.samples)
+        values = {'count': count}
+        for percentile in (50, 95, 99):
+            latency = self.get_percentile(percentile)
+            values[f'p{percentile}'] = None if latency is None else round(latency, 3)
+        values['timeout'] = round(self.get_timeout(default_timeout), 3)
+        return values
+
+
+class HostLatencies:
+    """Thread safe registry of the latency trackers of every requested host.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, LatencyTracker] = {}
+
+    def get(self, host: str) -> LatencyTracker:
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = LatencyTracker()
+            return self.hosts[host]
+
+    def to_dict(self, default_timeout: float) -> Dict[str, Any]:
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: tracker.to_dict(default_timeout) for host, tracker in hosts.items()}
+
+
+class HedgeBudget:
+    """Thread safe cap of the hedged requests, to a share of all the
+    requests sent.
+    """
+
+    def __init__(self, max_ratio: float = HEDGE_MAX_RATIO) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        max_ratio : float
+            Maximum hedged requests per request sent, E.G. 0.05 for 5% of
+            extra load at most.
+        """
+        self.lock = threading.Lock()
+        self.max_ratio = max_ratio
+        self.requests = 0
+        self.hedges = 0
+
+    def add_request(self) -> None:
+        with self.lock:
+            self.requests += 1
+
+    def try_hedge(self) -> bool:
+        """Take a hedged request from the budget.
+
+        Return
+        ------
+        bool : True if the hedged request can be sent.
+        """
+        with self.lock:
+            if self.hedges + 1 > self.requests * self.max_ratio:
+                return False
+            self.hedges += 1
+            return True
+
+    def __str__(self) -> str:
+        return f'{self.hedges} hedged requests of {self.requests}'
@@ -0,0 +1,265 @@
+"""
+Adaptive per host rate limits.
+
+Every host gets a token bucket limiting the requests sent per second, and a
+limit of requests in flight. Both grow additively while the host answers
+fast and without errors, and are cut in half as soon as it throttles (429 or
+503 responses) or times out, so a crawl runs as fast as the host tolerates.
+"""
+
+# Python
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# App
+from settings import (
+    COLLECTION_MAX_PER_HOST,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_DECREASE_FACTOR,
+    RATE_LIMIT_INITIAL_CONCURRENCY,
+    RATE_LIMIT_INITIAL_RATE,
+    RATE_LIMIT_LATENCY_TARGET,
+    RATE_LIMIT_MAX_ERROR_RATE,
+    RATE_LIMIT_MAX_RATE,
+    RATE_LIMIT_MIN_RATE,
+    RATE_LIMIT_RATE_STEP,
+    RATE_LIMIT_WINDOW
+)
+
+# Response outcomes
+OK = 'ok'
+ERROR = 'error'
+THROTTLED = 'throttled'
+TIMEOUT = 'timeout'
+
+# Status codes of a host asking to slow down
+THROTTLING_STATUSES = (429, 503)
+
+
+def get_outcome(status_code: Optional[int]) -> str:
+    """Classify a response status code, None for timeouts.
+    """
+    if status_code is None:
+        return TIMEOUT
+    if status_code in THROTTLING_STATUSES:
+        return THROTTLED
+    if status_code in (200, 304):
+        return OK
+    return ERROR
+
+
+class TokenBucket:
+    """Thread safe token bucket, refilled at a rate of tokens per second.
+    """
+
+    def __init__(self, rate: float, burst: int,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        rate : float
+            Tokens added per second.
+
+        burst : int
+            Maximum tokens kept, the requests sent at once after idling.
+
+        clock : Callable[[], float]
+            Monotonic clock in seconds.
+        """
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """Take a token, going into debt if there's none left.
+
+        Return
+        ------
+        float : Seconds to wait before using the token.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def try_take(self) -> bool:
+        """Take a token only if one is available now.
+
+        Return
+        ------
+        bool : True if a token was taken.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def set_rate(self, rate: float) -> None:
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = rate
+
+
+class HostLimiter:
+    """Rate and concurrency limits of a host, adjusted with AIMD after every
+    window of responses.
+
+    The requests in flight against the host are counted here, so requests
+    sent from any thread, like hedged duplicates, share the same limit.
+    """
+
+    def __init__(self, host: str, clock: Callable[[], float] = time.monotonic) -> None:
+        self.host = host
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.limit = min(RATE_LIMIT_INITIAL_CONCURRENCY, COLLECTION_MAX_PER_HOST)
+        self.bucket = TokenBucket(RATE_LIMIT_INITIAL_RATE, RATE_LIMIT_BURST, clock)
+        self.started = clock()
+        self.window_started = self.started
+        self.latencies: List[float] = []
+        self.outcomes: Dict[str, int] = {}
+        self.decreases = 0
+        self.history: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.listeners: List[Callable[[], None]] = []
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def try_acquire(self) -> bool:
+        """Take a slot of the concurrency limit if there's one free.
+
+        Return
+        ------
+        bool : True if the request can be sent.
+        """
+        with self.lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        """Free the slot of a finished request, and let the listeners know
+        so requests waiting for one are sent.
+        """
+        with self.lock:
+            self.in_flight -= 1
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener()
+
+    def record(self, seconds: float, outcome: str) -> None:
+        """Record a response, adjusting the limits when the host throttles
+        or a window of responses is complete.
+
+        Parameters
+        ----------
+        seconds : float
+            Latency of the response.
+
+        outcome : str
+            OK, ERROR, THROTTLED or TIMEOUT.
+        """
+        with self.lock:
+            self.latencies.append(seconds)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if outcome in (THROTTLED, TIMEOUT):
+                # Once per round trip, responses to requests sent before the
+                # latest cut don't cut again
+                if self.clock() - seconds >= self.window_started:
+                    self.adjust(increase=False)
+            elif len(self.latencies) >= RATE_LIMIT_WINDOW:
+                errors = self.outcomes.get(ERROR, 0) / len(self.latencies)
+                self.adjust(
+                    increase=errors <= RATE_LIMIT_MAX_ERROR_RATE
+                    and self.get_p95() <= RATE_LIMIT_LATENCY_TARGET
+                )
+
+    def get_p95(self) -> float:
+        latencies = sorted(self.latencies)
+        return latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)] if latencies else 0.0
+
+    def adjust(self, increase: bool) -> None:
+        """Grow the limits additively or cut them multiplicatively, and start
+        a new window.
+        """
+        now = self.clock()
+        self.history.append({
+            'seconds': round(now - self.started, 3),
+            'concurrency': self.limit,
+            'rate': round(self.rate, 3),
+            'effective_rate': round(len(self.latencies) / max(now - self.window_started, 1e-6), 3),
+            'p95': round(self.get_p95(), 3),
+            'outcomes': dict(self.outcomes),
+        })
+        if increase:
+            self.limit = min(COLLECTION_MAX_PER_HOST, self.limit + 1)
+            self.bucket.set_rate(min(RATE_LIMIT_MAX_RATE, self.rate + RATE_LIMIT_RATE_STEP))
+        else:
+            self.decreases += 1
+            self.limit = max(1, math.floor(self.limit * RATE_LIMIT_DECREASE_FACTOR))
+            self.bucket.set_rate(
+                max(RATE_LIMIT_MIN_RATE, self.rate * RATE_LIMIT_DECREASE_FACTOR)
+            )
+        self.window_started = now
+        self.latencies = []
+        self.outcomes = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'concurrency': self.limit,
+                'rate': round(self.rate, 3),
+                'decreases': self.decreases,
+                'history': list(self.history),
+            }
+
+
+class RateLimiter:
+    """Thread safe registry of the limiters of every requested host.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, HostLimiter] = {}
+
+    def get(self, host: str) -> HostLimiter:
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostLimiter(host, self.clock)
+            return self.hosts[host]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the current limits and their history of every host.
+
+        Return
+        ------
+        Dict[str, Any] : Limits of every host.
+        """
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: limiter.to_dict() for host, limiter in hosts.items()}
+
+    def __str__(self) -> str:
+        return ', '.join(
+            f'{host} {limits["concurrency"]} in flight at {limits["rate"]} req/s '
+            f'after {len(limits["history"])} adjustments ({limits["decreases"]} cuts)'
+            for host, limits in self.to_dict().items()
+        ) or 'no requests'
@@ -0,0 +1,193 @@
+"""
+Request retries and per host circuit breakers.
+
+Failed requests are sent again after an exponential backoff with full
+jitter, as long as they failed for a reason worth retrying. Every host has a
+circuit breaker that opens after several failures in a row, so requests
+against a host that is down fail at once until it's given a new try.
+"""
+
+# Python
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# App
+from settings import (
+    CIRCUIT_BREAKER_FAILURES,
+    CIRCUIT_BREAKER_RESET_TIMEOUT,
+    RETRY_BACKOFF,
+    RETRY_JITTER,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_BACKOFF,
+    RETRY_STATUSES
+)
+
+# Request outcomes, from best to worst
+OK = 'ok'
+RETRIED = 'retried'
+FAILED = 'failed'
+SHORT_CIRCUITED = 'short_circuited'
+OUTCOMES = (OK, RETRIED, FAILED, SHORT_CIRCUITED)
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def get_worst_outcome(outcomes: Iterable[str]) -> str:
+    """Get the worst of some request outcomes, OK if there's none.
+    """
+    return max(outcomes, key=OUTCOMES.index, default=OK)
+
+
+class RetryPolicy:
+    """When and after how long failed requests are sent again.
+    """
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, backoff: float = RETRY_BACKOFF,
+                 max_backoff: float = RETRY_MAX_BACKOFF, jitter: bool = RETRY_JITTER,
+                 statuses: Iterable[int] = RETRY_STATUSES) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        max_attempts : int
+            Times a request is sent at most, including the first one.
+
+        backoff : float
+            Seconds to wait before the first retry, doubled on every retry.
+
+        max_backoff : float
+            Maximum seconds to wait before a retry.
+
+        jitter : bool
+            Whether to wait a random time up to the backoff instead, so
+            requests that failed together aren't retried together.
+
+        statuses : Iterable[int]
+            Response status codes worth retrying, besides timeouts and
+            connection errors.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+
+    def should_retry(self, status_code: Optional[int]) -> bool:
+        """Whether a request failed for a reason worth retrying.
+
+        Parameters
+        ----------
+        status_code : int
+            Response status code, None if no response was received.
+
+        Return
+        ------
+        bool : True if the request may succeed if sent again.
+        """
+        return status_code is None or status_code in self.statuses
+
+    def get_delay(self, attempt: int) -> float:
+        """Get the seconds to wait before sending a request again.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of the failed attempt, starting from 1.
+
+        Return
+        ------
+        float : Seconds to wait.
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitBreaker:
+    """Thread safe circuit breaker of a host.
+
+    Closed, requests are sent. After enough failures in a row it opens and
+    requests fail at once, until the reset timeout passes and it lets a
+    single trial request through: the circuit closes again if it succeeds,
+    and opens again otherwise.
+    """
+
+    def __init__(self, failures: int = CIRCUIT_BREAKER_FAILURES,
+                 reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        failures : int
+            Failures in a row that open the circuit.
+
+        reset_timeout : float
+            Seconds the circuit stays open before a trial request.
+
+        clock : Callable[[], float]
+            Monotonic clock in seconds.
+        """
+        self.lock = threading.Lock()
+        self.failures = max(1, failures)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request can be sent now.
+
+        Return
+        ------
+        bool : False if the circuit is open or its trial request is in flight.
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+                self.state = OPEN
+                self.opened = self.clock()
+            self.trial_in_flight = False
+
+
+class CircuitBreakers:
+    """Thread safe registry of the circuit breakers of every requested host.
+    """
+
+    def __init__(self, failures: int = CIRCUIT_BREAKER_FAILURES,
+                 reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = CircuitBreaker(self.failures, self.reset_timeout, self.clock)
+            return self.hosts[host]
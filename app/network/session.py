@@ -0,0 +1,172 @@
+"""
+Pooled keep-alive HTTP sessions.
+"""
+
+# Python
+import threading
+from typing import Dict, Optional
+
+# Requests
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# App
+from settings import (
+    HTTP_COMPRESSION,
+    HTTP_HEADERS,
+    HTTP_KEEP_ALIVE,
+    HTTP_POOL_SIZE,
+    REQUEST_TIMEOUT
+)
+
+
+class ConnectionStats:
+    """Thread safe counters of requests sent and connections opened.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def add_request(self) -> None:
+        with self.lock:
+            self.requests += 1
+
+    def add_new_connection(self) -> None:
+        with self.lock:
+            self.new_connections += 1
+
+    @property
+    def reused_connections(self) -> int:
+        """Requests that were sent over an already open connection.
+
+        Return
+        ------
+        int : Amount of reused connections.
+        """
+        return max(0, self.requests - self.new_connections)
+
+    def __str__(self) -> str:
+        return (
+            f'{self.requests} requests, {self.new_connections} new connections, '
+            f'{self.reused_connections} reused connections'
+        )
+
+
+def get_counting_pool_class(pool_class: type, stats: ConnectionStats) -> type:
+    """Create a urllib3 connection pool class whose connections report every
+    time they open a socket, including reconnections of dropped ones.
+
+    Parameters
+    ----------
+    pool_class : type
+        HTTP or HTTPS urllib3 connection pool class to extend.
+
+    stats : ConnectionStats
+        Counters to report new connections to.
+
+    Return
+    ------
+    type : Connection pool class.
+    """
+    class CountingConnection(pool_class.ConnectionCls):
+
+        def connect(self) -> None:
+            stats.add_new_connection()
+            super().connect()
+
+    class CountingConnectionPool(pool_class):
+        ConnectionCls = CountingConnection
+
+    return CountingConnectionPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """Requests transport adapter that reports every new connection.
+    """
+
+    def __init__(self, stats: ConnectionStats, **kwargs) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': get_counting_pool_class(HTTPConnectionPool, self.stats),
+            'https': get_counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+
+class PageSession:
+    """HTTP session with a pool of keep-alive connections, shared by every
+    request a page sends.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE,
+                 keep_alive: bool = HTTP_KEEP_ALIVE,
+                 compression: bool = HTTP_COMPRESSION,
+                 timeout: float = REQUEST_TIMEOUT,
+                 headers: Optional[Dict[str, str]] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        pool_size : int
+            Maximum connections kept open against each host.
+
+        keep_alive : bool
+            Whether connections are kept open to be reused by next requests.
+
+        compression : bool
+            Whether compressed responses are accepted.
+
+        timeout : float
+            Default seconds to wait for a response.
+
+        headers : Dict[str, str]
+            Headers sent in every request, HTTP_HEADERS by default.
+        """
+        self.timeout = timeout
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        adapter = CountingHTTPAdapter(
+            self.stats, pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(HTTP_HEADERS if headers is None else headers)
+        self.session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate' if compression else 'identity'
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None) -> requests.Response:
+        """Send a GET request through the pooled connections.
+
+        Parameters
+        ----------
+        url : str
+            Url to request.
+
+        headers : Dict[str, str]
+            Extra headers for this request only.
+
+        timeout : float
+            Seconds to wait for the response, session timeout by default.
+
+        Return
+        ------
+        requests.Response : Response of the request.
+        """
+        self.stats.add_request()
+        return self.session.get(
+            url,
+            headers=headers,
+            timeout=self.timeout if timeout is None else timeout
+        )
+
+    def close(self) -> None:
+        """Close every pooled connection.
+        """
+        self.session.close()
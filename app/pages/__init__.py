@@ -1,3 +1,9 @@
 from .base import BasePage, BaseSeleniumUtils
 from .falabella import FalabellaPage
 from .sodimac import SodimacPage
+
+# Page class of every page name accepted by manage.py
+PAGES = {
+    'falabella': FalabellaPage,
+    'sodimac': SodimacPage,
+}
@@ -2,6 +2,9 @@
 from abc import ABC, abstractmethod
 from typing import Generator
 
+# App
+from parsing import ExtractionPlan
+
 
 class BasePage(ABC):
     """Abstract class that implements how to get and store the data regarding
@@ -50,41 +53,12 @@ class BasePage(ABC):
         pass
 
     @abstractmethod
-    def get_product_id_lookup(soup_product) -> str:
-        """Implement lookup to find product id.
-
-        Return
-        ------
-        str : ID of the given BS4 product.
-        """
-        pass
-
-    @abstractmethod
-    def get_product_url_lookup(soup_product) -> str:
-        """Implement lookup to find product url.
-
-        Return
-        ------
-        str : URL of the given BS4 product.
-        """
-        pass
-
-    @abstractmethod
-    def get_product_name_lookup(soup_product) -> str:
-        """Implement lookup to find product name.
-
-        Return
-        ------
-        str : Name of the given BS4 product.
-        """
-        pass
-
-    @abstractmethod
-    def get_product_price_lookup(soup_product) -> float:
-        """Implement lookup to find product price.
+    def get_product_extraction_plan(self) -> ExtractionPlan:
+        """Implement the fields to extract from every product node, which must
+        include product_id, product_url, product_name and product_price.
 
         Return
         ------
-        float : Price of the given BS4 product.
+        ExtractionPlan : Plan to extract the products fields.
         """
         pass
@@ -1,28 +1,54 @@
 # Python
 from abc import ABC, abstractmethod
-
-# Selenium
-from selenium.webdriver import Chrome
+from typing import Optional
 
 # App
-from settings import SELENIUM_DRIVER_PATH
+from network import BrowserPool, get_browser_pool
 
 
 class BaseSeleniumUtils(ABC):
     """Base abstract class for selenium classes.
 
-    Implement Chromedriver and get to page url.
+    Borrow a pooled browser and get to page url. Use it as a context manager
+    to give the browser back to the pool once done.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, pool: Optional[BrowserPool] = None) -> None:
         """Constructor method.
 
-        Set Chromedriver instance, maximize window and get to the page url
-        to get ready for scraping.
+        Borrow a browser from the pool and get to the page url to get ready
+        for scraping.
+
+        Parameters
+        ----------
+        pool : BrowserPool
+            Pool to borrow the browser from, the process pool by default.
+        """
+        self.pool = get_browser_pool() if pool is None else pool
+        self.driver = self.pool.acquire()
+        try:
+            self.pool.navigate(self.driver, self.get_page_url())
+        except Exception:
+            self.close(discard=True)
+            raise
+
+    def __enter__(self) -> 'BaseSeleniumUtils':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(discard=exc_type is not None)
+
+    def close(self, discard: bool = False) -> None:
+        """Give the browser back to the pool.
+
+        Parameters
+        ----------
+        discard : bool
+            Whether to quit the browser instead, E.G. after it failed.
         """
-        self.driver = Chrome(executable_path=SELENIUM_DRIVER_PATH)
-        self.driver.maximize_window()
-        self.driver.get(self.get_page_url())
+        if self.driver is not None:
+            self.pool.release(self.driver, discard=discard)
+            self.driver = None
 
     @abstractmethod
     def get_page_url(self) -> str:
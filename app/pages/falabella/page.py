@@ -1,5 +1,6 @@
 # Python
 from datetime import date
+import re
 from typing import Generator
 
 # BS4
@@ -8,6 +9,7 @@ from bs4.element import ResultSet
 # App
 from pages import BasePage
 from pages.mixins import CollectCategoriesMixin, CollectProductsMixin
+from parsing import ExtractionPlan, Field, get_price, get_product_id
 from .selenium_utils import FalabellaSeleniumUtils
 
 
@@ -23,6 +25,43 @@ class FalabellaPage(
     CATEGORIES_STORAGE_FILENAME = 'falabella-categories'
     PRODUCTS_STORAGE_FILENAME = 'falabella-products'
 
+    # Tag name and attributes of every product in category pages
+    PRODUCTS_LOOKUP = (
+        'div', {'class': 'jsx-3488318063 jsx-3886284353 pod pod-4_GRID'}
+    )
+
+    # Fields of every product node
+    PRODUCT_EXTRACTION_PLAN = ExtractionPlan(
+        fields=[
+            Field('product_url', [('a', {})], attribute='href'),
+            Field('product_name', [('b', {'class': 'pod-subTitle'})]),
+            Field(
+                'product_price',
+                [('li', {'class': 'price-0'})],
+                attribute='data-undefined-price',
+                transform=get_price
+            ),
+        ],
+        derived={'product_id': ('product_url', get_product_id)}
+    )
+
+    # Page with the categories menu, the furnitures menu item name and the
+    # url of its nested categories
+    CATEGORIES_PAGE_URL = FalabellaSeleniumUtils.PAGE_URL
+    CATEGORIES_MENU_NAME = 'Deco hogar'
+    CATEGORY_URL_PATTERN = re.compile(r'/falabella-ar/category/[^/?]+/[^?]*$')
+
+    # Query parameter that selects the page of a category
+    PAGE_QUERY_PARAMETER = 'page'
+
+    # Pagination object of the category page state, in its Next.js
+    # __NEXT_DATA__ script as reproduced by the saved category page in
+    # tests/mocks/html. Categories whose first page doesn't match are collected
+    # from that page only, and counted as categories_without_pagination
+    PAGINATION_PATTERN = re.compile(
+        r'"pagination":\{"count":(?P<count>\d+),"perPage":(?P<per_page>\d+)'
+    )
+
     def get_page_name(self) -> str:
         return self.PAGE_NAME
 
@@ -36,7 +75,8 @@ class FalabellaPage(
 
     @property
     def furnitures_categories(self) -> Generator:
-        return FalabellaSeleniumUtils().get_furnitures_categories()
+        with FalabellaSeleniumUtils() as selenium_utils:
+            yield from selenium_utils.get_furnitures_categories()
 
     def get_products_in_page(self) -> ResultSet:
         """Look for products in page.
@@ -45,25 +85,7 @@ class FalabellaPage(
         ------
         ResultSet : Products that match with the criteria.
         """
-        return self.soup.find_all(
-            'div',
-            {'class': 'jsx-3488318063 jsx-3886284353 pod pod-4_GRID'}
-        )
-
-    @staticmethod
-    def get_product_id_lookup(soup_product) -> str:
-        return soup_product.find_all('a')[0]['href'].split('/')[5]
-
-    @staticmethod
-    def get_product_url_lookup(soup_product) -> str:
-        return soup_product.find_all('a')[0]['href']
-
-    @staticmethod
-    def get_product_name_lookup(soup_product) -> str:
-        return soup_product.find('b', {'class': 'pod-subTitle'}).text
-
-    @staticmethod
-    def get_product_price_lookup(soup_product) -> float:
-        fixed_price = soup_product.find('li', {'class': 'price-0'})\
-            ['data-undefined-price'].replace('.', '').replace(',', '.')
-        return float(fixed_price)
+        return self.soup.find_all(*self.PRODUCTS_LOOKUP)
+
+    def get_product_extraction_plan(self) -> ExtractionPlan:
+        return self.PRODUCT_EXTRACTION_PLAN
@@ -1,2 +1,4 @@
+from .fetch import FetchMixin
+from .storage import StorageMixin
 from .collect_categories import CollectCategoriesMixin
 from .collect_products import CollectProductsMixin
@@ -1,26 +1,73 @@
 # Python
-from typing import List
+from datetime import date
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
 
 # App
 from models import PageCategory
-from settings import CATEGORIES_STORAGE_PATH, get_csv_writer
+from network import get_browser_pool
+from parsing import find_category_links, get_categories_checksum
+from settings import CATEGORIES_FAST_PATH, CATEGORIES_TTL_DAYS, FINGERPRINTS_STORAGE_PATH
+from .fetch import FetchMixin
+from .storage import StorageMixin
 
 
-class CollectCategoriesMixin:
+class CollectCategoriesMixin(FetchMixin, StorageMixin):
     """Mixin to inherit in page models.
     
     Provides the possibility of collecting and storing categories from the
     subclass' indicated page.
     """
 
+    def get_categories_without_browser(self) -> List[PageCategory]:
+        """Get nested categories from furnitures categories in the categories
+        page HTML or embedded state, without a browser.
+
+        Return
+        ------
+        List[PageCategory] : Categories found.
+        """
+        html = self.fetch_url(self.CATEGORIES_PAGE_URL)
+        if html is None:
+            return []
+        links = find_category_links(
+            html, self.CATEGORIES_PAGE_URL, self.CATEGORIES_MENU_NAME, self.CATEGORY_URL_PATTERN
+        )
+        return [
+            PageCategory(
+                page_name=self.get_page_name(),
+                category_name=name,
+                category_url=url,
+                category_id=url.split('/')[5]
+            )
+            for name, url in links
+        ]
+
     def get_categories(self) -> List[PageCategory]:
-        """Get nested categories from furnitures categories.
+        """Get nested categories from furnitures categories, with a browser
+        only if they can't be found without it, setting browser_used.
 
         Return
         ------
         List[PageCategory] : Categories found.
         """
 
+        self.browser_used = False
+        if CATEGORIES_FAST_PATH:
+            start = time.perf_counter()
+            self.categories = self.get_categories_without_browser()
+            if self.categories:
+                print(
+                    f' * Found {len(self.categories)} categories without a browser in '
+                    f'{(time.perf_counter() - start) * 1000:.0f}ms.'
+                )
+                return self.categories
+            print(' * No categories found without a browser, falling back to Selenium.')
+
+        self.browser_used = True
         categories = self.furnitures_categories
         self.categories = []
         while True:
@@ -38,32 +85,103 @@ class CollectCategoriesMixin:
                 break
         return self.categories
 
-    def store_categories(self) -> str:
-        """Store today's page categories in CSV.
+    def get_categories_discovery_filename(self) -> str:
+        return FINGERPRINTS_STORAGE_PATH + self.CATEGORIES_STORAGE_FILENAME + '.json'
 
-        HEADS UP! It will overwrite a file if it has the same name. Name are
-        created with today's date.
+    def load_categories_discovery(self) -> Dict[str, str]:
+        """Get the date and structure checksum of the latest discovered
+        categories.
 
         Return
         ------
-        str : Filename of the created CSV with the categories.
+        Dict[str, str] : Discovery date and checksum, empty if categories
+            were never discovered.
         """
+        try:
+            with open(self.get_categories_discovery_filename()) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
 
-        print(f'Collecting and storing categories from {self.__class__.__name__}...')
+    def save_categories_discovery(self, day: date, categories: List[PageCategory]) -> None:
+        """Replace the stored date and structure checksum of the latest
+        discovered categories atomically.
+        """
+        filename = self.get_categories_discovery_filename()
+        path = os.path.dirname(filename)
+        os.makedirs(path, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump({
+                'discovered': str(day), 'checksum': get_categories_checksum(categories)
+            }, file)
+        os.replace(temporary, filename)
+
+    def get_fresh_categories(self, day: date) -> Optional[List[PageCategory]]:
+        """Get the latest categories snapshot if its categories were
+        discovered less than CATEGORIES_TTL_DAYS before the given day, and
+        it still has the discovered structure, setting categories_discovered.
 
-        filename = CATEGORIES_STORAGE_PATH + self.get_categories_storage_filename()
+        Parameters
+        ----------
+        day : date
+            Day the categories are stored for.
 
-        with open(filename, mode='w') as file:
+        Return
+        ------
+        List[PageCategory] : Categories to carry forward.
+        None : Categories must be discovered again.
+        """
+        discovery = self.load_categories_discovery()
+        if CATEGORIES_TTL_DAYS <= 0 or not discovery:
+            return None
+        try:
+            discovered = date.fromisoformat(discovery['discovered'])
+            checksum = discovery['checksum']
+        except (KeyError, TypeError, ValueError):  # Truncated or edited by hand
+            return None
+        if not 0 <= (day - discovered).days < CATEGORIES_TTL_DAYS:
+            return None
+        categories = self.get_latest_categories()
+        if not categories or get_categories_checksum(categories) != checksum:
+            return None
+        self.categories_discovered = discovered
+        return categories
+
+    def store_categories(self, force_refresh: bool = False) -> str:
+        """Store today's page categories, carrying forward the latest ones
+        while they are fresh.
+
+        HEADS UP! It will overwrite today's snapshot if it was already stored.
+
+        Parameters
+        ----------
+        force_refresh : bool
+            Whether to discover the categories even if the latest ones are
+            fresh.
+
+        Return
+        ------
+        str : Location of the stored categories, E.G. the CSV filename.
+        """
+
+        print(f'Collecting and storing categories from {self.__class__.__name__}...')
 
-            file = get_csv_writer(file)
-            file.writerow([header for header in PageCategory.CSV_HEADERS])
-            for category in self.get_categories():
-                file.writerow([
-                    category.page_name,
-                    category.category_name,
-                    category.category_url,
-                    category.category_id
-                ])
+        day = self.get_snapshot_date()
+        self.browser_used = False
+        categories = None if force_refresh else self.get_fresh_categories(day)
+        if categories is None:
+            categories = self.get_categories()
+            if categories:
+                self.save_categories_discovery(day, categories)
+            if self.browser_used:
+                print(f' * Browsers: {get_browser_pool().stats}.')
+        else:
+            print(
+                f' * Carried forward {len(categories)} categories discovered on '
+                f'{self.categories_discovered}.'
+            )
+        filename = self.storage.write_categories(day, categories)
 
         print(f'Finished categories from {self.__class__.__name__}.')
         return filename
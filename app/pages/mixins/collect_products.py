@@ -1,215 +1,468 @@
 # Python
+import asyncio
+from collections import deque
 from datetime import date
-from os import listdir
-from os.path import isfile, join
-import requests
-from requests.exceptions import Timeout, RequestException
-from typing import List, Generator
-
-# BeautifulSoup
-from bs4 import BeautifulSoup
+from concurrent.futures import Future, ProcessPoolExecutor
+import math
+import os
+import time
+from typing import Collection, Generator, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
 
 # App
 from models import PageCategory, PageProduct
+from network import AsyncFetchEngine
+from parsing import (
+    CategoryFingerprints,
+    get_fingerprint,
+    get_parser_backend,
+    get_products_marker
+)
 from settings import (
-    CATEGORIES_STORAGE_PATH,
-    PRODUCTS_STORAGE_PATH,
-    get_csv_reader,
-    get_csv_writer
+    COLLECTION_MAX_CONCURRENCY,
+    COLLECTION_MAX_PAGES_PER_CATEGORY,
+    COLLECTION_MAX_PER_HOST,
+    COLLECTION_QUEUE_SIZE,
+    FINGERPRINTS_STORAGE_PATH,
+    HTML_PARSE_ONLY_PRODUCTS,
+    JOURNALS_STORAGE_PATH,
+    PRODUCTS_JOURNAL_ENABLED,
+    PARSE_IN_PROCESSES,
+    PARSE_WORKERS,
+    PRICE_INDEX_ENABLED,
+    ROLLUPS_ENABLED,
+    RUN_SUMMARIES_STORAGE_PATH,
+    SHORT_CIRCUIT_UNCHANGED_CATEGORIES
 )
+from storage import PRODUCTS, ProductsJournal
+from utils.exceptions import MalformedProductException
+from utils.summary import RunSummary
+from .fetch import FetchMixin
+from .storage import StorageMixin
+
+# Product ID, url, name and price, all that's sent back by parser processes
+ProductFields = Tuple[str, str, str, float]
+
+# Page object of a parser worker process
+_parser_page = None
+
+
+def init_parser_worker(page_class: type) -> None:
+    """Create the page object that parses category pages in a parser
+    worker process.
+    """
+    global _parser_page
+    _parser_page = page_class()
 
 
-class CollectProductsMixin:
+def extract_in_worker(category_url: str,
+                      pages: List[str]) -> Tuple[List[ProductFields], int]:
+    """Extract the products of every page of a category, in a parser worker
+    process.
+
+    Parameters
+    ----------
+    category_url : str
+        Url of the category, to report malformed products.
+
+    pages : List[str]
+        HTML content of the category pages.
+
+    Return
+    ------
+    Tuple[List[ProductFields], int] : Fields of the products found and
+        amount of malformed products.
+    """
+    products, malformed = [], 0
+    for html in pages:
+        page_products, page_malformed = _parser_page.extract_products(category_url, html)
+        products.extend(page_products)
+        malformed += page_malformed
+    return products, malformed
+
+
+class CollectProductsMixin(FetchMixin, StorageMixin):
     """Mixin to inherit in page models.
     
     Provides the possibility of collecting and storing products from the
     subclass' indicated page.
     """
 
-    @staticmethod
-    def get_dates_as_string(files: List[str], replace_lookup: str) -> List[str]:
-        """Collect and return all the dates as string from the files' names.
+    def get_fetch_engine(self) -> AsyncFetchEngine:
+        """Get an engine to fetch pages concurrently through the page session.
+
+        Return
+        ------
+        AsyncFetchEngine : Engine with the configured concurrency limits.
+        """
+        # Create the session, cache and summary before sharing them between threads
+        self.session
+        self.http_cache
+        self.run_summary
+        self.request_outcomes
+        return AsyncFetchEngine(
+            fetch=self.fetch_url,
+            max_concurrency=COLLECTION_MAX_CONCURRENCY,
+            max_per_host=COLLECTION_MAX_PER_HOST,
+            rate_limiter=self.rate_limiter
+        )
+
+    @property
+    def furnitures_products(self) -> Generator:
+        """Stream products from all the latest categories.
+
+        Category pages are fetched concurrently in the background while the
+        already fetched ones are parsed, and fetching pauses whenever
+        COLLECTION_QUEUE_SIZE categories are waiting to be parsed.
+
+        Return
+        ------
+        Generator : yield from products found in every category.
+        """
+        for _, products in self.get_categories_products():
+            yield from products
+
+    def get_categories_products(self, skip: Collection[str] = ()) -> Generator:
+        """Stream the products of the latest categories, category by
+        category.
 
         Parameters
         ----------
-        files : List[str]
-            Collection to get the dates from.
-        
-        replace_lookup : str
-            Part of the name in the files to remove together with file
-            extension, leaving only the date in the filename.
-        
+        skip : Collection[str]
+            IDs of the categories not to collect, E.G. the ones collected by
+            a run that died halfway.
+
         Return
         ------
-        List[str] : Collection of the obtained dates.
+        Generator : yield from category and products tuples.
         """
-        str_dates = []
-        for file in files:
-            str_date = file.replace(
-                replace_lookup + '-', ''
-            ).replace('.csv', '')
-            str_dates.append(str_date)
-        return str_dates
-
-    @staticmethod
-    def get_str_dates_as_dates(str_dates: List[str]) -> List[date]:
-        """Convert all the given string dates to Python date type.
+        categories = self.fetch_changed_categories(skip)
+        if PARSE_IN_PROCESSES:
+            yield from self.parse_in_processes(categories)
+            return
+        for category, pages in categories:
+            if pages is None:
+                yield category, self.get_previous_category_products(category.category_id)
+                continue
+            yield category, (
+                product for html in pages
+                for product in self.parse_category_products(category, html)
+            )
+
+    def fetch_changed_categories(self, skip: Collection[str] = ()) -> Generator:
+        """Fetch the pages of all the latest categories concurrently, and
+        compare their fingerprints with the previous run ones.
 
         Parameters
         ----------
-        str_dates : List[str]
-            Collection of dates to convert.
-        
+        skip : Collection[str]
+            IDs of the categories not to fetch.
+
+        Return
+        ------
+        Generator : yield from category and pages tuples, with None as the
+            pages of the categories unchanged since the previous run.
+        """
+        engine = self.get_fetch_engine()
+
+        async def fetch_category(category: PageCategory) -> tuple:
+            return category, await self.fetch_category_pages(engine, category)
+
+        if getattr(self, 'previous_fingerprints', None) is None:
+            self.load_category_fingerprints()
+        marker = get_products_marker(self.PRODUCTS_LOOKUP)
+        for category, pages in engine.stream(
+                (category for category in self.get_latest_categories()
+                 if category.category_id not in skip),
+                fetch_category,
+                max_pending=COLLECTION_QUEUE_SIZE):
+            if not pages:
+                continue
+            fingerprint = get_fingerprint(pages, marker)
+            self.category_fingerprints[category.category_id] = fingerprint
+            if self.previous_fingerprints.get(category.category_id) == fingerprint:
+                self.run_summary.increment('short_circuited_categories')
+                self.run_summary.set_category(category.category_id, short_circuited=True)
+                yield category, None
+                continue
+            yield category, pages
+
+    def parse_in_processes(self, categories: Iterable[Tuple[PageCategory, Optional[List[str]]]],
+                           workers: Optional[int] = None) -> Generator:
+        """Parse the pages of fetched categories in a pool of processes,
+        while the next categories are fetched in this one.
+
+        Only the products fields are sent back from the parser processes, and
+        categories are yielded in the same order as they were fetched.
+
+        Parameters
+        ----------
+        categories : Iterable[Tuple[PageCategory, Optional[List[str]]]]
+            Category and pages tuples, with None as the pages of the
+            categories to copy from the previous snapshot.
+
+        workers : int
+            Parser processes, PARSE_WORKERS by default, one per core if None.
+
+        Return
+        ------
+        Generator : yield from category and products tuples.
+        """
+        workers = (PARSE_WORKERS if workers is None else workers) or os.cpu_count() or 1
+        # Enough categories waiting to keep every parser process busy
+        max_pending = 2 * workers
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_parser_worker,
+                                 initargs=(type(self), )) as executor:
+            pending = deque()
+            for category, pages in categories:
+                future = None if pages is None else executor.submit(
+                    extract_in_worker, category.category_url, pages
+                )
+                pending.append((category, future))
+                if len(pending) >= max_pending:
+                    category, future = pending.popleft()
+                    yield category, self.get_parsed_products(category, future)
+            while pending:
+                category, future = pending.popleft()
+                yield category, self.get_parsed_products(category, future)
+
+    def get_parsed_products(self, category: PageCategory,
+                            future: Optional[Future]) -> Generator:
+        """Wait for the products of a category parsed in a parser process.
+
         Return
         ------
-        List[date] : Convertion results.
+        Generator : yield from products of the category, from the previous
+            snapshot if the future is None.
         """
-        dates = []
-        for str_date in str_dates:
-            _date = date(*[int(result) for result in str_date.split('-')])
-            dates.append(_date)
-        return dates
+        if future is None:
+            return self.get_previous_category_products(category.category_id)
+        return iter(self.get_page_products(category, *future.result()))
 
-    @staticmethod
-    def get_file_with_date(files: List[str], file_date: date) -> str:
-        """Filter a file in the list with the given date.
+    def load_category_fingerprints(self) -> None:
+        """Load the categories fingerprints of the latest products snapshot to
+        compare them with the ones of this run.
+        """
+        self.category_fingerprints = {}
+        self.previous_fingerprints = {}
+        self.previous_snapshot = None
+        if not SHORT_CIRCUIT_UNCHANGED_CATEGORIES:
+            return
+        snapshot = self.storage.get_latest_date(PRODUCTS)
+        # Today's snapshot is about to be overwritten by this run
+        if snapshot is None or snapshot == self.get_snapshot_date():
+            return
+        self.previous_snapshot = snapshot
+        self.previous_fingerprints = self.category_fingerprints_store.load(snapshot)
+
+    @property
+    def category_fingerprints_store(self) -> CategoryFingerprints:
+        """Stored categories fingerprints of this page.
+
+        Return
+        ------
+        CategoryFingerprints : Fingerprints store.
+        """
+        return CategoryFingerprints(
+            FINGERPRINTS_STORAGE_PATH + self.PRODUCTS_STORAGE_FILENAME + '.json'
+        )
+
+    def get_previous_category_products(self, category_id: str) -> Generator:
+        """Get the products of a category from the previous snapshot.
 
         Parameters
         ----------
-        files : List[str]
-            Collection of filenames to search from.
+        category_id : str
+            ID of the category.
 
-        file_date : date
-            Date value to filter the file.
-        
         Return
         ------
-        str : First file match.
-        None : No file with given date found.
+        Generator : yield from products of the category.
         """
-        last_file = None
-        for file in files:
-            if str(file_date) in file:
-                last_file = file
-                break
-        return last_file
+        return self.storage.read_category_products(self.previous_snapshot, category_id)
 
-    def get_files(self, file_lookup: str, storage_path: str) -> List[str]:
-        """Find and return CSV files filtering by file_lookup.
+    def get_category_page_url(self, category_url: str, page_number: int) -> str:
+        """Get the url of a given page of a category.
 
         Parameters
         ----------
-        file_lookup : str
-            Part of name to filter accepted files.
-        
-        storage_path : str
-            Path where to find the desired files.
-        
+        category_url : str
+            Url of the category first page.
+
+        page_number : int
+            Number of the page, starting from 1.
+
         Return
         ------
-        List[str] : Result of filtered files.
+        str : Url of the category page.
         """
-        all_categories_files = [
-            f for f in listdir(storage_path) 
-            if isfile(join(storage_path, f))
-        ]
-        categories_files = []
-        for file in all_categories_files:
-            if file_lookup in file:
-                categories_files.append(file)
-        return categories_files
+        if page_number == 1:
+            return category_url
+        url = urlparse(category_url)
+        query = dict(parse_qsl(url.query))
+        query[self.PAGE_QUERY_PARAMETER] = str(page_number)
+        return url._replace(query=urlencode(query)).geturl()
 
-    def get_latest_file(self, file_lookup: str, storage_path: str) -> str:
-        """Get the CSV file with the latest date and file_lookup in its filename.
+    def get_category_page_count(self, html: str) -> int:
+        """Find the amount of pages of a category in the pagination data of
+        its first page.
 
         Parameters
         ----------
-        file_lookup : str
-            Part of name to filter the files before comparing their dates.
+        html : str
+            HTML content of the category first page.
 
-        storage_path : str
-            Path where to find the desired file.
-        
         Return
         ------
-        str : Filename of the file with the given name lookup and latest date.
+        int : Amount of pages of the category, 1 if there's no pagination.
         """
-        files = self.get_files(file_lookup, storage_path)
-        str_dates = self.get_dates_as_string(files, file_lookup)
-        dates = self.get_str_dates_as_dates(str_dates)
-        max_date = max(dates)
-        last_categories_file = self.get_file_with_date(files, max_date)
-        return last_categories_file
+        pagination = self.PAGINATION_PATTERN.search(html)
+        if pagination is None:
+            # Also a sign the embedded state of the page changed its shape
+            self.run_summary.increment('categories_without_pagination')
+            return 1
+        count = int(pagination.group('count'))
+        per_page = int(pagination.group('per_page'))
+        if not per_page:
+            return 1
+        return min(
+            max(1, math.ceil(count / per_page)),
+            COLLECTION_MAX_PAGES_PER_CATEGORY
+        )
+
+    async def fetch_category_pages(self, engine: AsyncFetchEngine,
+                                   category: PageCategory) -> List[str]:
+        """Fetch the first page of a category to find its amount of pages, and
+        then fetch the remaining pages concurrently.
+
+        Parameters
+        ----------
+        engine : AsyncFetchEngine
+            Running engine to fetch the pages with.
+
+        category : PageCategory
+            Category to fetch the pages from.
+
+        Return
+        ------
+        List[str] : HTML content of the fetched pages, in page order.
+        """
+        first_page = await engine.fetch(category.category_url)
+        if first_page is None:
+            self.run_summary.set_category(
+                category.category_id, pages=0,
+                outcome=self.pop_requests_outcome([category.category_url])
+            )
+            self.run_summary.increment('failed_categories')
+            return []
+        page_count = self.get_category_page_count(first_page)
+        urls = [
+            self.get_category_page_url(category.category_url, number)
+            for number in range(1, page_count + 1)
+        ]
+        next_pages = await asyncio.gather(*[engine.fetch(url) for url in urls[1:]])
+        pages = [first_page] + [page for page in next_pages if page is not None]
+        self.run_summary.set_category(
+            category.category_id, pages=f'{len(pages)}/{page_count}',
+            outcome=self.pop_requests_outcome(urls)
+        )
+        self.run_summary.increment('categories')
+        self.run_summary.increment('pages', len(pages))
+        return pages
 
-    def get_latest_products(self) -> Generator:
-        """Get products from latest CSV file.
+    def parse_category_products(self, category: PageCategory,
+                                html: str) -> Generator:
+        """Parse products from a category page content.
+
+        Parameters
+        ----------
+        category : PageCategory
+            Category the page belongs to.
+
+        html : str
+            HTML content of the category page.
 
         Return
         ------
-        Generator : yield from products in the CSV file.
+        Generator : yield from products found in the given content.
         """
-        last_products_file = self.get_latest_file(
-            self.PRODUCTS_STORAGE_FILENAME,
-            PRODUCTS_STORAGE_PATH
+        yield from self.get_page_products(
+            category, *self.extract_products(category.category_url, html)
         )
-        first = True  # avoid appending the CSV header (first row)
-        with open(PRODUCTS_STORAGE_PATH + last_products_file) as file:
-            file = get_csv_reader(file)
-            for row in file:
-                if not first:
-                    product = PageProduct(
-                        page_name=row[0],
-                        category_id=row[1],
-                        product_id=row[2],
-                        product_url=row[3],
-                        product_name=row[4],
-                        product_price=row[5],
-                    )
-                    yield product
-                first = False
-
-    def get_latest_categories(self) -> List[PageCategory]:
-        """Get categories from latest CSV file.
+
+    def extract_products(self, category_url: str,
+                         html: str) -> Tuple[List[ProductFields], int]:
+        """Extract the fields of the products in a category page content.
+
+        Parameters
+        ----------
+        category_url : str
+            Url of the category, to report malformed products.
+
+        html : str
+            HTML content of the category page.
 
         Return
         ------
-        List[PageCategory] : Categories in the CSV file.
+        Tuple[List[ProductFields], int] : Fields of the products found and
+            amount of malformed products.
         """
-        categories = []
-        last_categories_file = self.get_latest_file(
-            self.CATEGORIES_STORAGE_FILENAME,
-            CATEGORIES_STORAGE_PATH
+        self.soup = get_parser_backend().parse(
+            html,
+            parse_only=self.PRODUCTS_LOOKUP if HTML_PARSE_ONLY_PRODUCTS else None
         )
-        first = True  # avoid appending the CSV header (first row)
-        with open(CATEGORIES_STORAGE_PATH + last_categories_file) as file:
-            file = get_csv_reader(file)
-            for row in file:
-                if not first:
-                    category = PageCategory(
-                        page_name=row[0],
-                        category_name=row[1],
-                        category_url=row[2],
-                        category_id=row[3]
-                    )
-                    categories.append(category)
-                first = False
-        return categories
+        plan = self.get_product_extraction_plan()
+        products, malformed = [], 0
+        for page_product in self.get_products_in_page():
+            try:
+                fields = plan.extract(page_product)
+            except MalformedProductException as e:
+                print(f' * MalformedProductException: {e} in {category_url}')
+                malformed += 1
+                continue
+            products.append((
+                fields['product_id'],
+                fields['product_url'],
+                fields['product_name'],
+                fields['product_price']
+            ))
+        return products, malformed
+
+    def get_page_products(self, category: PageCategory, products: List[ProductFields],
+                          malformed: int) -> List[PageProduct]:
+        """Create the products of a category from their extracted fields.
 
-    @property
-    def furnitures_products(self) -> Generator:
-        products = []
-        for category in self.get_latest_categories():
-            _category_products = self.get_category_products(category)
-            while True:
-                try:
-                    category_product = next(_category_products)
-                    products.append(category_product)
-                except StopIteration:
-                    break
-        yield from products
+        Parameters
+        ----------
+        category : PageCategory
+            Category the products belong to.
+
+        products : List[ProductFields]
+            Fields of the products.
+
+        malformed : int
+            Amount of malformed products skipped while extracting them.
+
+        Return
+        ------
+        List[PageProduct] : Products of the category.
+        """
+        if malformed:
+            self.run_summary.increment('malformed_products', malformed)
+        return [
+            PageProduct(
+                page_name=self.get_page_name(),
+                category_id=category.category_id,
+                product_id=product_id,
+                product_url=product_url,
+                product_name=product_name,
+                product_price=product_price
+            )
+            for product_id, product_url, product_name, product_price in products
+        ]
 
     def get_category_products(self, category: PageCategory) -> Generator:
-        """Get products from category page.
+        """Get products from every page of a category.
 
         Parameters
         ----------
@@ -220,59 +473,104 @@ class CollectProductsMixin:
         ------
         Generator : yield from products found in the given category.
         """
-        try:
-            request = requests.get(category.category_url, timeout=15)
-            if request.status_code != 200:
-                raise RequestException
-            self.soup = BeautifulSoup(request.text, 'html.parser')
-            for page_product in self.get_products_in_page():
-                product = PageProduct(
-                    page_name=self.get_page_name(),
-                    category_id=category.category_id,
-                    product_id=self.get_product_id_lookup(page_product),
-                    product_url=self.get_product_url_lookup(page_product),
-                    product_name=self.get_product_name_lookup(page_product),
-                    product_price=self.get_product_price_lookup(page_product)
-                )
-                yield product
-        except Timeout:
-            print(f' * Timeout: Get request for {category.category_url} timed out after 15 seconds.')
-        except RequestException:
-            print(f' * RequestException: Response code for request {category.category_url} was {request.status_code}')
+        engine = self.get_fetch_engine()
+        for html in engine.run(lambda: self.fetch_category_pages(engine, category)):
+            yield from self.parse_category_products(category, html)
+
+    def get_run_summary_filename(self, day: date) -> str:
+        return f'{RUN_SUMMARIES_STORAGE_PATH}{self.PRODUCTS_STORAGE_FILENAME}-{day}.json'
+
+    def get_products_journal(self, day: date) -> ProductsJournal:
+        return ProductsJournal(
+            f'{JOURNALS_STORAGE_PATH}{self.PRODUCTS_STORAGE_FILENAME}-{day}.journal'
+        )
+
+    def collect_products_journal(self, day: date) -> ProductsJournal:
+        """Collect the products of the categories that the runs of a day
+        didn't collect yet into the journal of the day.
+
+        Parameters
+        ----------
+        day : date
+            Date of the products snapshot.
+
+        Return
+        ------
+        ProductsJournal : Journal with the products of every collected
+            category.
+        """
+        journal = self.get_products_journal(day)
+        completed = journal.open()
+        if completed:
+            print(f' * Resuming: {len(completed)} categories were collected by a previous run.')
+            self.run_summary.increment('resumed_categories', len(completed))
+            self.category_fingerprints.update({
+                category_id: fingerprint for category_id, fingerprint in completed.items()
+                if fingerprint
+            })
+        for category, products in self.get_categories_products(skip=completed):
+            journal.append_category(
+                category.category_id, products,
+                self.category_fingerprints.get(category.category_id)
+            )
+        return journal
 
     def store_products(self) -> str:
-        """Store today's category products in CSV.
+        """Store today's category products.
 
-        HEADS UP! It will overwrite a file if it has the same name. Name are
-        created with today's date.
+        With PRODUCTS_JOURNAL_ENABLED, the products are collected into a
+        journal first, so a run of the same day resumes from the categories
+        a previous run collected before dying, and the snapshot is stored
+        once all of them are collected.
+
+        HEADS UP! It will overwrite today's snapshot if it was already stored.
 
         Return
         ------
-        str : Filename of the created CSV with the products.
+        str : Location of the stored products, E.G. the CSV filename.
         """
 
         print(f'Collecting and storing products from {self.__class__.__name__}...')
 
-        filename = PRODUCTS_STORAGE_PATH + self.get_products_storage_filename()
-
-        with open(filename, mode='w') as file:
-
-            file = get_csv_writer(file)
-            file.writerow([header for header in PageProduct.CSV_HEADERS])
-            products = self.furnitures_products
-            while True:
-                try:
-                    product = next(products)
-                    file.writerow([
-                        self.get_page_name(),
-                        product.category_id,
-                        product.product_id,
-                        product.product_url,
-                        product.product_name,
-                        product.product_price,
-                    ])
-                except StopIteration:
-                    break
+        day = self.get_snapshot_date()
+        start = time.perf_counter()
+        self._run_summary = RunSummary(self.get_page_name())
+        # Before today's snapshot is created and becomes the latest one
+        self.load_category_fingerprints()
+
+        def count(products: Generator) -> Generator:
+            for product in products:
+                self.run_summary.increment('products')
+                yield product
 
+        if PRODUCTS_JOURNAL_ENABLED:
+            journal = self.collect_products_journal(day)
+            filename = self.storage.write_products(day, count(journal.read_products()))
+            journal.remove()
+        else:
+            filename = self.storage.write_products(day, count(self.furnitures_products))
+        seconds = time.perf_counter() - start
+        throughput = self.run_summary.counters['products'] / seconds
+        self.run_summary.set_metric('seconds', round(seconds, 3))
+        self.run_summary.set_metric('products_per_second', round(throughput, 3))
+        print(f' * Throughput: {throughput:.0f} products/s in {seconds:.2f}s.')
+        self.category_fingerprints_store.save(day, self.category_fingerprints)
+        if PRICE_INDEX_ENABLED:
+            print(f' * Price index: {self.price_index.update(day)} days indexed.')
+        if ROLLUPS_ENABLED:
+            print(f' * Price rollups: {self.rollups.update(day)} days rolled up.')
+
+        if self.rate_limiter is not None:
+            self.run_summary.set_metric('rate_limits', self.rate_limiter.to_dict())
+            print(f' * Rate limits: {self.rate_limiter}.')
+        self.run_summary.set_metric('latencies', self.latencies.to_dict(self.session.timeout))
+        self.run_summary.set_metric('hedges', {
+            'requests': self.hedge_budget.requests, 'hedges': self.hedge_budget.hedges
+        })
+        print(f' * Hedging: {self.hedge_budget}.')
+        self.close_hedge_executor()
+        self.run_summary.print()
+        self.run_summary.save(self.get_run_summary_filename(day))
+        print(f' * Connections: {self.session.stats}.')
         print(f'Finished products from {self.__class__.__name__}.')
         return filename
@@ -0,0 +1,409 @@
+# Python
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Requests
+from requests import Response
+from requests.exceptions import Timeout, RequestException
+
+# App
+from network import (
+    CircuitBreakers,
+    HTTPCache,
+    HedgeBudget,
+    HostLatencies,
+    HostLimiter,
+    PageSession,
+    RateLimiter,
+    RetryPolicy,
+    get_outcome
+)
+from network.retry import FAILED, OK, RETRIED, SHORT_CIRCUITED, get_worst_outcome
+from settings import (
+    ADAPTIVE_TIMEOUTS_ENABLED,
+    COLLECTION_MAX_CONCURRENCY,
+    HEDGING_ENABLED,
+    HTTP_CACHE_ENABLED,
+    HTTP_CACHE_MAX_SIZE,
+    HTTP_CACHE_PATH,
+    RATE_LIMIT_ENABLED
+)
+from utils.summary import RunSummary
+
+
+class FetchMixin:
+    """Mixin to inherit in page models.
+
+    Provides the pooled HTTP session, the persistent HTTP cache and the run
+    summary every request of the subclass' page goes through.
+    """
+
+    @property
+    def session(self) -> PageSession:
+        """Pooled HTTP session used for every request of the page.
+
+        Return
+        ------
+        PageSession : Session owned by this page instance.
+        """
+        if getattr(self, '_session', None) is None:
+            self._session = PageSession()
+        return self._session
+
+    @property
+    def run_summary(self) -> RunSummary:
+        """Counters and per category records of the current run.
+
+        Return
+        ------
+        RunSummary : Summary of the current run.
+        """
+        if getattr(self, '_run_summary', None) is None:
+            self._run_summary = RunSummary(self.get_page_name())
+        return self._run_summary
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """Adaptive rate and concurrency limits of the hosts requested by
+        this page, kept between runs of the same page instance.
+
+        Return
+        ------
+        RateLimiter : Limits of every host.
+        None : Rate limiting is disabled.
+        """
+        if not RATE_LIMIT_ENABLED:
+            return None
+        if getattr(self, '_rate_limiter', None) is None:
+            self._rate_limiter = RateLimiter()
+        return self._rate_limiter
+
+    @property
+    def latencies(self) -> HostLatencies:
+        """Latencies of the latest responses of the hosts requested by this
+        page, kept between runs of the same page instance.
+
+        Return
+        ------
+        HostLatencies : Latency tracker of every host.
+        """
+        if getattr(self, '_latencies', None) is None:
+            self._latencies = HostLatencies()
+        return self._latencies
+
+    @property
+    def hedge_budget(self) -> HedgeBudget:
+        """Cap of the hedged requests of this page, kept between runs of the
+        same page instance.
+
+        Return
+        ------
+        HedgeBudget : Hedged requests and requests sent.
+        """
+        if getattr(self, '_hedge_budget', None) is None:
+            self._hedge_budget = HedgeBudget()
+        return self._hedge_budget
+
+    @property
+    def hedge_executor(self) -> ThreadPoolExecutor:
+        """Threads sending the requests that may be hedged, and their
+        hedged duplicates.
+
+        Return
+        ------
+        ThreadPoolExecutor : Thread pool of this page instance.
+        """
+        if getattr(self, '_hedge_executor', None) is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=2 * COLLECTION_MAX_CONCURRENCY)
+        return self._hedge_executor
+
+    def close_hedge_executor(self) -> None:
+        """Release the threads of the hedged requests, without waiting for
+        the losing ones still in flight.
+        """
+        if getattr(self, '_hedge_executor', None) is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+
+    def record_response(self, url: str, start: float, status_code: Optional[int]) -> None:
+        """Report a response to the rate limiter and latency tracker of its
+        host.
+
+        Parameters
+        ----------
+        url : str
+            Requested url.
+
+        start : float
+            time.perf_counter() when the request was sent.
+
+        status_code : int
+            Response status code, None if it timed out.
+        """
+        seconds = time.perf_counter() - start
+        host = urlparse(url).netloc
+        # Timed out requests took at least this long, keeping timeouts from shrinking
+        self.latencies.get(host).record(seconds)
+        if self.rate_limiter is not None:
+            self.rate_limiter.get(host).record(seconds, get_outcome(status_code))
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """When and after how long the failed requests of this page are
+        sent again.
+
+        Return
+        ------
+        RetryPolicy : Retry policy of the page.
+        """
+        if getattr(self, '_retry_policy', None) is None:
+            self._retry_policy = RetryPolicy()
+        return self._retry_policy
+
+    @property
+    def circuit_breakers(self) -> CircuitBreakers:
+        """Circuit breakers of the hosts requested by this page, kept
+        between runs of the same page instance.
+
+        Return
+        ------
+        CircuitBreakers : Circuit breaker of every host.
+        """
+        if getattr(self, '_circuit_breakers', None) is None:
+            self._circuit_breakers = CircuitBreakers()
+        return self._circuit_breakers
+
+    @property
+    def request_outcomes(self) -> Dict[str, str]:
+        """Outcome of the latest request of every url, guarded by
+        request_outcomes_lock.
+
+        Return
+        ------
+        Dict[str, str] : OK, RETRIED, FAILED or SHORT_CIRCUITED of every url.
+        """
+        if getattr(self, '_request_outcomes', None) is None:
+            self.request_outcomes_lock = threading.Lock()
+            self._request_outcomes = {}
+        return self._request_outcomes
+
+    def set_request_outcome(self, url: str, outcome: str) -> None:
+        outcomes = self.request_outcomes
+        with self.request_outcomes_lock:
+            outcomes[url] = outcome
+        self.run_summary.increment(f'requests_{outcome}')
+
+    def pop_requests_outcome(self, urls: List[str]) -> str:
+        """Take the worst outcome of the latest requests of some urls.
+
+        Parameters
+        ----------
+        urls : List[str]
+            Requested urls.
+
+        Return
+        ------
+        str : OK, RETRIED, FAILED or SHORT_CIRCUITED.
+        """
+        outcomes = self.request_outcomes
+        with self.request_outcomes_lock:
+            return get_worst_outcome(outcomes.pop(url) for url in urls if url in outcomes)
+
+    @property
+    def http_cache(self) -> HTTPCache:
+        """Persistent cache of the pages requested by this page.
+
+        Return
+        ------
+        HTTPCache : Cache stored in a directory of its own for this page.
+        """
+        if getattr(self, '_http_cache', None) is None:
+            self._http_cache = HTTPCache(
+                HTTP_CACHE_PATH + self.get_page_name().lower() + '/',
+                HTTP_CACHE_MAX_SIZE
+            )
+        return self._http_cache
+
+    def send_single_request(self, url: str, headers: Optional[dict],
+                            timeout: Optional[float]) -> Tuple[Optional[Response], Optional[int]]:
+        """Send a GET request, reporting its response to the rate limiter
+        and latency tracker of its host.
+
+        Parameters
+        ----------
+        url : str
+            Url of the page to request.
+
+        headers : dict
+            Extra request headers.
+
+        timeout : float
+            Seconds to wait for the response, the session timeout if None.
+
+        Return
+        ------
+        Tuple[Optional[Response], Optional[int]] : Response and its status
+            code, both None if no response was received.
+        """
+        start = time.perf_counter()
+        try:
+            request = self.session.get(url, headers=headers, timeout=timeout)
+        except Timeout:
+            self.record_response(url, start, None)
+            print(
+                f' * Timeout: Get request for {url} timed out after '
+                f'{self.session.timeout if timeout is None else round(timeout, 2)} seconds.'
+            )
+            return None, None
+        except RequestException as e:
+            self.record_response(url, start, 0)
+            print(f' * RequestException: Get request for {url} failed: {e}')
+            return None, None
+        self.record_response(url, start, request.status_code)
+        return request, request.status_code
+
+    def reserve_hedge(self, url: str) -> Optional[HostLimiter]:
+        """Take what a hedged request needs to be sent: a free slot of the
+        concurrency of its host, a token of its rate and room in the hedge
+        budget, so hedges don't add unmetered load on a slow host.
+
+        Parameters
+        ----------
+        url : str
+            Url of the request to hedge.
+
+        Return
+        ------
+        HostLimiter : Limiter of the host, whose slot the hedge must release.
+        None : The request can't be hedged now.
+        """
+        if self.rate_limiter is None:
+            return None
+        limiter = self.rate_limiter.get(urlparse(url).netloc)
+        if not limiter.try_acquire():
+            return None
+        if not limiter.bucket.try_take() or not self.hedge_budget.try_hedge():
+            limiter.release()
+            return None
+        return limiter
+
+    def send_hedge(self, url: str, headers: Optional[dict], timeout: Optional[float],
+                   limiter: HostLimiter) -> Tuple[Optional[Response], Optional[int]]:
+        """Send a hedged request, releasing its slot of the host concurrency
+        once it finishes.
+        """
+        try:
+            return self.send_single_request(url, headers, timeout)
+        finally:
+            limiter.release()
+
+    def send_request(self, url: str,
+                     headers: Optional[dict]) -> Tuple[Optional[Response], Optional[int]]:
+        """Send a GET request with a timeout derived from the latencies of
+        its host, and a hedged duplicate if it's still pending after the p95
+        latency and the host limits and hedge budget allow it.
+
+        Parameters
+        ----------
+        url : str
+            Url of the page to request.
+
+        headers : dict
+            Extra request headers.
+
+        Return
+        ------
+        Tuple[Optional[Response], Optional[int]] : First response not worth
+            retrying and its status code. Otherwise the latest response and
+            status code, both None if no response was received.
+        """
+        tracker = self.latencies.get(urlparse(url).netloc)
+        timeout = tracker.get_timeout(self.session.timeout) if ADAPTIVE_TIMEOUTS_ENABLED else None
+        hedge_after = tracker.get_percentile(95) if HEDGING_ENABLED else None
+        self.hedge_budget.add_request()
+        if hedge_after is None:
+            return self.send_single_request(url, headers, timeout)
+        primary = self.hedge_executor.submit(self.send_single_request, url, headers, timeout)
+        try:
+            return primary.result(timeout=hedge_after)
+        except FutureTimeoutError:
+            limiter = self.reserve_hedge(url)
+            if limiter is None:
+                return primary.result()
+        self.run_summary.increment('hedged_requests')
+        hedge = self.hedge_executor.submit(self.send_hedge, url, headers, timeout, limiter)
+        for future in as_completed([primary, hedge]):
+            request, status_code = future.result()
+            if not self.retry_policy.should_retry(status_code):
+                # A request in flight can't be interrupted, so the slower one
+                # is only cancelled if it didn't start, and left to finish
+                # in the background otherwise
+                (hedge if future is primary else primary).cancel()
+                if future is hedge:
+                    self.run_summary.increment('hedges_won')
+                return request, status_code
+        return request, status_code
+
+    def fetch_url(self, url: str) -> Optional[str]:
+        """Request a page and return its content.
+
+        If the page is cached, the request asks the server to send it only if
+        it changed, and the cached content is returned otherwise. Requests
+        that fail for a reason worth retrying are sent again after a backoff
+        and a token of the host rate, and none are sent while the circuit
+        breaker of the host is open. The outcome of the request is kept in
+        request_outcomes.
+
+        Parameters
+        ----------
+        url : str
+            Url of the page to request.
+
+        Return
+        ------
+        str : HTML content of the page.
+        None : The request failed.
+        """
+        cached = self.http_cache.get(url) if HTTP_CACHE_ENABLED else None
+        headers = None if cached is None else cached.get_conditional_headers()
+        host = urlparse(url).netloc
+        breaker = self.circuit_breakers.get(host)
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                print(f' * CircuitOpen: Get request for {url} not sent, {host} keeps failing.')
+                self.set_request_outcome(url, SHORT_CIRCUITED)
+                return None
+            request, status_code = self.send_request(url, headers)
+            if not self.retry_policy.should_retry(status_code):
+                breaker.record_success()  # The host answers, even if not with the page
+                break
+            breaker.record_failure()
+            if attempt >= self.retry_policy.max_attempts:
+                self.set_request_outcome(url, FAILED)
+                return None
+            self.run_summary.increment('retries')
+            time.sleep(self.retry_policy.get_delay(attempt))
+            if self.rate_limiter is not None:
+                # Only the first attempt is metered by the fetch engine, and
+                # retries follow the rate the failure may have just cut
+                time.sleep(self.rate_limiter.get(host).bucket.reserve())
+        if cached is not None:
+            self.run_summary.increment('cache_revalidations')
+            if request.status_code == 304:
+                self.run_summary.increment('cache_hits')
+                self.set_request_outcome(url, RETRIED if attempt > 1 else OK)
+                return cached.body
+        if request.status_code != 200:
+            print(f' * RequestException: Response code for request {url} was {request.status_code}')
+            self.set_request_outcome(url, FAILED)
+            return None
+        if HTTP_CACHE_ENABLED:
+            self.run_summary.increment('cache_misses')
+            self.http_cache.store(url, request)
+        self.set_request_outcome(url, RETRIED if attempt > 1 else OK)
+        return request.text
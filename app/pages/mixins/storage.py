@@ -0,0 +1,222 @@
+# Python
+from datetime import date, timedelta
+from typing import Generator, List, Optional
+
+# App
+from models import PageCategory
+from settings import COLUMNAR_STORAGE_PATH, DIFFS_STORAGE_PATH
+from storage import (
+    CATEGORIES,
+    ColumnarHistory,
+    CSVStorage,
+    PRODUCTS,
+    PriceIndex,
+    PriceRollups,
+    SnapshotStorage,
+    SQLiteStorage,
+    diff_products,
+    get_snapshot_storage,
+    write_diff
+)
+
+
+class StorageMixin:
+    """Mixin to inherit in page models.
+
+    Provides the storage backend where the subclass' page snapshots are
+    stored, selected with STORAGE_BACKEND.
+    """
+
+    @property
+    def storage(self) -> SnapshotStorage:
+        """Storage backend of the page snapshots.
+
+        Return
+        ------
+        SnapshotStorage : Storage backend.
+        """
+        if getattr(self, '_storage', None) is None:
+            self._storage = get_snapshot_storage(self)
+        return self._storage
+
+    @property
+    def price_index(self) -> PriceIndex:
+        """Price history of the page products stored in its storage backend.
+
+        Return
+        ------
+        PriceIndex : Products price index.
+        """
+        if getattr(self, '_price_index', None) is None:
+            self._price_index = PriceIndex(self, self.storage)
+        return self._price_index
+
+    @property
+    def rollups(self) -> PriceRollups:
+        """Daily and weekly price rollups of the page products stored in its
+        storage backend.
+
+        Return
+        ------
+        PriceRollups : Products price rollups.
+        """
+        if getattr(self, '_rollups', None) is None:
+            self._rollups = PriceRollups(self, self.storage)
+        return self._rollups
+
+    def get_snapshot_date(self) -> date:
+        """Get the date under which the collected data is stored.
+
+        Return
+        ------
+        date : Today's date.
+        """
+        return date.today()
+
+    def get_products_as_of(self, day: date) -> Generator:
+        """Get products from the latest snapshot stored on or before a date.
+
+        Parameters
+        ----------
+        day : date
+            Date to get the products as of.
+
+        Return
+        ------
+        Generator : yield from products in the snapshot.
+        """
+        snapshot_date = self.storage.get_date_as_of(PRODUCTS, day)
+        if snapshot_date is not None:
+            yield from self.storage.read_products(snapshot_date)
+
+    def get_categories_as_of(self, day: date) -> List[PageCategory]:
+        """Get categories from the latest snapshot stored on or before a date.
+
+        Parameters
+        ----------
+        day : date
+            Date to get the categories as of.
+
+        Return
+        ------
+        List[PageCategory] : Categories in the snapshot.
+        """
+        snapshot_date = self.storage.get_date_as_of(CATEGORIES, day)
+        if snapshot_date is None:
+            return []
+        return self.storage.read_categories(snapshot_date)
+
+    def get_latest_products(self) -> Generator:
+        """Get products from the latest snapshot.
+
+        Return
+        ------
+        Generator : yield from products in the snapshot.
+        """
+        return self.get_products_as_of(date.max)
+
+    def get_latest_categories(self) -> List[PageCategory]:
+        """Get categories from the latest snapshot.
+
+        Return
+        ------
+        List[PageCategory] : Categories in the snapshot.
+        """
+        return self.get_categories_as_of(date.max)
+
+    def import_csv_history(self) -> int:
+        """Import every CSV snapshot of the page into the SQLite database.
+
+        Return
+        ------
+        int : Amount of imported snapshots.
+        """
+        print(f'Importing CSV history from {self.__class__.__name__}...')
+        imported = SQLiteStorage(self).import_history(CSVStorage(self))
+        print(f'Finished importing {imported} snapshots from {self.__class__.__name__}.')
+        return imported
+
+    def get_columnar_history_filename(self) -> str:
+        return f'{COLUMNAR_STORAGE_PATH}{self.PRODUCTS_STORAGE_FILENAME}.npz'
+
+    def get_columnar_history(self) -> Optional[ColumnarHistory]:
+        """Load the compacted products history of the page.
+
+        Return
+        ------
+        ColumnarHistory : Compacted history.
+        None : The history wasn't compacted yet.
+        """
+        return ColumnarHistory.load(self.get_columnar_history_filename())
+
+    def compact_history(self) -> str:
+        """Compact the products snapshots stored since the last compaction
+        into the page columnar history.
+
+        Return
+        ------
+        str : Compacted history filename.
+        """
+        print(f'Compacting products history from {self.__class__.__name__}...')
+        filename = self.get_columnar_history_filename()
+        history = ColumnarHistory.compact(self.storage, filename)
+        print(f' * Compacted: {len(history.get_dates())} days, {len(history)} rows.')
+        print(f'Finished compacting products history from {self.__class__.__name__}.')
+        return filename
+
+    def diff_products(self, previous: date, current: date) -> Generator:
+        """Compare the products snapshots stored on or before two dates.
+
+        Parameters
+        ----------
+        previous : date
+            Date of the older snapshot.
+
+        current : date
+            Date of the newer snapshot.
+
+        Return
+        ------
+        Generator : yield from change, previous row and current row tuples,
+            see storage.diff.diff_products.
+        """
+        previous_date = self.storage.get_date_as_of(PRODUCTS, previous)
+        current_date = self.storage.get_date_as_of(PRODUCTS, current)
+        yield from diff_products(
+            self.storage.read_products(previous_date) if previous_date else [],
+            self.storage.read_products(current_date) if current_date else []
+        )
+
+    def store_products_diff(self) -> Optional[str]:
+        """Store the changes between the latest products snapshot and the one
+        before it.
+
+        Return
+        ------
+        str : Diff CSV filename.
+        None : There aren't two snapshots to compare.
+        """
+        print(f'Comparing latest products from {self.__class__.__name__}...')
+        current = self.storage.get_latest_date(PRODUCTS)
+        previous = current and self.storage.get_date_as_of(PRODUCTS, current - timedelta(days=1))
+        if previous is None:
+            print(' * There are no two products snapshots to compare.')
+            return None
+        filename = f'{DIFFS_STORAGE_PATH}{self.PRODUCTS_STORAGE_FILENAME}-diff-{current}.csv'
+        changes = write_diff(filename, self.diff_products(previous, current))
+        print(f' * Changes from {previous} to {current}: {changes}.')
+        print(f'Finished comparing latest products from {self.__class__.__name__}.')
+        return filename
+
+    def rebuild_rollups(self) -> int:
+        """Compute the price rollups of the page from its whole products
+        history.
+
+        Return
+        ------
+        int : Amount of rolled up days.
+        """
+        print(f'Rebuilding price rollups from {self.__class__.__name__}...')
+        days = self.rollups.rebuild()
+        print(f'Finished rolling up {days} days from {self.__class__.__name__}.')
+        return days
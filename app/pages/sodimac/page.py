@@ -1,5 +1,6 @@
 # Python
 from datetime import date
+import re
 from typing import Generator
 
 # BS4
@@ -8,6 +9,7 @@ from bs4.element import ResultSet
 # App
 from pages import BasePage
 from pages.mixins import CollectCategoriesMixin, CollectProductsMixin
+from parsing import ExtractionPlan, Field, get_price, get_product_id
 from .selenium_utils import SodimacSeleniumUtils
 
 
@@ -23,6 +25,42 @@ class SodimacPage(
     CATEGORIES_STORAGE_FILENAME = 'sodimac-categories'
     PRODUCTS_STORAGE_FILENAME = 'sodimac-products'
 
+    # Tag name and attributes of every product in category pages
+    PRODUCTS_LOOKUP = (
+        'div', {'class': 'jsx-411745769 product ie11-product-container'}
+    )
+
+    # Fields of every product node
+    PRODUCT_EXTRACTION_PLAN = ExtractionPlan(
+        fields=[
+            Field('product_url', [('a', {})], attribute='href'),
+            Field('product_name', [('h2', {'class': 'jsx-411745769 product-title'})]),
+            Field(
+                'product_price',
+                [('div', {'class': 'jsx-4135487716 price jsx-175035124'}), ('span', {})],
+                transform=get_price
+            ),
+        ],
+        derived={'product_id': ('product_url', get_product_id)}
+    )
+
+    # Page with the categories menu, the furnitures menu item name and the
+    # url of its nested categories
+    CATEGORIES_PAGE_URL = SodimacSeleniumUtils.PAGE_URL
+    CATEGORIES_MENU_NAME = 'Muebles y Organización'
+    CATEGORY_URL_PATTERN = re.compile(r'/sodimac-ar/(category|landing)/[^/?]+/[^?]*$')
+
+    # Query parameter that selects the page of a category
+    PAGE_QUERY_PARAMETER = 'currentpage'
+
+    # Total products and products per page of the category page state, in its
+    # Next.js __NEXT_DATA__ script as reproduced by the saved category page in
+    # tests/mocks/html. Categories whose first page doesn't match are collected
+    # from that page only, and counted as categories_without_pagination
+    PAGINATION_PATTERN = re.compile(
+        r'"totalProducts":(?P<count>\d+),"perPage":(?P<per_page>\d+)'
+    )
+
     def get_page_name(self) -> str:
         return self.PAGE_NAME
 
@@ -36,7 +74,8 @@ class SodimacPage(
 
     @property
     def furnitures_categories(self) -> Generator:
-        return SodimacSeleniumUtils().get_furnitures_categories()
+        with SodimacSeleniumUtils() as selenium_utils:
+            yield from selenium_utils.get_furnitures_categories()
 
     def get_products_in_page(self) -> ResultSet:
         """Look for products in page.
@@ -45,28 +84,7 @@ class SodimacPage(
         ------
         ResultSet : Products that match with the criteria.
         """
-        return self.soup.find_all(
-            'div',
-            {'class': 'jsx-411745769 product ie11-product-container'}
-        )
-
-    @staticmethod
-    def get_product_id_lookup(soup_product) -> str:
-        return soup_product.find_all('a')[0]['href'].split('/')[5]
-
-    @staticmethod
-    def get_product_url_lookup(soup_product) -> str:
-        return soup_product.find_all('a')[0]['href']
-
-    @staticmethod
-    def get_product_name_lookup(soup_product) -> str:
-        return soup_product.find(
-            'h2', {'class': 'jsx-411745769 product-title'}
-        ).text
-
-    @staticmethod
-    def get_product_price_lookup(soup_product) -> float:
-        fixed_price = soup_product.find(
-            'div', {'class': 'jsx-4135487716 price jsx-175035124'}
-        ).find_all('span')[0].text.replace('.', '').replace(',', '.').replace('$', '')
-        return float(fixed_price)
+        return self.soup.find_all(*self.PRODUCTS_LOOKUP)
+
+    def get_product_extraction_plan(self) -> ExtractionPlan:
+        return self.PRODUCT_EXTRACTION_PLAN
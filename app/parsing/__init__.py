@@ -0,0 +1,10 @@
+from .backends import PARSER_BACKENDS, ParserBackend, get_parser_backend
+from .categories import find_category_links
+from .extractors import ExtractionPlan, Field
+from .fingerprints import (
+    CategoryFingerprints,
+    get_categories_checksum,
+    get_fingerprint,
+    get_products_marker
+)
+from .transforms import get_price, get_product_id
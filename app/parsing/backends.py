@@ -0,0 +1,199 @@
+"""
+HTML parser backends.
+
+Every backend parses a page into a root node that supports the subset of the
+BeautifulSoup API used by pages and extraction plans: find_all(), find(),
+get(), get_text(), item access to attributes and the name, text and children
+attributes.
+"""
+
+# Python
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+# App
+from settings import HTML_PARSER
+from .extractors import Field
+
+# Tag name and attributes to restrict parsing to, like in find_all()
+ParseOnly = Tuple[str, Dict[str, str]]
+
+
+class ParserBackend(ABC):
+    """Base abstract class for HTML parser backends.
+    """
+
+    @abstractmethod
+    def parse(self, html: str, parse_only: Optional[ParseOnly] = None):
+        """Implement how to parse an HTML document.
+
+        Parameters
+        ----------
+        html : str
+            HTML content to parse.
+
+        parse_only : ParseOnly
+            Tag name and attributes of the only elements to build, together
+            with their descendants. The whole document is built if None.
+
+        Return
+        ------
+        Root node of the parsed document.
+        """
+        pass
+
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup backend with any of its tree builders.
+    """
+
+    def __init__(self, features: str) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        features : str
+            BeautifulSoup tree builder, E.G. html.parser or lxml.
+        """
+        self.features = features
+
+    def parse(self, html: str, parse_only: Optional[ParseOnly] = None) -> BeautifulSoup:
+        strainer = None if parse_only is None else SoupStrainer(*parse_only)
+        return BeautifulSoup(html, self.features, parse_only=strainer)
+
+
+class SelectolaxNode:
+    """Adapter of a selectolax node to the BeautifulSoup API used by pages and
+    extraction plans.
+    """
+
+    def __init__(self, node) -> None:
+        self.node = node
+
+    @staticmethod
+    def get_selector(name: str, attrs: Optional[Dict[str, str]] = None) -> str:
+        """Convert find_all() arguments into a CSS selector.
+
+        Like find(), a class that is a single name matches elements having it
+        among their classes, while other values are matched as whole strings.
+
+        Parameters
+        ----------
+        name : str
+            Tag name.
+
+        attrs : Dict[str, str]
+            Attributes the tag must have.
+
+        Return
+        ------
+        str : CSS selector.
+        """
+        attributes = ''.join(
+            f'.{value}' if key == 'class' and ' ' not in value else f'[{key}="{value}"]'
+            for key, value in (attrs or {}).items()
+        )
+        return f'{name}{attributes}'
+
+    def find_fields(self, fields: List[Field]) -> Dict[str, Optional[str]]:
+        """Find the values of extraction plan fields with the C selector
+        engine, which is faster than walking the adapted nodes in Python.
+
+        Parameters
+        ----------
+        fields : List[Field]
+            Fields to find.
+
+        Return
+        ------
+        Dict[str, Optional[str]] : Raw value of every field, None if missing.
+        """
+        values = {}
+        for field in fields:
+            node = self.node.css_first(' '.join(
+                self.get_selector(name, attrs) for name, attrs in field.path
+            ))
+            if node is None:
+                values[field.name] = None
+            elif field.attribute is None:
+                values[field.name] = node.text(deep=True)
+            else:
+                values[field.name] = node.attributes.get(field.attribute)
+        return values
+
+    def find_all(self, name: str, attrs: Optional[Dict[str, str]] = None) -> List['SelectolaxNode']:
+        return [
+            SelectolaxNode(node)
+            for node in self.node.css(self.get_selector(name, attrs))
+        ]
+
+    def find(self, name: str, attrs: Optional[Dict[str, str]] = None) -> Optional['SelectolaxNode']:
+        node = self.node.css_first(self.get_selector(name, attrs))
+        return None if node is None else SelectolaxNode(node)
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+    @property
+    def children(self) -> Iterator['SelectolaxNode']:
+        return (SelectolaxNode(child) for child in self.node.iter())
+
+    def get(self, attribute: str) -> Optional[str]:
+        return self.node.attributes.get(attribute)
+
+    def get_text(self) -> str:
+        return self.node.text(deep=True)
+
+    def __getitem__(self, attribute: str) -> str:
+        value = self.node.attributes.get(attribute)
+        if value is None:
+            raise KeyError(attribute)
+        return value
+
+    @property
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+
+class SelectolaxBackend(ParserBackend):
+    """C based parser and CSS selector engine backend (selectolax).
+    """
+
+    def parse(self, html: str, parse_only: Optional[ParseOnly] = None) -> SelectolaxNode:
+        # Imported here since selectolax is an optional dependency
+        from selectolax.lexbor import LexborHTMLParser
+        root = LexborHTMLParser(html)
+        # The C tree is cheap to build, parse_only would only add the cost of
+        # copying the matching subtrees
+        return SelectolaxNode(root.root)
+
+
+PARSER_BACKENDS: Dict[str, ParserBackend] = {
+    'html.parser': SoupBackend('html.parser'),
+    'lxml': SoupBackend('lxml'),
+    'selectolax': SelectolaxBackend(),
+}
+
+
+def get_parser_backend(name: str = HTML_PARSER) -> ParserBackend:
+    """Get a parser backend by its name.
+
+    Parameters
+    ----------
+    name : str
+        Name of the backend, one of PARSER_BACKENDS keys.
+
+    Return
+    ------
+    ParserBackend : Parser backend.
+    """
+    try:
+        return PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f'Parser backend {name} not found, options: {list(PARSER_BACKENDS)}'
+        )
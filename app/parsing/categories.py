@@ -0,0 +1,119 @@
+"""
+Browserless categories discovery.
+
+The categories menu of a page is usually already in its initial HTML, or in
+the JSON state the page embeds to render it, so it can be read without a
+browser: find the menu item or state node named like the furnitures
+category, and take the category links nested in it.
+"""
+
+# Python
+import json
+from typing import Generator, List, Pattern, Tuple
+from urllib.parse import urljoin
+
+# BeautifulSoup
+from bs4 import BeautifulSoup
+
+# Keys that hold the name of a category in embedded JSON states
+LABEL_KEYS = ('label', 'name', 'title', 'displayName', 'text')
+
+# Category name and url
+CategoryLink = Tuple[str, str]
+
+
+def clean_name(name: str) -> str:
+    return ' '.join(name.replace(' >', '').split())
+
+
+def find_links_in_menu(soup: BeautifulSoup, base_url: str, menu_name: str,
+                       url_pattern: Pattern) -> Generator:
+    """Find the category links in the menu items named like the menu.
+
+    Return
+    ------
+    Generator : yield from category links.
+    """
+    for text in soup.find_all(string=lambda text: clean_name(text) == menu_name):
+        item = text.find_parent('li')
+        if item is None:
+            continue
+        for link in item.find_all('a', href=True):
+            url = urljoin(base_url, link['href'])
+            name = clean_name(link.get_text())
+            if url_pattern.search(url) and name and name != menu_name:
+                yield name, url
+
+
+def walk_state(node) -> Generator:
+    """Yield every object of an embedded JSON state, parents first.
+    """
+    if isinstance(node, dict):
+        yield node
+        node = list(node.values())
+    if isinstance(node, list):
+        for child in node:
+            yield from walk_state(child)
+
+
+def find_links_in_state(soup: BeautifulSoup, base_url: str, menu_name: str,
+                        url_pattern: Pattern) -> Generator:
+    """Find the category links nested in the embedded JSON state objects
+    named like the menu.
+
+    Return
+    ------
+    Generator : yield from category links.
+    """
+    for script in soup.find_all('script', type='application/json'):
+        try:
+            state = json.loads(script.string or '')
+        except ValueError:
+            continue
+        for node in walk_state(state):
+            if not any(node.get(key) == menu_name for key in LABEL_KEYS):
+                continue
+            for child in walk_state(list(node.values())):
+                name = next(
+                    (child[key] for key in LABEL_KEYS if isinstance(child.get(key), str)), None
+                )
+                urls = [
+                    urljoin(base_url, value) for value in child.values()
+                    if isinstance(value, str) and url_pattern.search(urljoin(base_url, value))
+                ]
+                if name and urls and clean_name(name) != menu_name:
+                    yield clean_name(name), urls[0]
+
+
+def find_category_links(html: str, base_url: str, menu_name: str,
+                        url_pattern: Pattern) -> List[CategoryLink]:
+    """Find the categories nested in a menu of a page, in its HTML or in its
+    embedded JSON state.
+
+    Parameters
+    ----------
+    html : str
+        HTML content of the page.
+
+    base_url : str
+        Url of the page, to resolve relative links.
+
+    menu_name : str
+        Name of the menu item the categories are nested in.
+
+    url_pattern : Pattern
+        Regex every category url matches.
+
+    Return
+    ------
+    List[CategoryLink] : Name and absolute url of every category found, in
+        order and without repeated urls.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = list(find_links_in_menu(soup, base_url, menu_name, url_pattern))
+    if not links:
+        links = find_links_in_state(soup, base_url, menu_name, url_pattern)
+    unique = {}
+    for name, url in links:
+        unique.setdefault(url, name)
+    return [(name, url) for url, name in unique.items()]
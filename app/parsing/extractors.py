@@ -0,0 +1,184 @@
+"""
+Compiled single pass product extraction.
+
+Pages declare the fields of their products as selector paths, and an
+ExtractionPlan finds all of them in one walk over each product node instead
+of running one tree search per field.
+"""
+
+# Python
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# App
+from utils.exceptions import MalformedProductException
+
+# Tag name and attributes an element must have, like in find()
+Selector = Tuple[str, Dict[str, str]]
+
+
+class Field:
+    """Product field found by a path of selectors, each one looked for within
+    the element matched by the previous one.
+    """
+
+    def __init__(self, name: str, path: List[Selector],
+                 attribute: Optional[str] = None,
+                 transform: Optional[Callable[[str], Any]] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field.
+
+        path : List[Selector]
+            Selectors from the product node down to the field element. The
+            first matching element in document order is taken at every step.
+
+        attribute : str
+            Attribute to read from the field element, its text if None.
+
+        transform : Callable[[str], Any]
+            Function to convert the read value.
+        """
+        self.name = name
+        self.path = path
+        self.attribute = attribute
+        self.transform = transform
+
+
+def matches(element, selector: Selector) -> bool:
+    """Check if an element has the tag name and attributes of a selector.
+
+    Like find(), a class that is a single name matches elements having it
+    among their classes, while other values are compared as whole strings.
+
+    Parameters
+    ----------
+    element
+        Element built by any parser backend.
+
+    selector : Selector
+        Tag name and attributes to check.
+
+    Return
+    ------
+    bool : True if the element matches the selector.
+    """
+    name, attrs = selector
+    if element.name != name:
+        return False
+    for attribute, expected in attrs.items():
+        value = element.get(attribute)
+        if value is None:
+            return False
+        if attribute == 'class' and ' ' not in expected:
+            classes = value.split() if isinstance(value, str) else value
+            if expected not in classes:
+                return False
+            continue
+        if not isinstance(value, str):  # BeautifulSoup multi-valued attributes
+            value = ' '.join(value)
+        if value != expected:
+            return False
+    return True
+
+
+class ExtractionPlan:
+    """Set of fields extracted together from every product node.
+    """
+
+    def __init__(self, fields: List[Field],
+                 derived: Optional[Dict[str, Tuple[str, Callable[[Any], Any]]]] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        fields : List[Field]
+            Fields to find in the product nodes.
+
+        derived : Dict[str, Tuple[str, Callable[[Any], Any]]]
+            Fields computed from the value of another field, E.G. an ID that
+            is part of an url.
+        """
+        self.fields = fields
+        self.derived = derived or {}
+
+    def walk(self, element, steps: Dict[Field, int], values: Dict[str, Any]) -> bool:
+        """Visit the element descendants in document order, advancing every
+        pending field path when an element matches its next selector.
+
+        Parameters
+        ----------
+        element
+            Element whose descendants are visited.
+
+        steps : Dict[Field, int]
+            Next path step of every pending field.
+
+        values : Dict[str, Any]
+            Values of the fields already found.
+
+        Return
+        ------
+        bool : True once every field has been found.
+        """
+        for child in element.children:
+            name = child.name
+            if name is None:  # Text nodes
+                continue
+            advanced = []
+            for field, step in steps.items():
+                selector = field.path[step]
+                if selector[0] != name or field.name in values or not matches(child, selector):
+                    continue
+                if step == len(field.path) - 1:
+                    values[field.name] = (
+                        child.get_text() if field.attribute is None
+                        else child.get(field.attribute)
+                    )
+                else:
+                    advanced.append(field)
+            if len(values) == len(steps):
+                return True
+            # Advanced paths continue only within the matched element
+            for field in advanced:
+                steps[field] += 1
+            if self.walk(child, steps, values):
+                return True
+            for field in advanced:
+                if field.name not in values:
+                    steps[field] -= 1
+        return False
+
+    def extract(self, node) -> Dict[str, Any]:
+        """Extract every field from a product node.
+
+        Parameters
+        ----------
+        node
+            Product node built by any parser backend.
+
+        Return
+        ------
+        Dict[str, Any] : Value of every field and derived field.
+        """
+        # Backends with a native selector engine find the fields themselves
+        find_fields = getattr(node, 'find_fields', None)
+        if find_fields is not None:
+            values = find_fields(self.fields)
+        else:
+            values = {}
+            self.walk(node, {field: 0 for field in self.fields}, values)
+        missing = [field.name for field in self.fields if values.get(field.name) is None]
+        if missing:
+            raise MalformedProductException(f'Fields {missing} not found in product')
+        try:
+            for field in self.fields:
+                if field.transform is not None:
+                    values[field.name] = field.transform(values[field.name])
+            for name, (source, transform) in self.derived.items():
+                values[name] = transform(values[source])
+        except (IndexError, ValueError) as e:
+            raise MalformedProductException(f'Invalid product field value: {e}')
+        return values
@@ -0,0 +1,156 @@
+"""
+Fingerprints of category products grids, to detect unchanged categories
+without parsing them.
+"""
+
+# Python
+from datetime import date
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+# App
+from .backends import ParseOnly
+
+
+def get_products_marker(products_lookup: ParseOnly) -> str:
+    """Get the attribute text that opens every product element.
+
+    Parameters
+    ----------
+    products_lookup : ParseOnly
+        Tag name and attributes of the products, E.G. PRODUCTS_LOOKUP.
+
+    Return
+    ------
+    str : Attribute text as found in the HTML source.
+    """
+    attribute, value = next(iter(products_lookup[1].items()))
+    return f'{attribute}="{value}"'
+
+
+def get_products_grid(html: str, marker: str) -> str:
+    """Cut the products grid out of a page source, from the first product up
+    to the first script after the last one, leaving out the page parts that
+    change on every request like tracking scripts.
+
+    Parameters
+    ----------
+    html : str
+        HTML content of the page.
+
+    marker : str
+        Attribute text that opens every product element.
+
+    Return
+    ------
+    str : Products grid source, empty if the page has no products.
+    """
+    first = html.find(marker)
+    if first == -1:
+        return ''
+    last = html.rfind(marker)
+    end = html.find('<script', last)
+    return html[first:] if end == -1 else html[first:end]
+
+
+def get_fingerprint(pages: List[str], marker: str) -> str:
+    """Hash the products grids of all the pages of a category.
+
+    Parameters
+    ----------
+    pages : List[str]
+        HTML content of the category pages, in page order.
+
+    marker : str
+        Attribute text that opens every product element.
+
+    Return
+    ------
+    str : Hex digest of the category products grids.
+    """
+    digest = hashlib.sha1()
+    for html in pages:
+        digest.update(get_products_grid(html, marker).encode())
+        digest.update(b'\0')  # Keep page boundaries in the fingerprint
+    return digest.hexdigest()
+
+
+def get_categories_checksum(categories: List) -> str:
+    """Hash the structure of a categories tree, regardless of its order.
+
+    Parameters
+    ----------
+    categories : List[PageCategory]
+        Categories of the page.
+
+    Return
+    ------
+    str : Hex digest of the categories IDs, urls and names.
+    """
+    digest = hashlib.sha1()
+    for category in sorted(
+            (category.category_id, category.category_url, category.category_name)
+            for category in categories):
+        digest.update('\0'.join(category).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class CategoryFingerprints:
+    """Fingerprints of the categories of a page stored together with the
+    date of the products snapshot they were collected for.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        filename : str
+            JSON file where the fingerprints are stored.
+        """
+        self.filename = filename
+
+    def load(self, day: Optional[date]) -> Dict[str, str]:
+        """Get the stored fingerprints if they belong to the products snapshot
+        of the given day.
+
+        Parameters
+        ----------
+        day : date
+            Date of the products snapshot the fingerprints must belong to.
+
+        Return
+        ------
+        Dict[str, str] : Fingerprint of every category ID, empty if the
+            fingerprints belong to another snapshot.
+        """
+        try:
+            with open(self.filename) as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if day is None or stored.get('snapshot') != str(day):
+            return {}
+        return stored.get('categories', {})
+
+    def save(self, day: date, fingerprints: Dict[str, str]) -> None:
+        """Replace the stored fingerprints atomically.
+
+        Parameters
+        ----------
+        day : date
+            Date of the products snapshot the fingerprints belong to.
+
+        fingerprints : Dict[str, str]
+            Fingerprint of every category ID.
+        """
+        path = os.path.dirname(self.filename)
+        os.makedirs(path, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump({'snapshot': str(day), 'categories': fingerprints}, file)
+        os.replace(temporary, self.filename)
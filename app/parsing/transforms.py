@@ -0,0 +1,35 @@
+"""
+Field transforms shared by the extraction plans of the pages.
+"""
+
+
+def get_product_id(product_url: str) -> str:
+    """Get the ID of a product from its url.
+
+    Parameters
+    ----------
+    product_url : str
+        Absolute url of the product, E.G.
+        https://www.falabella.com/falabella-ar/product/123/Name/123.
+
+    Return
+    ------
+    str : Sixth part of the url, the product ID.
+    """
+    return product_url.split('/')[5]
+
+
+def get_price(price: str) -> float:
+    """Convert a price with currency sign, dots as thousands separators and
+    comma as decimal separator into float.
+
+    Parameters
+    ----------
+    price : str
+        Price as displayed, E.G. $ 12.999,90.
+
+    Return
+    ------
+    float : Price value.
+    """
+    return float(price.replace('.', '').replace(',', '.').replace('$', ''))
@@ -25,6 +25,30 @@ def get_selenium_driver_path() -> str:
 # Set the indicated driver for the execution environment
 SELENIUM_DRIVER_PATH = get_selenium_driver_path()
 
+# Find categories in the page HTML or embedded state before falling back to a
+# browser
+CATEGORIES_FAST_PATH = True
+
+# Days the discovered categories are carried forward by store_categories
+# instead of discovered again, 0 to discover them on every run
+CATEGORIES_TTL_DAYS = 7
+
+# Start browsers without a window
+SELENIUM_HEADLESS = True
+
+BROWSER_WINDOW_SIZE = '1920,1080'
+
+# Browsers kept started per process, shared by every page and task
+BROWSER_POOL_SIZE = 1
+
+# URL patterns browsers never request: images, fonts and analytics
+BROWSER_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*hotjar.com*', '*newrelic.com*', '*nr-data.net*',
+]
+
 # Data storage (CSV files) path
 STORAGE_PATH = './data/'
 
@@ -32,6 +56,201 @@ CATEGORIES_STORAGE_PATH = STORAGE_PATH + 'categories/'
 
 PRODUCTS_STORAGE_PATH = STORAGE_PATH + 'products/'
 
+# Snapshots storage backend: 'csv' or 'sqlite'
+STORAGE_BACKEND = 'csv'
+
+SQLITE_DATABASE = STORAGE_PATH + 'burner.sqlite3'
+
+# Rows staged per SQLite transaction before a snapshot is swapped in
+SQLITE_BATCH_SIZE = 1000
+
+# Products price history index, updated whenever products are stored
+PRICE_INDEX_ENABLED = True
+
+PRICE_INDEX_DATABASE = STORAGE_PATH + 'prices.sqlite3'
+
+# Daily and weekly price rollups, updated whenever products are stored
+ROLLUPS_ENABLED = True
+
+ROLLUPS_DATABASE = STORAGE_PATH + 'rollups.sqlite3'
+
+# Processes aggregating snapshots in the rebuildrollups task, one per CPU if
+# None
+ROLLUPS_REBUILD_WORKERS = None
+
+# Products history compacted in NumPy arrays by the compacthistory task
+COLUMNAR_STORAGE_PATH = STORAGE_PATH + 'columnar/'
+
+# Products snapshots diffs stored by the diffproducts task
+DIFFS_STORAGE_PATH = STORAGE_PATH + 'diffs/'
+
+# Rows sorted in memory at once while diffing snapshots
+DIFF_SORT_CHUNK_SIZE = 100000
+
+# Products snapshots storage mode:
+# 'full': a full CSV file per day.
+# 'delta': a full base CSV file every DELTA_BASE_INTERVAL_DAYS, and only the
+# added, removed and changed products of the days in between.
+PRODUCTS_STORAGE_MODE = 'full'
+
+DELTA_BASE_INTERVAL_DAYS = 7
+
+# Tasks scheduling
+# Pages running their tasks at the same time, every page at once if None
+SCHEDULER_WORKERS = None
+
+# Products collection
+# Seconds to wait for a category page response
+REQUEST_TIMEOUT = 15
+
+# Maximum category requests in flight at the same time
+COLLECTION_MAX_CONCURRENCY = 32
+
+# Maximum category requests in flight against the same host
+COLLECTION_MAX_PER_HOST = 16
+
+# Maximum pages fetched from a single category
+COLLECTION_MAX_PAGES_PER_CATEGORY = 100
+
+# Maximum fetched categories waiting to be parsed and written, bounding
+# memory usage regardless of the amount of categories
+COLLECTION_QUEUE_SIZE = 8
+
+# Latency based timeouts and hedging
+# Latest response latencies kept per host, and the ones needed before its
+# timeouts and hedges are derived from them
+LATENCY_SAMPLE_SIZE = 200
+LATENCY_MIN_SAMPLES = 20
+
+# Wait for a response the p99 latency of its host times a multiplier, between
+# a minimum and a maximum, instead of REQUEST_TIMEOUT
+ADAPTIVE_TIMEOUTS_ENABLED = True
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3.0
+ADAPTIVE_TIMEOUT_MIN = 2.0
+ADAPTIVE_TIMEOUT_MAX = 60.0
+
+# Send a duplicate of the requests still pending after the p95 latency of
+# their host and take the first response, hedging at most this share of the
+# requests. Hedges take a slot and a token of the limits of their host, so
+# they are only sent with RATE_LIMIT_ENABLED
+HEDGING_ENABLED = True
+HEDGE_MAX_RATIO = 0.05
+
+# Retries
+# Times a category page request is sent at most, including the first one
+RETRY_MAX_ATTEMPTS = 3
+
+# Seconds to wait before the first retry, doubled on every retry up to
+# RETRY_MAX_BACKOFF
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 8.0
+
+# Wait a random time up to the backoff, so requests that failed together
+# aren't retried together
+RETRY_JITTER = True
+
+# Response status codes worth retrying, besides timeouts and connection errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Failed requests in a row against a host that stop sending requests to it,
+# until a trial request is sent after CIRCUIT_BREAKER_RESET_TIMEOUT seconds
+CIRCUIT_BREAKER_FAILURES = 5
+CIRCUIT_BREAKER_RESET_TIMEOUT = 60.0
+
+# Adaptive rate limiting
+# Limit the requests of every host to a rate and concurrency that grow while
+# it answers fast and without errors, and are cut when it throttles
+RATE_LIMIT_ENABLED = True
+
+# Requests per second sent to a host at first, at least and at most
+RATE_LIMIT_INITIAL_RATE = 8.0
+RATE_LIMIT_MIN_RATE = 0.5
+RATE_LIMIT_MAX_RATE = 64.0
+
+# Requests per second added after every healthy window
+RATE_LIMIT_RATE_STEP = 2.0
+
+# Requests sent at once to a host after idling
+RATE_LIMIT_BURST = COLLECTION_MAX_PER_HOST
+
+# Requests in flight against a host at first, growing by one after every
+# healthy window up to COLLECTION_MAX_PER_HOST
+RATE_LIMIT_INITIAL_CONCURRENCY = 4
+
+# Responses of a host between adjustments
+RATE_LIMIT_WINDOW = 10
+
+# A window is healthy below this p95 latency in seconds and error rate
+RATE_LIMIT_LATENCY_TARGET = 2.0
+RATE_LIMIT_MAX_ERROR_RATE = 0.05
+
+# Rate and concurrency are multiplied by this on throttling or timeouts
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+
+# HTML parsing
+# Parser backend for category pages: 'html.parser', 'lxml' or 'selectolax'
+HTML_PARSER = 'html.parser'
+
+# Build only the products grid elements instead of the whole page tree
+HTML_PARSE_ONLY_PRODUCTS = True
+
+# Parse category pages in a pool of processes while the next ones are fetched,
+# instead of in the process that fetches them
+PARSE_IN_PROCESSES = False
+
+# Parser processes, one per core if None
+PARSE_WORKERS = None
+
+# Content fingerprints
+# Reuse the previous snapshot products of the categories whose products grid
+# didn't change since the previous run, without parsing them
+SHORT_CIRCUIT_UNCHANGED_CATEGORIES = True
+
+FINGERPRINTS_STORAGE_PATH = STORAGE_PATH + 'fingerprints/'
+
+# Products journal
+# Collect the products of every category into a journal of the day first, so
+# a run that dies halfway is resumed by the next run of the same day
+PRODUCTS_JOURNAL_ENABLED = True
+
+JOURNALS_STORAGE_PATH = STORAGE_PATH + 'journals/'
+
+# Run summaries
+# JSON summary of every products collection run, with its counters, per
+# category records and metrics
+RUN_SUMMARIES_STORAGE_PATH = STORAGE_PATH + 'runs/'
+
+# HTTP cache
+# Keep category pages and send conditional requests to download them again
+# only if they changed
+HTTP_CACHE_ENABLED = True
+
+HTTP_CACHE_PATH = STORAGE_PATH + 'http-cache/'
+
+# Maximum bytes of cached pages kept for every page
+HTTP_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+# HTTP sessions
+# Connections kept open against each host, at least COLLECTION_MAX_PER_HOST
+# so that concurrent requests don't discard pooled connections
+HTTP_POOL_SIZE = COLLECTION_MAX_PER_HOST
+
+# Reuse connections between requests instead of closing them
+HTTP_KEEP_ALIVE = True
+
+# Accept gzip and deflate compressed responses
+HTTP_COMPRESSION = True
+
+# Headers sent with every request
+HTTP_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/90.0.4430.85 Safari/537.36'
+    ),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'es-AR,es;q=0.9',
+}
+
 
 def get_csv_writer(file: TextIOWrapper):
     """Get app's CSV writer with the proper configurations.
@@ -0,0 +1,10 @@
+from .backends import CATEGORIES, PRODUCTS, CSVStorage, SnapshotStorage
+from .columnar import ColumnarHistory
+from .diff import diff_products, write_diff
+from .delta import DeltaSnapshots
+from .journal import ProductsJournal
+from .manifest import SnapshotEntry, SnapshotManifest
+from .prices import PriceChange, PriceIndex
+from .rollups import PriceRollups
+from .sqlite import SQLiteStorage
+from .utils import STORAGE_BACKENDS, get_snapshot_storage
@@ -0,0 +1,355 @@
+"""
+Snapshots storage backends.
+
+A snapshot is the collection of products or categories of a page on a given
+date. Every backend stores and reads the snapshots of a single page.
+"""
+
+# Python
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from datetime import date
+import os
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
+
+# App
+from models import PageCategory, PageProduct
+from settings import (
+    CATEGORIES_STORAGE_PATH,
+    PRODUCTS_STORAGE_MODE,
+    PRODUCTS_STORAGE_PATH,
+    get_csv_reader,
+    get_csv_writer
+)
+from .delta import DeltaSnapshots
+from .manifest import SnapshotManifest
+
+# Snapshot kinds
+PRODUCTS = 'products'
+CATEGORIES = 'categories'
+
+
+class SnapshotStorage(ABC):
+    """Base abstract class for snapshots storage backends.
+    """
+
+    def __init__(self, page) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        page : BasePage
+            Page to store the snapshots of.
+        """
+        self.page = page
+
+    @abstractmethod
+    def get_dates(self, kind: str) -> List[date]:
+        """Implement how to find the dates of the stored snapshots.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of snapshot, PRODUCTS or CATEGORIES.
+
+        Return
+        ------
+        List[date] : Sorted dates.
+        """
+        pass
+
+    def get_date_as_of(self, kind: str, day: date) -> Optional[date]:
+        """Get the date of the latest snapshot stored on or before a date.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of snapshot, PRODUCTS or CATEGORIES.
+
+        day : date
+            Date to find the snapshot as of.
+
+        Return
+        ------
+        date : Date of the snapshot.
+        None : No snapshots stored on or before that date.
+        """
+        dates = self.get_dates(kind)
+        index = bisect_right(dates, day)
+        return dates[index - 1] if index else None
+
+    def get_latest_date(self, kind: str) -> Optional[date]:
+        """Get the date of the latest stored snapshot.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of snapshot, PRODUCTS or CATEGORIES.
+
+        Return
+        ------
+        date : Date of the latest snapshot.
+        None : No snapshots stored yet.
+        """
+        return self.get_date_as_of(kind, date.max)
+
+    @abstractmethod
+    def write_products(self, day: date, products: Iterable[PageProduct]) -> str:
+        """Implement how to store the products snapshot of a day, replacing
+        the stored one if any.
+
+        Return
+        ------
+        str : Location of the stored snapshot.
+        """
+        pass
+
+    @abstractmethod
+    def read_products(self, day: date) -> Generator:
+        """Implement how to read the products snapshot of a day.
+
+        Return
+        ------
+        Generator : yield from products in the snapshot.
+        """
+        pass
+
+    def read_category_products(self, day: date, category_id: str) -> Generator:
+        """Read the products of a category from the snapshot of a day.
+
+        Return
+        ------
+        Generator : yield from products of the category in the snapshot.
+        """
+        for product in self.read_products(day):
+            if product.category_id == category_id:
+                yield product
+
+    @abstractmethod
+    def write_categories(self, day: date, categories: Iterable[PageCategory]) -> str:
+        """Implement how to store the categories snapshot of a day, replacing
+        the stored one if any.
+
+        Return
+        ------
+        str : Location of the stored snapshot.
+        """
+        pass
+
+    @abstractmethod
+    def read_categories(self, day: date) -> List[PageCategory]:
+        """Implement how to read the categories snapshot of a day.
+
+        Return
+        ------
+        List[PageCategory] : Categories in the snapshot.
+        """
+        pass
+
+    def get_options(self) -> Dict[str, Any]:
+        """Get the constructor arguments besides the page, to create the
+        same backend in another process.
+
+        Return
+        ------
+        Dict[str, Any] : Keyword arguments of the constructor.
+        """
+        return {}
+
+
+class CSVStorage(SnapshotStorage):
+    """Snapshots stored in a CSV file per day, or as deltas between full
+    base files if PRODUCTS_STORAGE_MODE is 'delta'.
+    """
+
+    def __init__(self, page, products_path: Optional[str] = None,
+                 categories_path: Optional[str] = None,
+                 mode: Optional[str] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        page : BasePage
+            Page to store the snapshots of.
+
+        products_path : str
+            Products directory, PRODUCTS_STORAGE_PATH by default.
+
+        categories_path : str
+            Categories directory, CATEGORIES_STORAGE_PATH by default.
+
+        mode : str
+            Products storage mode, PRODUCTS_STORAGE_MODE by default.
+        """
+        super().__init__(page)
+        self.paths = {
+            PRODUCTS: PRODUCTS_STORAGE_PATH if products_path is None else products_path,
+            CATEGORIES: CATEGORIES_STORAGE_PATH if categories_path is None else categories_path,
+        }
+        self.prefixes = {
+            PRODUCTS: page.PRODUCTS_STORAGE_FILENAME,
+            CATEGORIES: page.CATEGORIES_STORAGE_FILENAME,
+        }
+        self.mode = PRODUCTS_STORAGE_MODE if mode is None else mode
+        self.deltas = DeltaSnapshots(
+            self.prefixes[PRODUCTS], self.paths[PRODUCTS], page_name=page.PAGE_NAME
+        )
+        self.manifests = {
+            PRODUCTS: self.deltas.manifests[False],
+            CATEGORIES: SnapshotManifest(
+                self.paths[CATEGORIES], self.prefixes[CATEGORIES], page.PAGE_NAME, CATEGORIES
+            ),
+        }
+
+    def get_options(self) -> Dict[str, Any]:
+        return {
+            'products_path': self.paths[PRODUCTS],
+            'categories_path': self.paths[CATEGORIES],
+            'mode': self.mode,
+        }
+
+    def get_filename(self, kind: str, day: date) -> str:
+        return f'{self.paths[kind]}{self.prefixes[kind]}-{day}.csv'
+
+    def get_full_dates(self, kind: str) -> List[date]:
+        """Find the dates of the snapshots stored in full CSV files in their
+        manifest.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of snapshot, PRODUCTS or CATEGORIES.
+
+        Return
+        ------
+        List[date] : Sorted dates.
+        """
+        return self.manifests[kind].get_dates()
+
+    def get_dates(self, kind: str) -> List[date]:
+        dates = self.get_full_dates(kind)
+        if kind == PRODUCTS and self.mode == 'delta':
+            dates = sorted(set(dates) | set(self.deltas.get_dates(delta=True)))
+        return dates
+
+    def get_date_as_of(self, kind: str, day: date) -> Optional[date]:
+        entries = [self.manifests[kind].get_as_of(day)]
+        if kind == PRODUCTS and self.mode == 'delta':
+            entries.append(self.deltas.manifests[True].get_as_of(day))
+        dates = [entry.day for entry in entries if entry is not None]
+        return max(dates) if dates else None
+
+    @staticmethod
+    def read_rows(filename: str) -> Generator:
+        """Read the rows of a CSV file, skipping its header.
+
+        Return
+        ------
+        Generator : yield from rows.
+        """
+        with open(filename) as file:
+            reader = get_csv_reader(file)
+            next(reader, None)
+            yield from reader
+
+    def write_products(self, day: date, products: Iterable[PageProduct]) -> str:
+        filename = self.get_filename(PRODUCTS, day)
+        # Replaced at once, a run that dies while writing leaves the old one
+        temporary = filename + '.tmp'
+        with open(temporary, mode='w') as file:
+            file = get_csv_writer(file)
+            file.writerow([header for header in PageProduct.CSV_HEADERS])
+            for product in products:
+                file.writerow([
+                    product.page_name,
+                    product.category_id,
+                    product.product_id,
+                    product.product_url,
+                    product.product_name,
+                    product.product_price,
+                ])
+        os.replace(temporary, filename)
+        self.manifests[PRODUCTS].record(day, filename)
+        if self.mode == 'delta':
+            self.deltas.compact(day)
+        return filename
+
+    def read_products(self, day: date) -> Generator:
+        if self.mode == 'delta':
+            yield from self.deltas.read(day)
+            return
+        for row in self.read_rows(self.get_filename(PRODUCTS, day)):
+            yield PageProduct.from_csv_row(row)
+
+    def read_category_products(self, day: date, category_id: str) -> Generator:
+        """Read the products of a category from the snapshot of a day,
+        reading only the rows of the category from full CSV files.
+        """
+        filename = self.get_filename(PRODUCTS, day)
+        if not os.path.isfile(filename):
+            yield from super().read_category_products(day, category_id)
+            return
+        if getattr(self, 'category_ranges', (None, ))[0] != filename:
+            self.category_ranges = (filename, self.get_category_ranges(filename))
+        with open(filename, 'rb') as file:
+            for start, end in self.category_ranges[1].get(category_id, []):
+                file.seek(start)
+                rows = file.read(end - start).decode().splitlines()
+                for row in get_csv_reader(rows):
+                    yield PageProduct.from_csv_row(row)
+
+    @staticmethod
+    def get_category_ranges(filename: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Find the byte ranges of the rows of every category in a products
+        CSV file, where the products of a category are written together.
+
+        Parameters
+        ----------
+        filename : str
+            Path of the products CSV file.
+
+        Return
+        ------
+        Dict[str, List[Tuple[int, int]]] : Start and end offsets of the rows
+            of every category ID.
+        """
+        ranges = {}
+        with open(filename, 'rb') as file:
+            offset = len(file.readline())  # Skip the CSV header
+            category_id, start = None, offset
+            for line in iter(file.readline, b''):
+                row = next(get_csv_reader([line.decode()]))
+                if row[1] != category_id:
+                    if category_id is not None:
+                        ranges.setdefault(category_id, []).append((start, offset))
+                    category_id, start = row[1], offset
+                offset += len(line)
+            if category_id is not None:
+                ranges.setdefault(category_id, []).append((start, offset))
+        return ranges
+
+    def write_categories(self, day: date, categories: Iterable[PageCategory]) -> str:
+        filename = self.get_filename(CATEGORIES, day)
+        with open(filename, mode='w') as file:
+            file = get_csv_writer(file)
+            file.writerow([header for header in PageCategory.CSV_HEADERS])
+            for category in categories:
+                file.writerow([
+                    category.page_name,
+                    category.category_name,
+                    category.category_url,
+                    category.category_id
+                ])
+        self.manifests[CATEGORIES].record(day, filename)
+        return filename
+
+    def read_categories(self, day: date) -> List[PageCategory]:
+        return [
+            PageCategory(
+                page_name=row[0],
+                category_name=row[1],
+                category_url=row[2],
+                category_id=row[3]
+            )
+            for row in self.read_rows(self.get_filename(CATEGORIES, day))
+        ]
@@ -0,0 +1,275 @@
+"""
+Columnar products history.
+
+The products snapshots history of a page compacted into NumPy arrays with a
+row per stored product per day: product IDs, names and category IDs are
+dictionary-encoded as integer indexes into arrays of unique values, prices
+are a float array and dates are integer day offsets from the first stored
+day. Rows are sorted by product and date, so per product aggregates are
+vectorized reductions over contiguous segments.
+"""
+
+# Python
+from datetime import date, timedelta
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# NumPy
+import numpy as np
+
+# App
+from .backends import PRODUCTS, SnapshotStorage
+
+# Dictionary-encoded columns and their values array
+ENCODED_COLUMNS = {
+    'products': 'product_ids',
+    'names': 'product_names',
+    'categories': 'category_ids',
+}
+
+
+class ColumnarHistory:
+    """Products history of a page in columnar arrays.
+    """
+
+    def __init__(self, base_date: date, arrays: Dict[str, np.ndarray]) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        base_date : date
+            Date of the day offset 0.
+
+        arrays : Dict[str, np.ndarray]
+            Row columns days, products, names, categories and prices, the
+            product_ids, product_names and category_ids values of the encoded
+            columns, and the compacted_days offsets.
+        """
+        self.base_date = base_date
+        self.arrays = arrays
+        self.product_indexes = {
+            product_id: index for index, product_id in enumerate(arrays['product_ids'])
+        }
+
+    def __len__(self) -> int:
+        return len(self.arrays['prices'])
+
+    @classmethod
+    def load(cls, filename: str) -> Optional['ColumnarHistory']:
+        """Load a compacted history.
+
+        Return
+        ------
+        ColumnarHistory : Loaded history.
+        None : The history wasn't compacted yet.
+        """
+        if not os.path.isfile(filename):
+            return None
+        with np.load(filename) as file:
+            arrays = {name: file[name] for name in file.files if name != 'base_date'}
+            base_date = date.fromisoformat(str(file['base_date']))
+        return cls(base_date, arrays)
+
+    def save(self, filename: str) -> None:
+        """Replace the compacted history file atomically.
+        """
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        temporary = f'{filename}.{os.getpid()}.tmp'
+        with open(temporary, mode='wb') as file:
+            np.savez(file, base_date=np.array(str(self.base_date)), **self.arrays)
+        os.replace(temporary, filename)
+
+    @classmethod
+    def compact(cls, storage: SnapshotStorage, filename: str) -> 'ColumnarHistory':
+        """Compact the products snapshots stored after the latest compacted
+        day into the history file, together with the latest compacted day
+        again, since it may have been stored again by a same day rerun. The
+        whole history is compacted if an older day was stored since.
+
+        Parameters
+        ----------
+        storage : SnapshotStorage
+            Backend where the page products snapshots are stored.
+
+        filename : str
+            Compacted history file.
+
+        Return
+        ------
+        ColumnarHistory : Updated history.
+        """
+        history = cls.load(filename)
+        stored = storage.get_dates(PRODUCTS)
+        if history is not None:
+            compacted = history.get_dates()
+            if stored[:len(compacted)] != compacted:
+                history = None
+            elif compacted:
+                # The latest compacted day may have been stored again since
+                history = history.remove_day(compacted[-1])
+                stored = stored[len(compacted) - 1:]
+        if not stored:
+            return history if history is not None else cls.empty(date.today())
+        if history is None:
+            history = cls.empty(stored[0])
+        history = history.append((day, storage.read_products(day)) for day in stored)
+        history.save(filename)
+        return history
+
+    @classmethod
+    def empty(cls, base_date: date) -> 'ColumnarHistory':
+        return cls(base_date, {
+            'compacted_days': np.array([], dtype=np.int32),
+            'days': np.array([], dtype=np.int32),
+            'products': np.array([], dtype=np.int32),
+            'names': np.array([], dtype=np.int32),
+            'categories': np.array([], dtype=np.int32),
+            'prices': np.array([], dtype=np.float64),
+            'product_ids': np.array([], dtype=str),
+            'product_names': np.array([], dtype=str),
+            'category_ids': np.array([], dtype=str),
+        })
+
+    def append(self, snapshots: Iterable[Tuple[date, Iterable]]) -> 'ColumnarHistory':
+        """Build the history with the products of more days added.
+
+        Parameters
+        ----------
+        snapshots : Iterable[Tuple[date, Iterable]]
+            Date and products of every day to add, after the compacted ones.
+
+        Return
+        ------
+        ColumnarHistory : New history.
+        """
+        dictionaries = {
+            column: {value: index for index, value in enumerate(self.arrays[values])}
+            for column, values in ENCODED_COLUMNS.items()
+        }
+        columns = {column: [] for column in ('days', 'prices', *ENCODED_COLUMNS)}
+        compacted_days = []
+        for day, products in snapshots:
+            offset = (day - self.base_date).days
+            compacted_days.append(offset)
+            for product in products:
+                columns['days'].append(offset)
+                columns['prices'].append(float(product.product_price))
+                for column, value in (('products', product.product_id),
+                                      ('names', product.product_name),
+                                      ('categories', product.category_id)):
+                    dictionary = dictionaries[column]
+                    columns[column].append(dictionary.setdefault(value, len(dictionary)))
+        arrays = {
+            'compacted_days': np.concatenate([
+                self.arrays['compacted_days'], np.array(compacted_days, dtype=np.int32)
+            ]),
+            'days': np.concatenate([self.arrays['days'], np.array(columns['days'], dtype=np.int32)]),
+            'prices': np.concatenate([
+                self.arrays['prices'], np.array(columns['prices'], dtype=np.float64)
+            ]),
+        }
+        for column, values in ENCODED_COLUMNS.items():
+            arrays[column] = np.concatenate([
+                self.arrays[column], np.array(columns[column], dtype=np.int32)
+            ])
+            arrays[values] = np.array(list(dictionaries[column]), dtype=str)
+        order = np.lexsort((arrays['days'], arrays['products']))
+        for column in ('days', 'prices', *ENCODED_COLUMNS):
+            arrays[column] = arrays[column][order]
+        return ColumnarHistory(self.base_date, arrays)
+
+    def remove_day(self, day: date) -> 'ColumnarHistory':
+        """Build the history without the products of a compacted day.
+
+        Parameters
+        ----------
+        day : date
+            Compacted day to remove.
+
+        Return
+        ------
+        ColumnarHistory : New history.
+        """
+        offset = (day - self.base_date).days
+        keep = self.arrays['days'] != offset
+        arrays = dict(self.arrays)
+        for column in ('days', 'prices', *ENCODED_COLUMNS):
+            arrays[column] = self.arrays[column][keep]
+        arrays['compacted_days'] = self.arrays['compacted_days'][
+            self.arrays['compacted_days'] != offset
+        ]
+        return ColumnarHistory(self.base_date, arrays)
+
+    def get_dates(self) -> List[date]:
+        return [
+            self.base_date + timedelta(days=int(day)) for day in self.arrays['compacted_days']
+        ]
+
+    def get_series(self, product_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the price of a product on every day it was listed.
+
+        Parameters
+        ----------
+        product_id : str
+            ID of the product.
+
+        Return
+        ------
+        Tuple[np.ndarray, np.ndarray] : Dates and prices.
+        """
+        index = self.product_indexes.get(product_id)
+        products = self.arrays['products']
+        start, end = np.searchsorted(products, [index, index + 1]) if index is not None else (0, 0)
+        days = self.arrays['days'][start:end]
+        dates = np.datetime64(self.base_date, 'D') + days.astype('timedelta64[D]')
+        return dates, self.arrays['prices'][start:end]
+
+    def get_product_stats(self, start: Optional[date] = None,
+                          end: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """Aggregate the price of every product listed in a date range.
+
+        Parameters
+        ----------
+        start : date
+            First day of the range, the first compacted day by default.
+
+        end : date
+            Last day of the range, the latest compacted day by default.
+
+        Return
+        ------
+        Dict[str, np.ndarray] : Arrays aligned by product with their
+            product_id, count of rows, min, max, mean, first and last price,
+            and change, the percent change from the first to the last price.
+        """
+        days = self.arrays['days']
+        mask = np.ones(len(days), dtype=bool)
+        if start is not None:
+            mask &= days >= (start - self.base_date).days
+        if end is not None:
+            mask &= days <= (end - self.base_date).days
+        products = self.arrays['products'][mask]
+        prices = self.arrays['prices'][mask]
+        if not len(prices):
+            empty = np.array([], dtype=np.float64)
+            return {
+                'product_id': np.array([], dtype=str), 'count': np.array([], dtype=np.int64),
+                'min': empty, 'max': empty, 'mean': empty, 'first': empty, 'last': empty,
+                'change': empty,
+            }
+        # Rows are sorted by product, so every product is a contiguous segment
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(products)) + 1])
+        ends = np.concatenate([starts[1:], [len(prices)]])
+        first, last = prices[starts], prices[ends - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(first != 0, (last - first) / first * 100, 0.0)
+        return {
+            'product_id': self.arrays['product_ids'][products[starts]],
+            'count': ends - starts,
+            'min': np.minimum.reduceat(prices, starts),
+            'max': np.maximum.reduceat(prices, starts),
+            'mean': np.add.reduceat(prices, starts) / (ends - starts),
+            'first': first,
+            'last': last,
+            'change': change,
+        }
@@ -0,0 +1,254 @@
+"""
+Delta products snapshots.
+
+Instead of a full CSV file per day, a full base snapshot is kept every
+DELTA_BASE_INTERVAL_DAYS and the days in between only keep the products that
+were added, removed or changed since the previous stored day. The latest day
+is always kept in full until a newer day is stored, so reading the latest
+products is as cheap as with full snapshots.
+"""
+
+# Python
+from datetime import date
+import os
+import re
+from typing import Dict, Generator, Iterable, List, Optional, Tuple
+
+# App
+from models import PageProduct
+from settings import (
+    DELTA_BASE_INTERVAL_DAYS,
+    PRODUCTS_STORAGE_PATH,
+    get_csv_reader,
+    get_csv_writer
+)
+from .manifest import SnapshotManifest
+
+# Products are identified by their page name and product ID
+ProductKey = Tuple[str, str]
+
+
+class DeltaSnapshots:
+    """Products snapshots of a page stored as periodic full bases and daily
+    deltas.
+    """
+
+    ADDED = 'ADDED'
+    REMOVED = 'REMOVED'
+    CHANGED = 'CHANGED'
+
+    CSV_HEADERS = ['CHANGE'] + PageProduct.CSV_HEADERS
+
+    def __init__(self, filename_prefix: str, path: str = PRODUCTS_STORAGE_PATH,
+                 base_interval: int = DELTA_BASE_INTERVAL_DAYS,
+                 page_name: str = '') -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        filename_prefix : str
+            Name of the page snapshots before their date, E.G.
+            falabella-products.
+
+        path : str
+            Directory of the full snapshots. Deltas are stored in its deltas
+            subdirectory.
+
+        base_interval : int
+            Minimum days between full base snapshots.
+
+        page_name : str
+            Name of the page recorded in the snapshots manifests.
+        """
+        self.filename_prefix = filename_prefix
+        self.path = path
+        self.deltas_path = path + 'deltas/'
+        self.base_interval = base_interval
+        self.filename_pattern = re.compile(
+            re.escape(filename_prefix) + r'-(\d{4}-\d{2}-\d{2})\.csv$'
+        )
+        self.manifests = {
+            False: SnapshotManifest(path, filename_prefix, page_name, 'products'),
+            True: SnapshotManifest(self.deltas_path, filename_prefix, page_name, 'products-delta'),
+        }
+
+    def get_filename(self, day: date, delta: bool = False) -> str:
+        path = self.deltas_path if delta else self.path
+        return f'{path}{self.filename_prefix}-{day}.csv'
+
+    def get_date(self, filename: str) -> Optional[date]:
+        """Get the date of a snapshot from its filename.
+
+        Parameters
+        ----------
+        filename : str
+            Filename or path of the snapshot.
+
+        Return
+        ------
+        date : Date of the snapshot.
+        None : The filename doesn't belong to a snapshot of this page.
+        """
+        match = self.filename_pattern.match(os.path.basename(filename))
+        return None if match is None else date.fromisoformat(match.group(1))
+
+    def get_dates(self, delta: bool = False) -> List[date]:
+        """Find the dates of the stored full or delta snapshots in their
+        manifest.
+
+        Parameters
+        ----------
+        delta : bool
+            Whether to find delta snapshots instead of full ones.
+
+        Return
+        ------
+        List[date] : Sorted dates.
+        """
+        return self.manifests[delta].get_dates()
+
+    @staticmethod
+    def get_key(row: List[str]) -> ProductKey:
+        return row[0], row[2]
+
+    def read_full(self, day: date) -> Generator:
+        """Read the rows of a full snapshot, skipping its header.
+
+        Return
+        ------
+        Generator : yield from product rows.
+        """
+        with open(self.get_filename(day)) as file:
+            reader = get_csv_reader(file)
+            next(reader, None)
+            yield from reader
+
+    def read_delta(self, day: date) -> Generator:
+        """Read the changes of a delta snapshot, skipping its header.
+
+        Return
+        ------
+        Generator : yield from change and product row tuples.
+        """
+        with open(self.get_filename(day, delta=True)) as file:
+            reader = get_csv_reader(file)
+            next(reader, None)
+            for row in reader:
+                yield row[0], row[1:]
+
+    def rebuild(self, day: date) -> Optional[Dict[ProductKey, List[str]]]:
+        """Rebuild the full view of a stored day from its nearest previous
+        full snapshot and the deltas stored after it.
+
+        Parameters
+        ----------
+        day : date
+            Stored day to rebuild.
+
+        Return
+        ------
+        Dict[ProductKey, List[str]] : Product row of every product key.
+        None : The day is not stored.
+        """
+        if self.manifests[False].get(day) is not None:
+            return {self.get_key(row): row for row in self.read_full(day)}
+        if self.manifests[True].get(day) is None:
+            return None
+        base = self.manifests[False].get_as_of(day)
+        if base is None:
+            return None
+        base = base.day
+        delta_dates = self.get_dates(delta=True)
+        products = {self.get_key(row): row for row in self.read_full(base)}
+        for delta_date in delta_dates:
+            if base < delta_date <= day:
+                self.apply_delta(products, self.read_delta(delta_date))
+        return products
+
+    def apply_delta(self, products: Dict[ProductKey, List[str]],
+                    changes: Iterable[Tuple[str, List[str]]]) -> None:
+        """Apply the changes of a delta to a full view, in place.
+        """
+        for change, row in changes:
+            if change == self.REMOVED:
+                products.pop(self.get_key(row), None)
+            else:
+                products[self.get_key(row)] = row
+
+    def read(self, day: date) -> Generator:
+        """Read the products of a stored day, full or delta.
+
+        Parameters
+        ----------
+        day : date
+            Stored day to read.
+
+        Return
+        ------
+        Generator : yield from products of the day.
+        """
+        if self.manifests[False].get(day) is not None:  # Stream it instead of rebuilding it
+            rows = self.read_full(day)
+        else:
+            rows = (self.rebuild(day) or {}).values()
+        for row in rows:
+            yield PageProduct.from_csv_row(row)
+
+    def get_changes(self, previous: Dict[ProductKey, List[str]],
+                    current: Dict[ProductKey, List[str]]) -> Generator:
+        """Compare two full views.
+
+        Return
+        ------
+        Generator : yield from change and product row tuples.
+        """
+        for key, row in current.items():
+            previous_row = previous.get(key)
+            if previous_row is None:
+                yield self.ADDED, row
+            elif previous_row != row:
+                yield self.CHANGED, row
+        for key, row in previous.items():
+            if key not in current:
+                yield self.REMOVED, row
+
+    def compact(self, day: date) -> bool:
+        """Replace the full snapshot of the latest day before the given one by
+        a delta, unless it is a base snapshot.
+
+        It's called once the given day full snapshot has been stored, which
+        becomes the new latest day.
+
+        Parameters
+        ----------
+        day : date
+            Day that was just stored in full.
+
+        Return
+        ------
+        bool : True if a full snapshot was replaced by a delta.
+        """
+        full_dates = [full_date for full_date in self.get_dates() if full_date < day]
+        if len(full_dates) < 2:  # The first snapshot is always a base
+            return False
+        previous_day, previous_base = full_dates[-1], full_dates[-2]
+        if (previous_day - previous_base).days >= self.base_interval:
+            return False
+        stored_dates = sorted(set(full_dates[:-1] + [
+            delta_date for delta_date in self.get_dates(delta=True)
+            if delta_date < previous_day
+        ]))
+        previous = self.rebuild(stored_dates[-1])
+        current = {self.get_key(row): row for row in self.read_full(previous_day)}
+        os.makedirs(self.deltas_path, exist_ok=True)
+        filename = self.get_filename(previous_day, delta=True)
+        with open(filename + '.tmp', mode='w') as file:
+            writer = get_csv_writer(file)
+            writer.writerow(self.CSV_HEADERS)
+            for change, row in self.get_changes(previous, current):
+                writer.writerow([change] + row)
+        os.replace(filename + '.tmp', filename)
+        self.manifests[True].record(previous_day, filename)
+        os.remove(self.get_filename(previous_day))
+        self.manifests[False].discard(previous_day)
+        return True
@@ -0,0 +1,176 @@
+"""
+Products snapshots diff.
+
+Two snapshots of a page are compared by sorting both by product ID with an
+external sort, which keeps at most a chunk of rows in memory and spills sorted
+runs to temporary CSV files, and merge-joining the sorted streams. Memory
+stays bounded by the chunk size regardless of the catalog size.
+"""
+
+# Python
+import heapq
+from itertools import groupby, islice
+import os
+from operator import itemgetter
+from tempfile import TemporaryDirectory, mkdtemp
+from typing import Generator, Iterable, List, Optional, Tuple
+
+# App
+from models import PageProduct
+from settings import DIFF_SORT_CHUNK_SIZE, get_csv_reader, get_csv_writer
+
+ADDED = 'ADDED'
+REMOVED = 'REMOVED'
+PRICE_CHANGED = 'PRICE_CHANGED'
+
+CSV_HEADERS = [
+    'CHANGE', 'STORE_NAME', 'CATEGORY_ID', 'PRODUCT_ID', 'PRODUCT_URL', 'PRODUCT_NAME',
+    'PREVIOUS_PRICE', 'PRODUCT_PRICE'
+]
+
+# Rows are sorted and joined by product ID
+get_product_id = itemgetter(2)
+
+
+def get_row(product: PageProduct) -> List[str]:
+    return [
+        product.page_name,
+        product.category_id,
+        product.product_id,
+        product.product_url,
+        product.product_name,
+        str(product.product_price),
+    ]
+
+
+def read_run(filename: str) -> Generator:
+    with open(filename, newline='') as file:
+        yield from get_csv_reader(file)
+
+
+def external_sort(rows: Iterable[List[str]], directory: str,
+                  chunk_size: Optional[int] = None) -> Generator:
+    """Sort rows by product ID, keeping at most a chunk of them in memory.
+
+    Parameters
+    ----------
+    rows : Iterable[List[str]]
+        Product rows to sort.
+
+    directory : str
+        Directory where sorted runs are spilled, alive while the sorted rows
+        are read.
+
+    chunk_size : int
+        Rows sorted in memory at once, DIFF_SORT_CHUNK_SIZE by default.
+
+    Return
+    ------
+    Generator : yield from rows sorted by product ID.
+    """
+    chunk_size = DIFF_SORT_CHUNK_SIZE if chunk_size is None else chunk_size
+    directory = mkdtemp(dir=directory)
+    rows = iter(rows)
+    runs = []
+    while True:
+        chunk = sorted(islice(rows, chunk_size), key=get_product_id)
+        if not chunk:
+            break
+        if not runs and len(chunk) < chunk_size:  # Everything fits in memory
+            yield from chunk
+            return
+        filename = os.path.join(directory, f'run-{len(runs)}.csv')
+        with open(filename, mode='w', newline='') as file:
+            get_csv_writer(file).writerows(chunk)
+        runs.append(filename)
+    yield from heapq.merge(*(read_run(run) for run in runs), key=get_product_id)
+
+
+def unique_products(rows: Iterable[List[str]]) -> Generator:
+    """Keep the first row of every product listed in many categories.
+
+    Parameters
+    ----------
+    rows : Iterable[List[str]]
+        Product rows sorted by product ID.
+
+    Return
+    ------
+    Generator : yield from product ID and row tuples.
+    """
+    for product_id, product_rows in groupby(rows, key=get_product_id):
+        yield product_id, next(product_rows)
+
+
+def diff_products(previous: Iterable[PageProduct], current: Iterable[PageProduct],
+                  chunk_size: Optional[int] = None) -> Generator:
+    """Find the products added, removed and with a different price between
+    two snapshots.
+
+    Parameters
+    ----------
+    previous : Iterable[PageProduct]
+        Products of the older snapshot.
+
+    current : Iterable[PageProduct]
+        Products of the newer snapshot.
+
+    chunk_size : int
+        Rows sorted in memory at once, DIFF_SORT_CHUNK_SIZE by default.
+
+    Return
+    ------
+    Generator : yield from change, previous row and current row tuples, with
+        None as the missing row of added and removed products, sorted by
+        product ID.
+    """
+    with TemporaryDirectory() as directory:
+        previous_rows = unique_products(external_sort(
+            (get_row(product) for product in previous), directory, chunk_size
+        ))
+        current_rows = unique_products(external_sort(
+            (get_row(product) for product in current), directory, chunk_size
+        ))
+        previous_row, current_row = next(previous_rows, None), next(current_rows, None)
+        while previous_row is not None or current_row is not None:
+            if current_row is None or (
+                    previous_row is not None and previous_row[0] < current_row[0]):
+                yield REMOVED, previous_row[1], None
+                previous_row = next(previous_rows, None)
+            elif previous_row is None or current_row[0] < previous_row[0]:
+                yield ADDED, None, current_row[1]
+                current_row = next(current_rows, None)
+            else:
+                if float(previous_row[1][5]) != float(current_row[1][5]):
+                    yield PRICE_CHANGED, previous_row[1], current_row[1]
+                previous_row, current_row = next(previous_rows, None), next(current_rows, None)
+
+
+def write_diff(filename: str, changes: Iterable[Tuple]) -> int:
+    """Store the changes between two snapshots in a CSV file.
+
+    Parameters
+    ----------
+    filename : str
+        CSV file path.
+
+    changes : Iterable[Tuple]
+        Change, previous row and current row tuples from diff_products.
+
+    Return
+    ------
+    int : Amount of stored changes.
+    """
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    written = 0
+    with open(filename, mode='w') as file:
+        file = get_csv_writer(file)
+        file.writerow(CSV_HEADERS)
+        for change, previous_row, current_row in changes:
+            row = current_row or previous_row
+            file.writerow(
+                [change] + row[:5]
+                + [previous_row[5] if previous_row else '', current_row[5] if current_row else '']
+            )
+            written += 1
+    return written
@@ -0,0 +1,131 @@
+"""
+Products collection journal.
+
+While the products of a day are collected, the products of every finished
+category are appended to a journal file, followed by a line marking the
+category as complete, and flushed to disk. A run that dies halfway leaves the
+journal behind: the next run of the same day drops the rows of the category
+that wasn't complete, skips the complete ones and keeps appending, and the
+snapshot is only stored from the journal once every category is collected.
+"""
+
+# Python
+import os
+from typing import Dict, Generator, Iterable, Optional
+
+# App
+from models import PageProduct
+from settings import get_csv_reader, get_csv_writer
+
+# Journal line types
+PRODUCT = 'P'
+COMPLETE = 'C'
+
+
+class ProductsJournal:
+    """Append only journal of the categories collected in a products run.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        filename : str
+            Journal file path.
+        """
+        self.filename = filename
+        self.completed: Dict[str, str] = {}
+
+    def open(self) -> Dict[str, str]:
+        """Read the categories completed by previous runs, dropping the rows
+        of the category that was being appended when the run died.
+
+        Return
+        ------
+        Dict[str, str] : Fingerprint of every completed category ID, empty
+            strings for categories without one.
+        """
+        self.completed = {}
+        if not os.path.isfile(self.filename):
+            return self.completed
+        end = 0
+        with open(self.filename, 'rb') as file:
+            offset = 0
+            for line in file:
+                offset += len(line)
+                if not line.endswith(b'\n'):  # Partially written
+                    break
+                row = next(get_csv_reader([line.decode().rstrip('\r\n')]), [])
+                if row[:1] == [COMPLETE]:
+                    self.completed[row[1]] = row[2]
+                    end = offset
+        if end < os.path.getsize(self.filename):
+            with open(self.filename, 'r+b') as file:
+                file.truncate(end)
+        return self.completed
+
+    def append_category(self, category_id: str, products: Iterable[PageProduct],
+                        fingerprint: Optional[str] = None) -> int:
+        """Append the products of a category and mark it as complete, once
+        they are on disk.
+
+        Parameters
+        ----------
+        category_id : str
+            ID of the category.
+
+        products : Iterable[PageProduct]
+            Products of the category.
+
+        fingerprint : str
+            Fingerprint of the category pages, if any.
+
+        Return
+        ------
+        int : Amount of appended products.
+        """
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        appended = 0
+        with open(self.filename, mode='a', newline='') as file:
+            writer = get_csv_writer(file)
+            for product in products:
+                writer.writerow([
+                    PRODUCT,
+                    product.page_name,
+                    product.category_id,
+                    product.product_id,
+                    product.product_url,
+                    product.product_name,
+                    product.product_price,
+                ])
+                appended += 1
+            file.flush()
+            os.fsync(file.fileno())
+            writer.writerow([COMPLETE, category_id, fingerprint or ''])
+            file.flush()
+            os.fsync(file.fileno())
+        self.completed[category_id] = fingerprint or ''
+        return appended
+
+    def read_products(self) -> Generator:
+        """Read the products of the completed categories, in the order they
+        were appended.
+
+        Return
+        ------
+        Generator : yield from products in the journal.
+        """
+        if not os.path.isfile(self.filename):
+            return
+        with open(self.filename, newline='') as file:
+            for row in get_csv_reader(file):
+                if row[:1] == [PRODUCT]:
+                    yield PageProduct.from_csv_row(row[1:])
+
+    def remove(self) -> None:
+        """Remove the journal once its products are stored in a snapshot.
+        """
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+        self.completed = {}
@@ -0,0 +1,285 @@
+"""
+Snapshots manifest.
+
+Every snapshots directory keeps a manifest per page and kind of snapshot with
+the date, path, row count and checksum of every stored snapshot, sorted by
+date. It's updated atomically whenever a snapshot is stored or removed, so
+finding the latest snapshot, or the latest one on a given date, is a binary
+search over the manifest instead of listing and parsing the whole directory.
+
+Manifests are cached in memory and only read again from disk when their file
+changes, dropping the snapshots whose file was removed outside the app.
+"""
+
+# Python
+from bisect import bisect_left, bisect_right
+from datetime import date
+import hashlib
+import json
+import os
+import re
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# App
+from settings import get_csv_reader
+
+
+class SnapshotEntry:
+    """A stored snapshot in a manifest.
+    """
+
+    def __init__(self, page: str, kind: str, day: date, path: str, rows: int,
+                 checksum: str) -> None:
+
+        self.page = page
+        self.kind = kind
+        self.day = day
+        self.path = path
+        self.rows = rows
+        self.checksum = checksum
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> 'SnapshotEntry':
+        return cls(
+            page=values['page'],
+            kind=values['kind'],
+            day=date.fromisoformat(values['date']),
+            path=values['path'],
+            rows=values['rows'],
+            checksum=values['checksum']
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'page': self.page,
+            'kind': self.kind,
+            'date': str(self.day),
+            'path': self.path,
+            'rows': self.rows,
+            'checksum': self.checksum,
+        }
+
+
+def describe_snapshot(filename: str) -> Tuple[int, str]:
+    """Count the rows of a snapshot CSV file, skipping its header, and get its
+    checksum in a single read.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the snapshot.
+
+    Return
+    ------
+    Tuple[int, str] : Row count and SHA-1 checksum of the file.
+    """
+    checksum = hashlib.sha1()
+
+    def lines(file):
+        for line in file:
+            checksum.update(line.encode())
+            yield line
+
+    with open(filename, newline='') as file:
+        rows = sum(1 for _ in get_csv_reader(lines(file)))
+    return max(rows - 1, 0), checksum.hexdigest()
+
+
+class SnapshotManifest:
+    """Sorted index of the snapshots of a page and kind stored in a
+    directory.
+    """
+
+    # Manifests read from disk by filename, with the modification time and
+    # size of the file they were read from and their sorted dates
+    _cache: Dict[str, Tuple[Tuple[int, int], List[SnapshotEntry], List[date]]] = {}
+    _lock = RLock()
+
+    def __init__(self, path: str, filename_prefix: str, page: str, kind: str) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        path : str
+            Directory of the snapshots.
+
+        filename_prefix : str
+            Name of the snapshots before their date, E.G. falabella-products.
+
+        page : str
+            Name of the page of the snapshots.
+
+        kind : str
+            Kind of snapshot.
+        """
+        self.path = path
+        self.filename_prefix = filename_prefix
+        self.page = page
+        self.kind = kind
+        self.filename = f'{path}{filename_prefix}.manifest.json'
+        self.filename_pattern = re.compile(
+            re.escape(filename_prefix) + r'-(\d{4}-\d{2}-\d{2})\.csv$'
+        )
+
+    def get_filename(self, day: date) -> str:
+        return f'{self.path}{self.filename_prefix}-{day}.csv'
+
+    def load(self) -> Tuple[List[SnapshotEntry], List[date]]:
+        """Get the manifest entries and their dates, from memory unless the
+        manifest file changed since it was read. A missing manifest is built
+        from the snapshots in the directory.
+
+        Return
+        ------
+        Tuple[List[SnapshotEntry], List[date]] : Entries and dates sorted by
+            date.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.filename)
+            except FileNotFoundError:
+                if not os.path.isdir(self.path):
+                    return [], []
+                self.reindex()
+                stat = os.stat(self.filename)
+            cached = self._cache.get(self.filename)
+            if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+                with open(self.filename) as file:
+                    entries = [SnapshotEntry.from_dict(values) for values in json.load(file)]
+                stored = [entry for entry in entries if os.path.isfile(entry.path)]
+                if len(stored) < len(entries):  # Snapshots removed outside the app
+                    self.save(stored)
+                cached = self.cache(stored)
+            return cached[1], cached[2]
+
+    def cache(self, entries: List[SnapshotEntry]) -> Tuple:
+        stat = os.stat(self.filename)
+        cached = (
+            (stat.st_mtime_ns, stat.st_size), entries, [entry.day for entry in entries]
+        )
+        self._cache[self.filename] = cached
+        return cached
+
+    def get_entries(self) -> List[SnapshotEntry]:
+        return self.load()[0]
+
+    def get_dates(self) -> List[date]:
+        return self.load()[1]
+
+    def save(self, entries: Iterable[SnapshotEntry]) -> List[SnapshotEntry]:
+        """Replace the manifest file atomically with the given entries.
+
+        Return
+        ------
+        List[SnapshotEntry] : Saved entries sorted by date.
+        """
+        entries = sorted(entries, key=lambda entry: entry.day)
+        with self._lock:
+            temporary = f'{self.filename}.{os.getpid()}.tmp'
+            with open(temporary, mode='w') as file:
+                json.dump([entry.to_dict() for entry in entries], file, indent=1)
+            os.replace(temporary, self.filename)
+            self.cache(entries)
+        return entries
+
+    def reindex(self) -> List[SnapshotEntry]:
+        """Rebuild the manifest from the snapshots in the directory.
+
+        Return
+        ------
+        List[SnapshotEntry] : Entries sorted by date.
+        """
+        entries = []
+        for filename in os.listdir(self.path):
+            match = self.filename_pattern.match(filename)
+            if match:
+                entries.append(self.describe(date.fromisoformat(match.group(1))))
+        return self.save(entries)
+
+    def describe(self, day: date, filename: Optional[str] = None) -> SnapshotEntry:
+        filename = self.get_filename(day) if filename is None else filename
+        rows, checksum = describe_snapshot(filename)
+        return SnapshotEntry(self.page, self.kind, day, filename, rows, checksum)
+
+    def record(self, day: date, filename: Optional[str] = None) -> SnapshotEntry:
+        """Add a stored snapshot to the manifest, replacing the entry of its
+        date if any.
+
+        Parameters
+        ----------
+        day : date
+            Date of the snapshot.
+
+        filename : str
+            Path of the snapshot, its default filename in the directory if
+            not given.
+
+        Return
+        ------
+        SnapshotEntry : Entry of the snapshot.
+        """
+        entry = self.describe(day, filename)
+        with self._lock:
+            self.save(
+                [other for other in self.get_entries() if other.day != day] + [entry]
+            )
+        return entry
+
+    def discard(self, day: date) -> None:
+        """Remove the snapshot of a date from the manifest.
+        """
+        with self._lock:
+            entries = self.get_entries()
+            if self.get(day) is not None:
+                self.save([entry for entry in entries if entry.day != day])
+
+    def get(self, day: date) -> Optional[SnapshotEntry]:
+        """Find the snapshot of a date.
+
+        Return
+        ------
+        SnapshotEntry : Entry of the snapshot.
+        None : No snapshot on that date.
+        """
+        entries, dates = self.load()
+        index = bisect_left(dates, day)
+        if index < len(entries) and entries[index].day == day:
+            return entries[index]
+        return None
+
+    def get_as_of(self, day: date) -> Optional[SnapshotEntry]:
+        """Find the latest snapshot on or before a date. Snapshots whose file
+        was removed outside the app are dropped from the manifest.
+
+        Parameters
+        ----------
+        day : date
+            Date to find the snapshot as of.
+
+        Return
+        ------
+        SnapshotEntry : Entry of the snapshot.
+        None : No snapshot on or before that date.
+        """
+        while True:
+            entries, dates = self.load()
+            index = bisect_right(dates, day)
+            if index == 0:
+                return None
+            entry = entries[index - 1]
+            if os.path.isfile(entry.path):
+                return entry
+            self.discard(entry.day)
+
+    def get_latest(self) -> Optional[SnapshotEntry]:
+        return self.get_as_of(date.max)
+
+    def verify(self, day: date) -> bool:
+        """Check that the snapshot of a date wasn't modified since it was
+        stored.
+        """
+        entry = self.get(day)
+        if entry is None or not os.path.isfile(entry.path):
+            return False
+        return describe_snapshot(entry.path) == (entry.rows, entry.checksum)
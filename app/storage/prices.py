@@ -0,0 +1,335 @@
+"""
+Products price history queries.
+
+The price index keeps, for every product of a page, the dates where its price
+changed, including the dates where it stopped or started being listed. It's
+built from the stored products snapshots once and then updated with the days
+stored after the latest indexed one, or the latest one stored again, so price
+queries never read the snapshots again.
+"""
+
+# Python
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# App
+from models import PageProduct
+from settings import PRICE_INDEX_DATABASE
+from .backends import PRODUCTS, SnapshotStorage
+from .sqlite import connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_changes (
+    page_name TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    price REAL,
+    PRIMARY KEY (page_name, product_id, date)
+);
+CREATE INDEX IF NOT EXISTS price_changes_page_date
+    ON price_changes (page_name, date);
+
+CREATE TABLE IF NOT EXISTS current_prices (
+    page_name TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (page_name, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS indexed_dates (
+    page_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (page_name, date)
+);
+"""
+
+
+class PriceChange:
+    """Price of a product on two dates.
+    """
+
+    def __init__(self, page_name: str, product_id: str, previous_price: float,
+                 price: float) -> None:
+
+        self.page_name = page_name
+        self.product_id = product_id
+        self.previous_price = previous_price
+        self.price = price
+
+    @property
+    def difference(self) -> float:
+        return self.price - self.previous_price
+
+    @property
+    def ratio(self) -> float:
+        """Price change relative to the previous price, E.G. -0.25 for a 25%
+        drop.
+        """
+        return self.difference / self.previous_price if self.previous_price else 0.0
+
+
+class PriceIndex:
+    """Price history of the products of a page.
+    """
+
+    def __init__(self, page, storage: SnapshotStorage,
+                 database: Optional[str] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        page : BasePage
+            Page to index the products price of.
+
+        storage : SnapshotStorage
+            Backend where the page products snapshots are stored.
+
+        database : str
+            Index database file, PRICE_INDEX_DATABASE by default.
+        """
+        self.storage = storage
+        self.database = PRICE_INDEX_DATABASE if database is None else database
+        self.page_name = page.get_page_name()
+        with self.connect() as connection:
+            with connection:
+                connection.executescript(SCHEMA)
+
+    def connect(self):
+        return connect(self.database)
+
+    def get_indexed_dates(self) -> List[date]:
+        with self.connect() as connection:
+            rows = connection.execute(
+                'SELECT date FROM indexed_dates WHERE page_name = ? ORDER BY date',
+                (self.page_name, )
+            ).fetchall()
+        return [date.fromisoformat(row[0]) for row in rows]
+
+    def update(self, day: Optional[date] = None) -> int:
+        """Index the products snapshots stored after the latest indexed day.
+        The page is indexed from scratch if an older day was stored or
+        removed since it was indexed.
+
+        Parameters
+        ----------
+        day : date
+            Stored day to index again even if it was indexed, E.G. the day
+            that was just stored.
+
+        Return
+        ------
+        int : Amount of indexed days.
+        """
+        indexed = self.get_indexed_dates()
+        if day is not None and day in indexed:
+            if day == indexed[-1]:
+                self.unindex_latest_day(day)
+                indexed.pop()
+            else:  # Later days were indexed against its previous prices
+                self.clear()
+                indexed = []
+        stored = self.storage.get_dates(PRODUCTS)
+        if stored[:len(indexed)] != indexed:
+            self.clear()
+            indexed = []
+        for stored_day in stored[len(indexed):]:
+            self.index_day(stored_day, self.storage.read_products(stored_day))
+        return len(stored) - len(indexed)
+
+    def unindex_latest_day(self, day: date) -> None:
+        """Remove the price changes of the latest indexed day, restoring the
+        current prices of the day before.
+
+        Parameters
+        ----------
+        day : date
+            Latest indexed day.
+        """
+        with self.connect() as connection:
+            with connection:
+                for table in ('price_changes', 'indexed_dates'):
+                    connection.execute(
+                        f'DELETE FROM {table} WHERE page_name = ? AND date = ?',
+                        (self.page_name, str(day))
+                    )
+                connection.execute(
+                    'DELETE FROM current_prices WHERE page_name = ?', (self.page_name, )
+                )
+                connection.execute(
+                    'INSERT INTO current_prices '
+                    'SELECT page_name, product_id, price FROM price_changes AS changes '
+                    'WHERE page_name = ? AND date = ('
+                    '    SELECT MAX(date) FROM price_changes '
+                    '    WHERE page_name = changes.page_name '
+                    '    AND product_id = changes.product_id'
+                    ') AND price IS NOT NULL',
+                    (self.page_name, )
+                )
+
+    def clear(self) -> None:
+        with self.connect() as connection:
+            with connection:
+                for table in ('price_changes', 'current_prices', 'indexed_dates'):
+                    connection.execute(
+                        f'DELETE FROM {table} WHERE page_name = ?', (self.page_name, )
+                    )
+
+    def index_day(self, day: date, products: Iterable[PageProduct]) -> None:
+        """Record the price changes of a day after the latest indexed one.
+
+        Parameters
+        ----------
+        day : date
+            Date of the products snapshot.
+
+        products : Iterable[PageProduct]
+            Products of the day.
+        """
+        with self.connect() as connection:
+            current = dict(connection.execute(
+                'SELECT product_id, price FROM current_prices WHERE page_name = ?',
+                (self.page_name, )
+            ))
+            prices = {
+                product.product_id: float(product.product_price) for product in products
+            }
+            changes = [
+                (self.page_name, product_id, str(day), price)
+                for product_id, price in prices.items()
+                if current.get(product_id) != price
+            ] + [  # No longer listed
+                (self.page_name, product_id, str(day), None)
+                for product_id in current.keys() - prices.keys()
+            ]
+            with connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO price_changes VALUES (?, ?, ?, ?)', changes
+                )
+                connection.execute(
+                    'DELETE FROM current_prices WHERE page_name = ?', (self.page_name, )
+                )
+                connection.executemany(
+                    'INSERT INTO current_prices VALUES (?, ?, ?)',
+                    ((self.page_name, product_id, price) for product_id, price in prices.items())
+                )
+                connection.execute(
+                    'INSERT INTO indexed_dates VALUES (?, ?)', (self.page_name, str(day))
+                )
+
+    def get_series(self, product_id: str) -> List[Tuple[date, Optional[float]]]:
+        """Get the price history of a product.
+
+        Parameters
+        ----------
+        product_id : str
+            ID of the product.
+
+        Return
+        ------
+        List[Tuple[date, Optional[float]]] : Dates where the price changed
+            and the new price, None while the product wasn't listed.
+        """
+        with self.connect() as connection:
+            rows = connection.execute(
+                'SELECT date, price FROM price_changes '
+                'WHERE page_name = ? AND product_id = ? ORDER BY date',
+                (self.page_name, product_id)
+            ).fetchall()
+        return [(date.fromisoformat(row[0]), row[1]) for row in rows]
+
+    def get_prices_as_of(self, day: date,
+                         product_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Get the price of the products listed on a date.
+
+        Parameters
+        ----------
+        day : date
+            Date to get the prices as of.
+
+        product_ids : Iterable[str]
+            IDs of the products to get the price of, every product if not
+            given.
+
+        Return
+        ------
+        Dict[str, float] : Price of every listed product ID.
+        """
+        query = (
+            'SELECT product_id, price FROM price_changes AS changes '
+            'WHERE page_name = ? AND date = ('
+            '    SELECT MAX(date) FROM price_changes '
+            '    WHERE page_name = changes.page_name AND product_id = changes.product_id '
+            '    AND date <= ?'
+            ') AND price IS NOT NULL'
+        )
+        with self.connect() as connection:
+            if product_ids is None:
+                rows = connection.execute(query, (self.page_name, str(day)))
+                return dict(rows)
+            prices = {}
+            for product_id in product_ids:
+                rows = connection.execute(
+                    query + ' AND product_id = ?', (self.page_name, str(day), product_id)
+                )
+                prices.update(rows)
+            return prices
+
+    def get_changes(self, start: date, end: date) -> List[PriceChange]:
+        """Find the products whose price changed between two dates, listed on
+        both of them.
+
+        Parameters
+        ----------
+        start : date
+            Date of the previous prices.
+
+        end : date
+            Date of the new prices.
+
+        Return
+        ------
+        List[PriceChange] : Price changes.
+        """
+        with self.connect() as connection:
+            candidates = [row[0] for row in connection.execute(
+                'SELECT DISTINCT product_id FROM price_changes '
+                'WHERE page_name = ? AND date > ? AND date <= ?',
+                (self.page_name, str(start), str(end))
+            )]
+        previous_prices = self.get_prices_as_of(start, candidates)
+        prices = self.get_prices_as_of(end, previous_prices.keys())
+        return [
+            PriceChange(self.page_name, product_id, previous_price, prices[product_id])
+            for product_id, previous_price in previous_prices.items()
+            if product_id in prices and prices[product_id] != previous_price
+        ]
+
+    def get_top_drops(self, limit: int = 10, end: Optional[date] = None,
+                      days: int = 7) -> List[PriceChange]:
+        """Find the products with the largest relative price drops.
+
+        Parameters
+        ----------
+        limit : int
+            Maximum amount of products.
+
+        end : date
+            Date of the new prices, the latest indexed day by default.
+
+        days : int
+            Days before the end date of the previous prices.
+
+        Return
+        ------
+        List[PriceChange] : Price drops, largest first.
+        """
+        if end is None:
+            indexed = self.get_indexed_dates()
+            if not indexed:
+                return []
+            end = indexed[-1]
+        drops = [
+            change for change in self.get_changes(end - timedelta(days=days), end)
+            if change.difference < 0
+        ]
+        return sorted(drops, key=lambda change: change.ratio)[:limit]
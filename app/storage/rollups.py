@@ -0,0 +1,289 @@
+"""
+Products price rollups.
+
+Minimum, maximum and average prices per category and per product, by day and
+by ISO week, materialized in an SQLite database. A day is rolled up from its
+own products snapshot only, and its week is aggregated again from the daily
+rollups of the week, so storing a day again doesn't count it twice.
+"""
+
+# Python
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# App
+from models import PageProduct
+from settings import ROLLUPS_DATABASE, ROLLUPS_REBUILD_WORKERS
+from .backends import PRODUCTS, SnapshotStorage
+from .sqlite import connect
+
+# Rollup scopes, the column the prices are grouped by
+CATEGORY = 'category'
+PRODUCT = 'product'
+
+# Rollup periods
+DAILY = 'daily'
+WEEKLY = 'weekly'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    page_name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    period TEXT NOT NULL,
+    min_price REAL NOT NULL,
+    max_price REAL NOT NULL,
+    sum_price REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (page_name, scope, key, period)
+);
+CREATE INDEX IF NOT EXISTS daily_rollups_page_period
+    ON daily_rollups (page_name, period);
+
+CREATE TABLE IF NOT EXISTS weekly_rollups (
+    page_name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    period TEXT NOT NULL,
+    min_price REAL NOT NULL,
+    max_price REAL NOT NULL,
+    sum_price REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (page_name, scope, key, period)
+);
+"""
+
+# Scope, key, min, max, sum and count of the prices
+Aggregate = Tuple[str, str, float, float, float, int]
+
+
+def get_week(day: date) -> str:
+    """Get the ISO week of a date, E.G. 2021-W16.
+    """
+    year, week, _ = day.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def aggregate_products(products: Iterable[PageProduct]) -> List[Aggregate]:
+    """Aggregate the prices of a products snapshot by category and product.
+
+    Parameters
+    ----------
+    products : Iterable[PageProduct]
+        Products of the snapshot.
+
+    Return
+    ------
+    List[Aggregate] : Aggregates of every category and product.
+    """
+    aggregates = {}
+    for product in products:
+        price = float(product.product_price)
+        for key in ((CATEGORY, product.category_id), (PRODUCT, product.product_id)):
+            aggregate = aggregates.get(key)
+            if aggregate is None:
+                aggregates[key] = [price, price, price, 1]
+            else:
+                aggregate[0] = min(aggregate[0], price)
+                aggregate[1] = max(aggregate[1], price)
+                aggregate[2] += price
+                aggregate[3] += 1
+    return [key + tuple(aggregate) for key, aggregate in aggregates.items()]
+
+
+# Storage backend of every rebuild worker process
+_rebuild_storage: Optional[SnapshotStorage] = None
+
+
+def init_rebuild_worker(storage_class: type, page_class: type,
+                        options: Dict[str, Any]) -> None:
+    """Create the storage backend that reads the products snapshots in a
+    rebuild worker process, since the backend of a page that already
+    collected holds objects that can't be sent to other processes.
+
+    Parameters
+    ----------
+    storage_class : type
+        Storage backend class.
+
+    page_class : type
+        Page class to create the page object of the backend from.
+
+    options : Dict[str, Any]
+        Keyword arguments of the backend constructor, E.G. its paths.
+    """
+    global _rebuild_storage
+    _rebuild_storage = storage_class(page_class(), **options)
+
+
+def aggregate_snapshot(day: date) -> Tuple[date, List[Aggregate]]:
+    """Aggregate a stored products snapshot, in a rebuild worker process.
+    """
+    return day, aggregate_products(_rebuild_storage.read_products(day))
+
+
+class PriceRollups:
+    """Materialized price aggregates of the products of a page.
+    """
+
+    def __init__(self, page, storage: SnapshotStorage,
+                 database: Optional[str] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        page : BasePage
+            Page to roll up the products price of.
+
+        storage : SnapshotStorage
+            Backend where the page products snapshots are stored.
+
+        database : str
+            Rollups database file, ROLLUPS_DATABASE by default.
+        """
+        self.storage = storage
+        self.page_class = type(page)
+        self.database = ROLLUPS_DATABASE if database is None else database
+        self.page_name = page.get_page_name()
+        with self.connect() as connection:
+            with connection:
+                connection.executescript(SCHEMA)
+
+    def connect(self):
+        return connect(self.database)
+
+    def get_dates(self) -> List[date]:
+        with self.connect() as connection:
+            rows = connection.execute(
+                'SELECT DISTINCT period FROM daily_rollups WHERE page_name = ? ORDER BY period',
+                (self.page_name, )
+            ).fetchall()
+        return [date.fromisoformat(row[0]) for row in rows]
+
+    def update(self, day: Optional[date] = None) -> int:
+        """Roll up the stored products snapshots that weren't rolled up yet.
+
+        Parameters
+        ----------
+        day : date
+            Stored day to roll up again even if it was rolled up, E.G. the
+            day that was just stored.
+
+        Return
+        ------
+        int : Amount of rolled up days.
+        """
+        rolled_up = set(self.get_dates())
+        days = [
+            stored for stored in self.storage.get_dates(PRODUCTS)
+            if stored not in rolled_up or stored == day
+        ]
+        for stored in days:
+            self.store_day(stored, aggregate_products(self.storage.read_products(stored)))
+        return len(days)
+
+    def rebuild(self, workers: Optional[int] = None) -> int:
+        """Roll up every stored products snapshot from scratch, aggregating
+        the snapshots in a pool of processes.
+
+        Parameters
+        ----------
+        workers : int
+            Worker processes, ROLLUPS_REBUILD_WORKERS by default.
+
+        Return
+        ------
+        int : Amount of rolled up days.
+        """
+        with self.connect() as connection:
+            with connection:
+                for table in ('daily_rollups', 'weekly_rollups'):
+                    connection.execute(
+                        f'DELETE FROM {table} WHERE page_name = ?', (self.page_name, )
+                    )
+        days = self.storage.get_dates(PRODUCTS)
+        workers = ROLLUPS_REBUILD_WORKERS if workers is None else workers
+        initargs = (type(self.storage), self.page_class, self.storage.get_options())
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_rebuild_worker,
+                                 initargs=initargs) as executor:
+            # Only this process writes, as the aggregates arrive
+            for day, aggregates in executor.map(aggregate_snapshot, days):
+                self.store_day(day, aggregates)
+        return len(days)
+
+    def store_day(self, day: date, aggregates: List[Aggregate]) -> None:
+        """Replace the daily rollups of a day and aggregate its week again.
+
+        Parameters
+        ----------
+        day : date
+            Date of the products snapshot.
+
+        aggregates : List[Aggregate]
+            Aggregates of the products snapshot.
+        """
+        monday = day - timedelta(days=day.weekday())
+        with self.connect() as connection:
+            with connection:
+                connection.execute(
+                    'DELETE FROM daily_rollups WHERE page_name = ? AND period = ?',
+                    (self.page_name, str(day))
+                )
+                connection.executemany(
+                    'INSERT INTO daily_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    ((self.page_name, aggregate[0], aggregate[1], str(day)) + aggregate[2:]
+                     for aggregate in aggregates)
+                )
+                connection.execute(
+                    'DELETE FROM weekly_rollups WHERE page_name = ? AND period = ?',
+                    (self.page_name, get_week(day))
+                )
+                connection.execute(
+                    'INSERT INTO weekly_rollups '
+                    'SELECT page_name, scope, key, ?, MIN(min_price), MAX(max_price), '
+                    'SUM(sum_price), SUM(count) FROM daily_rollups '
+                    'WHERE page_name = ? AND period BETWEEN ? AND ? '
+                    'GROUP BY scope, key',
+                    (get_week(day), self.page_name, str(monday), str(monday + timedelta(days=6)))
+                )
+
+    def get_rollups(self, period: str, scope: str, key: Optional[str] = None,
+                    start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple]:
+        """Get the price rollups of a scope.
+
+        Parameters
+        ----------
+        period : str
+            DAILY or WEEKLY rollups.
+
+        scope : str
+            CATEGORY or PRODUCT rollups.
+
+        key : str
+            Category or product ID, every one if not given.
+
+        start : str
+            First day or ISO week, E.G. 2021-04-19 or 2021-W16.
+
+        end : str
+            Last day or ISO week.
+
+        Return
+        ------
+        List[Tuple] : Key, day or week, min, max and average price and count
+            of prices of every rollup, sorted by key and period.
+        """
+        if period not in (DAILY, WEEKLY):
+            raise ValueError(f'Rollup period {period} not found, options: {[DAILY, WEEKLY]}')
+        query = (
+            'SELECT key, period, min_price, max_price, sum_price / count, count '
+            f'FROM {period}_rollups WHERE page_name = ? AND scope = ?'
+        )
+        parameters = [self.page_name, scope]
+        for condition, value in (('key = ?', key), ('period >= ?', start), ('period <= ?', end)):
+            if value is not None:
+                query += f' AND {condition}'
+                parameters.append(str(value))
+        with self.connect() as connection:
+            return connection.execute(query + ' ORDER BY key, period', parameters).fetchall()
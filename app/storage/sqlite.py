@@ -0,0 +1,244 @@
+"""
+SQLite snapshots storage backend.
+"""
+
+# Python
+from contextlib import contextmanager
+from datetime import date
+from itertools import islice
+import sqlite3
+from typing import Any, Dict, Generator, Iterable, List, Optional
+
+# App
+from models import PageCategory, PageProduct
+from settings import SQLITE_BATCH_SIZE, SQLITE_DATABASE
+from .backends import CATEGORIES, PRODUCTS, SnapshotStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    page_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    product_url TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    product_price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_page_date
+    ON products (page_name, date, position);
+CREATE INDEX IF NOT EXISTS products_page_product_date
+    ON products (page_name, product_id, date);
+CREATE INDEX IF NOT EXISTS products_page_category_date
+    ON products (page_name, category_id, date);
+
+CREATE TABLE IF NOT EXISTS categories (
+    page_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category_name TEXT NOT NULL,
+    category_url TEXT NOT NULL,
+    category_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS categories_page_date
+    ON categories (page_name, date, position);
+CREATE INDEX IF NOT EXISTS categories_page_category_date
+    ON categories (page_name, category_id, date);
+"""
+
+
+@contextmanager
+def connect(database: str) -> Generator:
+    """Open a connection that waits for other processes' transactions instead
+    of failing, and close it afterwards.
+
+    Parameters
+    ----------
+    database : str
+        Database file.
+
+    Return
+    ------
+    Generator : yield the database connection.
+    """
+    connection = sqlite3.connect(database, timeout=60)
+    try:
+        connection.execute('PRAGMA journal_mode=WAL')
+        yield connection
+    finally:
+        connection.close()
+
+
+class SQLiteStorage(SnapshotStorage):
+    """Snapshots stored in an SQLite database shared by every page, where
+    each row keeps the date of its snapshot.
+    """
+
+    def __init__(self, page, database: Optional[str] = None,
+                 batch_size: Optional[int] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        page : BasePage
+            Page to store the snapshots of.
+
+        database : str
+            Database file, SQLITE_DATABASE by default.
+
+        batch_size : int
+            Rows inserted per transaction, SQLITE_BATCH_SIZE by default.
+        """
+        super().__init__(page)
+        self.database = SQLITE_DATABASE if database is None else database
+        self.batch_size = SQLITE_BATCH_SIZE if batch_size is None else batch_size
+        self.page_name = page.get_page_name()
+        with self.connect() as connection:
+            with connection:
+                connection.executescript(SCHEMA)
+
+    def connect(self):
+        return connect(self.database)
+
+    def get_options(self) -> Dict[str, Any]:
+        return {'database': self.database, 'batch_size': self.batch_size}
+
+    def get_dates(self, kind: str) -> List[date]:
+        table = PRODUCTS if kind == PRODUCTS else CATEGORIES
+        with self.connect() as connection:
+            rows = connection.execute(
+                f'SELECT DISTINCT date FROM {table} WHERE page_name = ? ORDER BY date',
+                (self.page_name, )
+            ).fetchall()
+        return [date.fromisoformat(row[0]) for row in rows]
+
+    def get_date_as_of(self, kind: str, day: date) -> Optional[date]:
+        table = PRODUCTS if kind == PRODUCTS else CATEGORIES
+        with self.connect() as connection:
+            row = connection.execute(
+                f'SELECT MAX(date) FROM {table} WHERE page_name = ? AND date <= ?',
+                (self.page_name, str(day))
+            ).fetchone()
+        return None if row[0] is None else date.fromisoformat(row[0])
+
+    def write_rows(self, table: str, day: date, rows: Iterable[tuple]) -> None:
+        """Replace the snapshot of a day at once.
+
+        The rows are inserted in batches into a temporary staging table of
+        the connection, which doesn't lock the database, and then swapped
+        for the previous snapshot in a single transaction, so readers never
+        see a partial snapshot and a failed write keeps the previous one.
+
+        Parameters
+        ----------
+        table : str
+            Table of the snapshot.
+
+        day : date
+            Date of the snapshot.
+
+        rows : Iterable[tuple]
+            Row values after page name, date and position.
+        """
+        staging = f'staging_{table}'
+        with self.connect() as connection:
+            connection.execute(
+                f'CREATE TEMP TABLE {staging} AS SELECT * FROM {table} WHERE 0'
+            )
+            positioned = (
+                (self.page_name, str(day), position) + row
+                for position, row in enumerate(rows)
+            )
+            while True:
+                batch = list(islice(positioned, self.batch_size))
+                if not batch:
+                    break
+                placeholders = ', '.join('?' * len(batch[0]))
+                with connection:
+                    connection.executemany(
+                        f'INSERT INTO {staging} VALUES ({placeholders})', batch
+                    )
+            with connection:
+                connection.execute(
+                    f'DELETE FROM {table} WHERE page_name = ? AND date = ?',
+                    (self.page_name, str(day))
+                )
+                connection.execute(f'INSERT INTO {table} SELECT * FROM {staging}')
+
+    def write_products(self, day: date, products: Iterable[PageProduct]) -> str:
+        self.write_rows(PRODUCTS, day, (
+            (
+                product.category_id,
+                product.product_id,
+                product.product_url,
+                product.product_name,
+                float(product.product_price),
+            )
+            for product in products
+        ))
+        return self.database
+
+    def read_product_rows(self, query: str, parameters: tuple) -> Generator:
+        """Stream products from a query over the products columns after page
+        name, date and position.
+
+        Return
+        ------
+        Generator : yield from products.
+        """
+        with self.connect() as connection:
+            for row in connection.execute(query, parameters):
+                yield PageProduct(self.page_name, *row)
+
+    def read_products(self, day: date) -> Generator:
+        yield from self.read_product_rows(
+            'SELECT category_id, product_id, product_url, product_name, product_price '
+            'FROM products WHERE page_name = ? AND date = ? ORDER BY position',
+            (self.page_name, str(day))
+        )
+
+    def read_category_products(self, day: date, category_id: str) -> Generator:
+        yield from self.read_product_rows(
+            'SELECT category_id, product_id, product_url, product_name, product_price '
+            'FROM products WHERE page_name = ? AND category_id = ? AND date = ? '
+            'ORDER BY position',
+            (self.page_name, category_id, str(day))
+        )
+
+    def write_categories(self, day: date, categories: Iterable[PageCategory]) -> str:
+        self.write_rows(CATEGORIES, day, (
+            (category.category_name, category.category_url, category.category_id)
+            for category in categories
+        ))
+        return self.database
+
+    def read_categories(self, day: date) -> List[PageCategory]:
+        with self.connect() as connection:
+            rows = connection.execute(
+                'SELECT category_name, category_url, category_id FROM categories '
+                'WHERE page_name = ? AND date = ? ORDER BY position',
+                (self.page_name, str(day))
+            ).fetchall()
+        return [PageCategory(self.page_name, *row) for row in rows]
+
+    def import_history(self, source: SnapshotStorage) -> int:
+        """Copy every snapshot stored in another backend, E.G. the CSV files
+        history.
+
+        Parameters
+        ----------
+        source : SnapshotStorage
+            Backend to copy the snapshots from.
+
+        Return
+        ------
+        int : Amount of imported snapshots.
+        """
+        imported = 0
+        for day in source.get_dates(CATEGORIES):
+            self.write_categories(day, source.read_categories(day))
+            imported += 1
+        for day in source.get_dates(PRODUCTS):
+            self.write_products(day, source.read_products(day))
+            imported += 1
+        return imported
@@ -0,0 +1,39 @@
+"""
+Storage backends selection.
+"""
+
+# Python
+from typing import Dict, Optional
+
+# App
+from settings import STORAGE_BACKEND
+from .backends import CSVStorage, SnapshotStorage
+from .sqlite import SQLiteStorage
+
+STORAGE_BACKENDS: Dict[str, type] = {
+    'csv': CSVStorage,
+    'sqlite': SQLiteStorage,
+}
+
+
+def get_snapshot_storage(page, name: Optional[str] = None) -> SnapshotStorage:
+    """Get the storage backend of a page.
+
+    Parameters
+    ----------
+    page : BasePage
+        Page to store the snapshots of.
+
+    name : str
+        Name of the backend, STORAGE_BACKEND by default.
+
+    Return
+    ------
+    SnapshotStorage : Storage backend.
+    """
+    name = STORAGE_BACKEND if name is None else name
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(
+            f'Storage backend {name} not found, options: {list(STORAGE_BACKENDS)}'
+        )
+    return STORAGE_BACKENDS[name](page)
@@ -0,0 +1,50 @@
+"""Local HTTP server mock."""
+
+# Python
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from typing import Callable, Dict, Generator, Tuple
+
+# Handler receives the request path and headers and returns the response
+# status, body and headers
+Handler = Callable[[str, Dict[str, str]], Tuple[int, str, Dict[str, str]]]
+
+
+@contextmanager
+def serve(handler: Handler) -> Generator:
+    """Run a keep-alive HTTP server in a background thread.
+
+    Parameters
+    ----------
+    handler : Handler
+        Function that builds the response of each GET request.
+
+    Return
+    ------
+    Generator : yield the base url of the running server.
+    """
+    class RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self) -> None:
+            status, body, headers = handler(self.path, dict(self.headers))
+            content = body.encode()
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,152 @@
+"""
+Categories collection tests.
+"""
+
+# Python
+from datetime import date
+
+# Pytest
+import pytest
+
+# App
+from models import PageCategory
+from pages import FalabellaPage, SodimacPage
+from pages.mixins import collect_categories
+from settings import CATEGORIES_TTL_DAYS
+from storage import CATEGORIES, CSVStorage
+
+EXPECTED_CATEGORIES = {
+    'Falabella': [
+        ('Living', 'https://www.falabella.com.ar/falabella-ar/category/cat30046/Muebles-de-living', 'cat30046'),
+        ('Comedor', 'https://www.falabella.com.ar/falabella-ar/category/cat30052/Muebles-de-comedor', 'cat30052'),
+        ('Muebles de jardín', 'https://www.falabella.com.ar/falabella-ar/category/cat2830001/Muebles-de-jardin',
+         'cat2830001'),
+    ],
+    'Sodimac': [
+        ('Muebles de dormitorio', 'https://www.sodimac.com.ar/sodimac-ar/landing/cat20044/Muebles-de-dormitorio',
+         'cat20044'),
+        ('Muebles de oficina y escritorio',
+         'https://www.sodimac.com.ar/sodimac-ar/category/cat20004/Muebles-de-oficina-y-escritorio', 'cat20004'),
+        ('Organización', 'https://www.sodimac.com.ar/sodimac-ar/landing/cat2960006/Organizacion', 'cat2960006'),
+    ],
+}
+
+
+class TestCategoriesDiscovery:
+    """Categories discovery unit tests.
+    """
+
+    @pytest.fixture(params=[FalabellaPage, SodimacPage])
+    def page(self, request):
+        return request.param()
+
+    @pytest.fixture
+    def home_html(self, page) -> str:
+        with open(f'./tests/mocks/html/{page.get_page_name().lower()}-home.html') as file:
+            return file.read()
+
+    def test_categories_without_browser(self, page, home_html, monkeypatch) -> None:
+        """Validate that the furnitures categories are found in the home page
+        HTML or embedded state, without starting a browser.
+        """
+        page.fetch_url = lambda url: home_html if url == page.CATEGORIES_PAGE_URL else None
+        monkeypatch.setattr(type(page), 'furnitures_categories', property(
+            lambda self: pytest.fail('Browser started')
+        ))
+        categories = page.get_categories()
+        assert [
+            (category.category_name, category.category_url, category.category_id)
+            for category in categories
+        ] == EXPECTED_CATEGORIES[page.get_page_name()]
+        assert {category.page_name for category in categories} == {page.get_page_name()}
+        assert not page.browser_used
+
+    def test_browser_fallback(self, page, monkeypatch) -> None:
+        """Validate that the browser is used when no categories are found
+        without it.
+        """
+
+        class FakeElement:
+            text = 'Living >'
+
+            def get_attribute(self, name: str) -> str:
+                return 'https://www.fake.com/fake-ar/category/cat1/Living'
+
+        page.fetch_url = lambda url: '<html><body><ul><li>Otros</li></ul></body></html>'
+        monkeypatch.setattr(type(page), 'furnitures_categories', property(
+            lambda self: iter([FakeElement()])
+        ))
+        categories = page.get_categories()
+        assert [(category.category_name, category.category_id) for category in categories] == [
+            ('Living', 'cat1')
+        ]
+        assert page.browser_used
+
+
+class TestCategoriesTTL:
+    """Categories carry forward unit tests.
+    """
+
+    @pytest.fixture
+    def page(self, tmp_path, monkeypatch) -> FalabellaPage:
+        monkeypatch.setattr(collect_categories, 'FINGERPRINTS_STORAGE_PATH', f'{tmp_path}/')
+        # Categories are discovered without a browser, so no pool is created
+        monkeypatch.setattr(collect_categories, 'get_browser_pool', lambda: pytest.fail('Pool created'))
+        page = FalabellaPage()
+        page._storage = CSVStorage(page, categories_path=f'{tmp_path}/')
+        page.discoveries = 0
+
+        def get_categories():
+            page.discoveries += 1
+            return [PageCategory(page.get_page_name(), 'Living', 'https://www.fake.com/cat1', 'cat1')]
+
+        page.get_categories = get_categories
+        return page
+
+    def store_on(self, page, day: date, force_refresh: bool = False) -> None:
+        page.get_snapshot_date = lambda: day
+        page.store_categories(force_refresh=force_refresh)
+
+    def test_carry_forward(self, page) -> None:
+        """Validate that fresh categories are stored again without being
+        discovered, until they expire.
+        """
+        for day in range(1, 1 + CATEGORIES_TTL_DAYS):
+            self.store_on(page, date(2021, 4, day))
+        assert page.discoveries == 1
+        assert page.storage.get_dates(CATEGORIES)[-1] == date(2021, 4, CATEGORIES_TTL_DAYS)
+        assert [category.category_id for category in page.get_latest_categories()] == ['cat1']
+
+        self.store_on(page, date(2021, 4, 1 + CATEGORIES_TTL_DAYS))
+        assert page.discoveries == 2
+
+    def test_changed_structure(self, page) -> None:
+        """Validate that categories are discovered again when the latest
+        snapshot no longer has the discovered structure.
+        """
+        self.store_on(page, date(2021, 4, 1))
+        page.storage.write_categories(date(2021, 4, 2), [
+            PageCategory(page.get_page_name(), 'Comedor', 'https://www.fake.com/cat2', 'cat2')
+        ])
+        self.store_on(page, date(2021, 4, 3))
+        assert page.discoveries == 2
+
+    def test_force_refresh(self, page) -> None:
+        """Validate that fresh categories are discovered again on demand.
+        """
+        self.store_on(page, date(2021, 4, 1))
+        self.store_on(page, date(2021, 4, 2), force_refresh=True)
+        assert page.discoveries == 2
+
+    @pytest.mark.parametrize('content', [
+        '{"discovered": "2021-04-01"}', '{"discovered": "yesterday", "checksum": ""}', '[1]',
+    ])
+    def test_malformed_discovery(self, page, content) -> None:
+        """Validate that categories are discovered again when the stored
+        discovery can't be read.
+        """
+        self.store_on(page, date(2021, 4, 1))
+        with open(page.get_categories_discovery_filename(), 'w') as file:
+            file.write(content)
+        self.store_on(page, date(2021, 4, 2))
+        assert page.discoveries == 2
@@ -0,0 +1,427 @@
+"""
+Products collection tests.
+"""
+
+# Python
+from datetime import date
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+# Pytest
+import pytest
+
+# App
+from models import PageCategory
+from network import CircuitBreakers, HedgeBudget, RetryPolicy
+from pages import FalabellaPage, SodimacPage
+from pages.mixins import collect_products, fetch
+from settings import ADAPTIVE_TIMEOUT_MIN
+from storage import PRODUCTS, CSVStorage, PriceIndex, PriceRollups, SQLiteStorage
+
+
+def get_category_html(page_number: int, product_count: int, per_page: int) -> str:
+    """Build a fake category page with pagination data.
+
+    Parameters
+    ----------
+    page_number : int
+        Number of the page.
+
+    product_count : int
+        Total products of the category.
+
+    per_page : int
+        Products displayed per page.
+
+    Return
+    ------
+    str : Fake HTML content.
+    """
+    return (
+        f'<html><script>{{"pagination":{{"count":{product_count},'
+        f'"perPage":{per_page}}},"totalProducts":{product_count},'
+        f'"perPage":{per_page}}}</script><p>page {page_number}</p></html>'
+    )
+
+
+class TestCollectProducts:
+    """Products collection unit tests shared by every page.
+    """
+
+    @pytest.fixture(params=[FalabellaPage, SodimacPage])
+    def page(self, request):
+        return request.param()
+
+    @pytest.fixture
+    def categories(self, page) -> List[PageCategory]:
+        return [
+            PageCategory(page.PAGE_NAME, 'tables', 'https://www.fake.com/tables', 'tables'),
+            PageCategory(page.PAGE_NAME, 'chairs', 'https://www.fake.com/chairs?a=1', 'chairs'),
+        ]
+
+    def test_category_page_url(self, page) -> None:
+        """Validate that page urls keep the category url query.
+        """
+        url = 'https://www.fake.com/chairs?a=1'
+        assert page.get_category_page_url(url, 1) == url
+        assert page.get_category_page_url(url, 3) == (
+            f'https://www.fake.com/chairs?a=1&{page.PAGE_QUERY_PARAMETER}=3'
+        )
+
+    def test_category_page_count(self, page) -> None:
+        """Validate that the page count is read from the first page.
+        """
+        assert page.get_category_page_count(get_category_html(1, 100, 48)) == 3
+        assert page.get_category_page_count('<html></html>') == 1
+        assert page.run_summary.counters['categories_without_pagination'] == 1
+
+    def test_saved_category_page_count(self, page) -> None:
+        """Validate the page count and page urls of the saved category
+        page, whose embedded state has the shape of the site's state.
+        """
+        with open(f'./tests/mocks/html/{page.get_page_name().lower()}-category.html') as file:
+            assert page.get_category_page_count(file.read()) == 5  # 230 products, 48 per page
+        url = page.get_category_page_url(
+            f'https://www.{page.get_page_name().lower()}.com.ar/category/cat1/Living', 2
+        )
+        assert url.endswith(f'/cat1/Living?{page.PAGE_QUERY_PARAMETER}=2')
+
+    def test_paginated_products_keep_order(self, page, categories) -> None:
+        """Validate that every page is fetched and parsed in page order.
+        """
+        def fetch_url(url: str) -> str:
+            time.sleep(random.random() / 100)
+            page_number = int(url.rsplit('=', 1)[1]) if page.PAGE_QUERY_PARAMETER in url else 1
+            return get_category_html(page_number, 5, 2)
+
+        page.get_latest_categories = lambda: categories
+        page.fetch_url = fetch_url
+        page.parse_category_products = lambda category, html: [
+            (category.category_id, html.rsplit('page ', 1)[1][0])
+        ]
+        products = list(page.furnitures_products)
+        for category in categories:
+            assert [
+                page_number for category_id, page_number in products
+                if category_id == category.category_id
+            ] == ['1', '2', '3']
+        assert page.run_summary.categories['chairs']['pages'] == '3/3'
+        assert page.run_summary.counters['pages'] == 6
+
+    def test_parse_in_processes(self, page, categories, monkeypatch) -> None:
+        """Validate that parser processes find the same products, in the
+        same order, as parsing in this process.
+        """
+        monkeypatch.setattr(fetch, 'HTTP_CACHE_ENABLED', False)
+        monkeypatch.setattr(collect_products, 'SHORT_CIRCUIT_UNCHANGED_CATEGORIES', False)
+        monkeypatch.setattr(collect_products, 'PARSE_WORKERS', 2)
+        with open(f'./tests/mocks/html/{page.get_page_name().lower()}-category.html') as file:
+            html = file.read()
+        page.get_latest_categories = lambda: categories
+        page.fetch_url = lambda url: html
+
+        def get_values(products) -> List[tuple]:
+            return [
+                (product.category_id, product.product_id, product.product_name,
+                 product.product_price)
+                for product in products
+            ]
+
+        expected = get_values(page.furnitures_products)
+        monkeypatch.setattr(collect_products, 'PARSE_IN_PROCESSES', True)
+        page.parse_category_products = lambda category, html: pytest.fail('Parsed in process')
+        assert get_values(page.furnitures_products) == expected
+        assert len(expected) == 2 * 5 * 48
+
+    @pytest.mark.parametrize('backend', ['csv', 'sqlite'])
+    def test_unchanged_categories_are_not_parsed(self, page, categories, backend,
+                                                 tmp_path, monkeypatch) -> None:
+        """Validate that categories with the same products grid as in the
+        previous run are copied from the previous snapshot.
+        """
+        monkeypatch.setattr(collect_products, 'FINGERPRINTS_STORAGE_PATH', f'{tmp_path}/fingerprints/')
+        monkeypatch.setattr(collect_products, 'RUN_SUMMARIES_STORAGE_PATH', f'{tmp_path}/runs/')
+        monkeypatch.setattr(collect_products, 'JOURNALS_STORAGE_PATH', f'{tmp_path}/journals/')
+        monkeypatch.setattr(fetch, 'HTTP_CACHE_ENABLED', False)
+        if backend == 'csv':
+            page._storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        else:
+            page._storage = SQLiteStorage(page, database=f'{tmp_path}/burner.sqlite3')
+        page._price_index = PriceIndex(page, page.storage, database=f'{tmp_path}/prices.sqlite3')
+        page._rollups = PriceRollups(page, page.storage, database=f'{tmp_path}/rollups.sqlite3')
+        with open(f'./tests/mocks/html/{page.get_page_name().lower()}-category.html') as file:
+            html = file.read()
+        page.get_latest_categories = lambda: categories
+        page.fetch_url = lambda url: html
+        page.get_snapshot_date = lambda: date(2021, 4, 19)
+        page.store_products()
+        assert page.run_summary.counters['short_circuited_categories'] == 0
+
+        def parse_category_products(category, html):
+            raise AssertionError('Unchanged category was parsed')
+
+        page.parse_category_products = parse_category_products
+        page.get_snapshot_date = lambda: date(2021, 4, 20)
+        page.store_products()
+        assert page.run_summary.counters['short_circuited_categories'] == 2
+        previous = page.storage.read_products(date(2021, 4, 19))
+        current = page.storage.read_products(date(2021, 4, 20))
+
+        def get_values(product) -> tuple:
+            return product.category_id, product.product_id, str(product.product_price)
+
+        previous_products = [get_values(product) for product in previous]
+        assert len(previous_products) == 2 * 5 * 48
+        assert previous_products == [get_values(product) for product in current]
+        assert page.price_index.get_indexed_dates() == [date(2021, 4, 19), date(2021, 4, 20)]
+        assert page.rollups.get_dates() == [date(2021, 4, 19), date(2021, 4, 20)]
+        with open(page.get_run_summary_filename(date(2021, 4, 20))) as file:
+            summary = json.load(file)
+        assert summary['counters']['short_circuited_categories'] == 2
+        assert 'www.fake.com' in summary['metrics']['rate_limits']
+
+
+class TestResumableRuns:
+    """Products runs resumed from their journal unit tests.
+    """
+
+    def test_resumed_run(self, tmp_path, monkeypatch) -> None:
+        """Validate that a run resumed after dying halfway doesn't collect
+        the categories collected before, and stores the same snapshot as a
+        run that didn't die.
+        """
+        for module, setting in ((collect_products, 'FINGERPRINTS_STORAGE_PATH'),
+                                (collect_products, 'RUN_SUMMARIES_STORAGE_PATH'),
+                                (collect_products, 'JOURNALS_STORAGE_PATH')):
+            monkeypatch.setattr(module, setting, f'{tmp_path}/{setting}/')
+        monkeypatch.setattr(collect_products, 'PRICE_INDEX_ENABLED', False)
+        monkeypatch.setattr(collect_products, 'ROLLUPS_ENABLED', False)
+        monkeypatch.setattr(collect_products, 'COLLECTION_QUEUE_SIZE', 1)
+        page = FalabellaPage()
+        page._storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        with open('./tests/mocks/html/falabella-category.html') as file:
+            html = file.read()
+        categories = [
+            PageCategory(page.PAGE_NAME, name, f'https://www.fake.com/{name}', name)
+            for name in ('tables', 'chairs', 'beds')
+        ]
+        requested = []
+
+        def fetch_url(url: str) -> str:
+            requested.append(url)
+            return html
+
+        page.get_latest_categories = lambda: categories
+        page.fetch_url = fetch_url
+        page.get_snapshot_date = lambda: date(2021, 4, 19)
+        parse_category_products = page.parse_category_products
+
+        def die_on_beds(category, html):
+            if category.category_id == 'beds':
+                raise MemoryError('Out of memory')
+            return parse_category_products(category, html)
+
+        page.parse_category_products = die_on_beds
+        with pytest.raises(MemoryError):
+            page.store_products()
+        assert not os.path.exists(page.storage.get_filename(PRODUCTS, date(2021, 4, 19)))
+
+        page.parse_category_products = parse_category_products
+        requested.clear()
+        filename = page.store_products()
+        assert {url.rsplit('/', 1)[1].split('?')[0] for url in requested} == {'beds'}
+        assert page.run_summary.counters['resumed_categories'] == 2
+        assert page.run_summary.counters['products'] == 3 * 5 * 48
+        assert not os.listdir(f'{tmp_path}/JOURNALS_STORAGE_PATH/')
+        with open(filename) as file:
+            resumed = file.read()
+
+        os.remove(filename)
+        filename = page.store_products()  # Run that doesn't die
+        with open(filename) as file:
+            assert sorted(file.read().splitlines()) == sorted(resumed.splitlines())
+
+
+class FakeResponse:
+
+    def __init__(self, status_code: int, text: str) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+
+
+class FakeSession:
+    """Session answering every url with its scripted status codes, and the
+    last one once they are used up.
+    """
+
+    timeout = 15
+
+    def __init__(self, statuses: Dict[str, List[int]],
+                 delays: Optional[List[float]] = None) -> None:
+        self.statuses = statuses
+        self.delays = delays or []
+        self.requests: List[str] = []
+        self.timeouts: List[float] = []
+
+    def get(self, url: str, headers: dict = None, timeout: float = None) -> FakeResponse:
+        self.requests.append(url)
+        self.timeouts.append(timeout)
+        statuses = self.statuses[url]
+        status_code = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+        return FakeResponse(status_code, f'<html>{url}</html>')
+
+
+class TestRetries:
+    """Category page retries and circuit breaker unit tests.
+    """
+
+    @pytest.fixture
+    def page(self, monkeypatch) -> FalabellaPage:
+        monkeypatch.setattr(fetch, 'HTTP_CACHE_ENABLED', False)
+        monkeypatch.setattr(fetch, 'RATE_LIMIT_ENABLED', False)
+        monkeypatch.setattr(fetch, 'HEDGING_ENABLED', False)
+        page = FalabellaPage()
+        page._retry_policy = RetryPolicy(max_attempts=3, backoff=0, statuses=[503])
+        page._circuit_breakers = CircuitBreakers(failures=4, reset_timeout=60)
+        return page
+
+    def test_request_outcomes(self, page) -> None:
+        """Validate that failed requests are retried only when worth it, and
+        not sent at all once the host circuit is open.
+        """
+        page._session = FakeSession({
+            'https://www.fake.com/retried': [503, 200],
+            'https://www.fake.com/missing': [404],
+            'https://www.fake.com/down': [503],
+        })
+        assert page.fetch_url('https://www.fake.com/retried') is not None
+        assert page.fetch_url('https://www.fake.com/missing') is None
+        assert page.fetch_url('https://www.fake.com/down') is None
+        assert page.fetch_url('https://www.fake.com/down') is None
+        assert page.fetch_url('https://www.fake.com/retried') is None
+        assert page._session.requests == [
+            'https://www.fake.com/retried', 'https://www.fake.com/retried',
+            'https://www.fake.com/missing',
+        ] + ['https://www.fake.com/down'] * 4  # 3 attempts and a 4th failure opens it
+        assert page.pop_requests_outcome(['https://www.fake.com/missing']) == 'failed'
+        assert page.pop_requests_outcome([
+            'https://www.fake.com/retried', 'https://www.fake.com/down'
+        ]) == 'short_circuited'
+        assert page.run_summary.counters['retries'] == 4
+
+    def test_retries_are_metered(self, page, monkeypatch) -> None:
+        """Validate that retries wait for a token of the host rate.
+        """
+        monkeypatch.setattr(fetch, 'RATE_LIMIT_ENABLED', True)
+        page._session = FakeSession({'https://www.fake.com/retried': [503, 200]})
+        bucket = page.rate_limiter.get('www.fake.com').bucket
+        bucket.set_rate(5)
+        bucket.tokens = 0
+        start = time.perf_counter()
+        assert page.fetch_url('https://www.fake.com/retried') is not None
+        assert time.perf_counter() - start >= 0.15  # A token every 0.2s
+        assert page.run_summary.counters['retries'] == 1
+
+    def test_category_outcomes(self, page) -> None:
+        """Validate that the outcome of every category is recorded in the run
+        summary, including the categories dropped from the snapshot.
+        """
+        categories = [
+            PageCategory(page.PAGE_NAME, 'tables', 'https://www.fake.com/tables', 'tables'),
+            PageCategory(page.PAGE_NAME, 'chairs', 'https://www.fake.com/chairs', 'chairs'),
+            PageCategory(page.PAGE_NAME, 'beds', 'https://www.down.com/beds', 'beds'),
+        ]
+        page._session = FakeSession({
+            'https://www.fake.com/tables': [200],
+            'https://www.fake.com/chairs': [503, 200],
+            'https://www.down.com/beds': [503],
+        })
+        page.get_latest_categories = lambda: categories
+        page.parse_category_products = lambda category, html: [category.category_id]
+        assert sorted(page.furnitures_products) == ['chairs', 'tables']
+        assert {
+            category_id: record['outcome']
+            for category_id, record in page.run_summary.to_dict()['categories'].items()
+        } == {'tables': 'ok', 'chairs': 'retried', 'beds': 'failed'}
+        assert page.run_summary.counters['failed_categories'] == 1
+
+
+class TestHedging:
+    """Latency based timeouts and hedged requests unit tests.
+    """
+
+    @pytest.fixture
+    def page(self, monkeypatch) -> FalabellaPage:
+        monkeypatch.setattr(fetch, 'HTTP_CACHE_ENABLED', False)
+        monkeypatch.setattr(fetch, 'RATE_LIMIT_ENABLED', True)
+        page = FalabellaPage()
+        page._retry_policy = RetryPolicy(max_attempts=1, statuses=[503])
+        tracker = page.latencies.get('www.fake.com')
+        for _ in range(100):
+            tracker.record(0.01)
+        return page
+
+    def test_adaptive_timeout(self, page) -> None:
+        """Validate that requests wait according to their host latencies.
+        """
+        page._session = FakeSession({'https://www.fake.com/fast': [200]})
+        page.fetch_url('https://www.fake.com/fast')
+        assert page._session.timeouts == [ADAPTIVE_TIMEOUT_MIN]  # Far above the p99
+
+    def test_slow_requests_are_hedged(self, page) -> None:
+        """Validate that a request pending after the p95 latency is hedged
+        and the first response is taken, within the hedge budget.
+        """
+        url = 'https://www.fake.com/slow'
+        page._session = FakeSession({url: [200]}, delays=[1.0, 0.0])
+        page._hedge_budget = HedgeBudget(max_ratio=0.5)
+        page.hedge_budget.requests = 10
+        start = time.perf_counter()
+        assert page.fetch_url(url) == f'<html>{url}</html>'
+        assert time.perf_counter() - start < 0.5
+        assert page.run_summary.counters['hedged_requests'] == 1
+        assert page.run_summary.counters['hedges_won'] == 1
+
+        page._hedge_budget = HedgeBudget(max_ratio=0.0)
+        page._session.delays = [0.2]
+        page.fetch_url(url)
+        assert page.run_summary.counters['hedged_requests'] == 1
+        assert page.rate_limiter.get('www.fake.com').in_flight == 0
+
+    def test_hedges_follow_host_limits(self, page) -> None:
+        """Validate that no request is hedged while its host is at its
+        concurrency limit or out of tokens.
+        """
+        url = 'https://www.fake.com/slow'
+        page._session = FakeSession({url: [200]}, delays=[0.2, 0.2])
+        page._hedge_budget = HedgeBudget(max_ratio=1.0)
+        page.hedge_budget.requests = 10
+        limiter = page.rate_limiter.get('www.fake.com')
+        limiter.in_flight = limiter.limit
+        page.fetch_url(url)
+        limiter.in_flight = 0
+        limiter.bucket.tokens = 0
+        limiter.bucket.rate = 0.001
+        page.fetch_url(url)
+        assert 'hedged_requests' not in page.run_summary.counters
+        assert page._session.requests == [url, url]
+
+    def test_failed_hedge_doesnt_win(self, page) -> None:
+        """Validate that a fast response worth retrying doesn't beat a
+        slower successful one.
+        """
+        url = 'https://www.fake.com/slow'
+        page._session = FakeSession({url: [200, 503]}, delays=[0.3, 0.0])
+        page._hedge_budget = HedgeBudget(max_ratio=1.0)
+        page.hedge_budget.requests = 10
+        assert page.send_request(url, None)[1] == 200
+        assert page.run_summary.counters['hedged_requests'] == 1
+        assert 'hedges_won' not in page.run_summary.counters
+        page.close_hedge_executor()
+        assert page._hedge_executor is None
@@ -0,0 +1,422 @@
+"""
+Network layer tests.
+"""
+
+# Python
+import threading
+import time
+from typing import Dict, Tuple
+
+# Pytest
+import pytest
+
+# App
+from network import (
+    AsyncFetchEngine,
+    BrowserPool,
+    CircuitBreaker,
+    HTTPCache,
+    HedgeBudget,
+    HostLimiter,
+    LatencyTracker,
+    PageSession,
+    RateLimiter,
+    RetryPolicy,
+    TokenBucket
+)
+from network import latency, ratelimit
+from pages import BaseSeleniumUtils, FalabellaPage
+from .mocks.server import serve
+
+
+class TestAsyncFetchEngine:
+    """Concurrent fetch engine unit tests.
+    """
+
+    def test_results_keep_urls_order(self) -> None:
+        """Validate that results are returned in the same order as the urls.
+        """
+        urls = [f'https://www.fake.com/{i}' for i in range(20)]
+        engine = AsyncFetchEngine(
+            fetch=lambda url: url.upper(), max_concurrency=5, max_per_host=5
+        )
+        assert engine.fetch_all(urls) == [url.upper() for url in urls]
+
+    def test_concurrency_limits(self) -> None:
+        """Validate that global and per host limits are never exceeded.
+        """
+        lock = threading.Lock()
+        in_flight = {'total': 0, 'max_total': 0, 'hosts': {}, 'max_host': 0}
+
+        def fetch(url: str) -> str:
+            host = AsyncFetchEngine.get_host(url)
+            with lock:
+                in_flight['total'] += 1
+                in_flight['hosts'][host] = in_flight['hosts'].get(host, 0) + 1
+                in_flight['max_total'] = max(in_flight['max_total'], in_flight['total'])
+                in_flight['max_host'] = max(in_flight['max_host'], in_flight['hosts'][host])
+            time.sleep(0.01)
+            with lock:
+                in_flight['total'] -= 1
+                in_flight['hosts'][host] -= 1
+            return url
+
+        urls = [f'https://{host}.com/{i}' for host in ('a', 'b', 'c') for i in range(10)]
+        engine = AsyncFetchEngine(fetch=fetch, max_concurrency=4, max_per_host=2)
+        engine.fetch_all(urls)
+        assert 1 < in_flight['max_total'] <= 4
+        assert in_flight['max_host'] <= 2
+
+
+    def test_stream_applies_backpressure(self) -> None:
+        """Validate that a slow consumer stops new jobs from starting.
+        """
+        engine = AsyncFetchEngine(fetch=lambda url: url, max_concurrency=4, max_per_host=4)
+        started = []
+
+        async def job(item: int) -> int:
+            started.append(item)
+            return await engine.fetch(str(item))
+
+        consumed = 0
+        for result in engine.stream(range(50), job, max_pending=3):
+            consumed += 1
+            time.sleep(0.005)
+            assert len(started) <= consumed + 2 * 3
+        assert consumed == 50
+
+    def test_stream_raises_job_errors(self) -> None:
+        """Validate that errors raised by a job reach the consumer.
+        """
+        engine = AsyncFetchEngine(fetch=lambda url: url, max_concurrency=2, max_per_host=2)
+
+        async def job(item: int) -> int:
+            if item == 3:
+                raise ValueError('Broken job')
+            return item
+
+        with pytest.raises(ValueError):
+            list(engine.stream(range(10), job, max_pending=2))
+
+
+class FakeClock:
+    """Clock that only moves when told to.
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRateLimiter:
+    """Adaptive per host rate limits unit tests.
+    """
+
+    def test_token_bucket(self) -> None:
+        """Validate that a burst is sent at once and the rest at the rate.
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=2, clock=clock)
+        assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, pytest.approx(0.1),
+                                                          pytest.approx(0.2)]
+        clock.now = 1.0
+        assert bucket.reserve() == 0.0
+
+    def test_additive_increase_multiplicative_decrease(self, monkeypatch) -> None:
+        """Validate that healthy windows grow the limits by a step, and a
+        throttling response cuts them in half once per round trip.
+        """
+        monkeypatch.setattr(ratelimit, 'RATE_LIMIT_WINDOW', 5)
+        clock = FakeClock()
+        limiter = HostLimiter('www.fake.com', clock)
+        limit, rate = limiter.limit, limiter.rate
+        for _ in range(5):
+            clock.now += 0.1
+            limiter.record(0.1, ratelimit.OK)
+        assert limiter.limit == limit + 1
+        assert limiter.rate == rate + ratelimit.RATE_LIMIT_RATE_STEP
+
+        clock.now += 0.1
+        limiter.record(0.05, ratelimit.get_outcome(429))
+        assert limiter.limit == (limit + 1) // 2
+        assert limiter.rate == (rate + ratelimit.RATE_LIMIT_RATE_STEP) / 2
+        clock.now += 0.01
+        limiter.record(0.5, ratelimit.get_outcome(503))  # Sent before the cut
+        assert limiter.limit == (limit + 1) // 2
+
+        for _ in range(5):
+            clock.now += 0.1
+            limiter.record(ratelimit.RATE_LIMIT_LATENCY_TARGET * 2, ratelimit.OK)
+        assert limiter.limit == (limit + 1) // 4  # Slow window
+        assert [entry['concurrency'] for entry in limiter.history] == [
+            limit, limit + 1, (limit + 1) // 2
+        ]
+
+    def test_engine_follows_host_limits(self) -> None:
+        """Validate that requests against a host never exceed its adaptive
+        concurrency.
+        """
+        lock = threading.Lock()
+        in_flight = {'current': 0, 'max': 0}
+        rate_limiter = RateLimiter()
+        rate_limiter.get('www.fake.com').limit = 3
+
+        def fetch(url: str) -> str:
+            with lock:
+                in_flight['current'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            time.sleep(0.01)
+            with lock:
+                in_flight['current'] -= 1
+            return url
+
+        urls = [f'https://www.fake.com/{i}' for i in range(20)]
+        engine = AsyncFetchEngine(
+            fetch=fetch, max_concurrency=10, max_per_host=10, rate_limiter=rate_limiter
+        )
+        assert engine.fetch_all(urls) == urls
+        assert in_flight['max'] == 3
+
+    def test_engine_waits_for_slots_of_other_threads(self) -> None:
+        """Validate that a slot taken outside the engine, like by a hedged
+        request, counts against the host limit and wakes the engine up when
+        released.
+        """
+        rate_limiter = RateLimiter()
+        limiter = rate_limiter.get('www.fake.com')
+        limiter.limit = 1
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        threading.Timer(0.2, limiter.release).start()
+        engine = AsyncFetchEngine(
+            fetch=lambda url: url, max_concurrency=2, max_per_host=2, rate_limiter=rate_limiter
+        )
+        start = time.perf_counter()
+        assert engine.fetch_all(['https://www.fake.com/1']) == ['https://www.fake.com/1']
+        assert time.perf_counter() - start >= 0.2
+        assert limiter.in_flight == 0
+        assert limiter.listeners == []
+
+
+class TestRetries:
+    """Retry policy and circuit breaker unit tests.
+    """
+
+    def test_backoff(self) -> None:
+        """Validate that the backoff doubles up to its maximum, and jitter
+        keeps it below that.
+        """
+        policy = RetryPolicy(backoff=0.5, max_backoff=1.5, jitter=False, statuses=[503])
+        assert [policy.get_delay(attempt) for attempt in (1, 2, 3)] == [0.5, 1.0, 1.5]
+        policy.jitter = True
+        assert all(0 <= policy.get_delay(2) <= 1.0 for _ in range(20))
+        assert policy.should_retry(None) and policy.should_retry(503)
+        assert not policy.should_retry(404)
+
+    def test_circuit_breaker(self) -> None:
+        """Validate that the circuit opens after failures in a row, and lets
+        a single trial request through after the reset timeout.
+        """
+        clock = FakeClock()
+        breaker = CircuitBreaker(failures=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        clock.now = 10
+        assert breaker.allow()
+        assert not breaker.allow()  # Trial in flight
+        breaker.record_failure()
+        clock.now = 15
+        assert not breaker.allow()
+
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.allow() and breaker.allow()
+
+
+class TestLatencies:
+    """Latency percentiles and hedge budget unit tests.
+    """
+
+    def test_percentiles_and_timeout(self, monkeypatch) -> None:
+        """Validate that percentiles need enough samples, and timeouts follow
+        the p99 latency within their bounds.
+        """
+        tracker = LatencyTracker(size=100, min_samples=10)
+        assert tracker.get_percentile(95) is None
+        assert tracker.get_timeout(15) == 15
+        for milliseconds in range(10, 1010, 10):
+            tracker.record(milliseconds / 1000)
+        assert tracker.get_percentile(50) == 0.5
+        assert tracker.get_percentile(95) == 0.95
+        monkeypatch.setattr(latency, 'ADAPTIVE_TIMEOUT_MULTIPLIER', 3)
+        monkeypatch.setattr(latency, 'ADAPTIVE_TIMEOUT_MIN', 1)
+        monkeypatch.setattr(latency, 'ADAPTIVE_TIMEOUT_MAX', 2)
+        assert tracker.get_timeout(15) == 2
+        tracker.record(0.1)  # The oldest latency is dropped
+        assert tracker.get_percentile(0) == 0.02
+
+    def test_hedge_budget(self) -> None:
+        """Validate that hedged requests are capped to a share of requests.
+        """
+        budget = HedgeBudget(max_ratio=0.1)
+        assert not budget.try_hedge()
+        for _ in range(20):
+            budget.add_request()
+        assert [budget.try_hedge() for _ in range(3)] == [True, True, False]
+
+
+class TestPageSession:
+    """Pooled HTTP session unit tests.
+    """
+
+    def test_connections_are_reused(self) -> None:
+        """Validate that keep-alive connections are reused between requests.
+        """
+        with serve(lambda path, headers: (200, path, {})) as url:
+            session = PageSession(pool_size=2)
+            for i in range(5):
+                assert session.get(f'{url}/{i}').text == f'/{i}'
+            session.close()
+        assert session.stats.requests == 5
+        assert session.stats.new_connections == 1
+        assert session.stats.reused_connections == 4
+
+    def test_connections_are_closed_without_keep_alive(self) -> None:
+        """Validate that every request opens a connection without keep-alive.
+        """
+        with serve(lambda path, headers: (200, path, {})) as url:
+            session = PageSession(keep_alive=False)
+            for i in range(3):
+                session.get(f'{url}/{i}')
+            session.close()
+        assert session.stats.new_connections == 3
+        assert session.stats.reused_connections == 0
+
+
+class TestHTTPCache:
+    """Persistent HTTP cache unit tests.
+    """
+
+    @staticmethod
+    def handle_with_etag(path: str, headers: Dict[str, str]) -> Tuple[int, str, Dict[str, str]]:
+        """Respond with 304 when the client already has the current version.
+        """
+        etag = '"v1"'
+        if headers.get('If-None-Match') == etag:
+            return 304, '', {'ETag': etag}
+        return 200, f'content of {path}', {'ETag': etag}
+
+    def test_cached_page_is_revalidated(self, tmp_path) -> None:
+        """Validate that unchanged pages are served from the cache.
+        """
+        page = FalabellaPage()
+        page._http_cache = HTTPCache(str(tmp_path), max_size=1024)
+        with serve(self.handle_with_etag) as url:
+            assert page.fetch_url(f'{url}/tables') == 'content of /tables'
+            assert page.fetch_url(f'{url}/tables') == 'content of /tables'
+        assert page.run_summary.counters['cache_misses'] == 1
+        assert page.run_summary.counters['cache_revalidations'] == 1
+        assert page.run_summary.counters['cache_hits'] == 1
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path) -> None:
+        """Validate that the cache size is kept under its maximum.
+        """
+        cache = HTTPCache(str(tmp_path), max_size=30)  # Fits two bodies
+        with serve(self.handle_with_etag) as url:
+            for path in ('/a', '/b'):
+                cache.store(url + path, PageSession().get(url + path))
+                time.sleep(0.01)
+            cache.get(url + '/a')
+            time.sleep(0.01)
+            cache.store(url + '/c', PageSession().get(url + '/c'))
+            assert cache.size <= 30
+            assert cache.get(url + '/a') is not None
+            assert cache.get(url + '/b') is None
+            assert cache.get(url + '/c') is not None
+
+
+class FakeDriver:
+    """Browser that only records the urls it loads.
+    """
+
+    def __init__(self) -> None:
+        self.urls = []
+        self.quitted = False
+
+    def get(self, url: str) -> None:
+        self.urls.append(url)
+
+    def quit(self) -> None:
+        self.quitted = True
+
+
+class FakeSeleniumUtils(BaseSeleniumUtils):
+
+    def get_page_url(self) -> str:
+        return 'https://www.fake.com/'
+
+
+class TestBrowserPool:
+    """Browser pool unit tests.
+    """
+
+    def test_browsers_are_reused_and_quit(self) -> None:
+        """Validate that a single browser is started for consecutive users,
+        and that it's quit when the pool is closed.
+        """
+        drivers = []
+        pool = BrowserPool(size=1, create_driver=lambda: drivers.append(FakeDriver()) or drivers[-1])
+        for _ in range(3):
+            with FakeSeleniumUtils(pool) as selenium_utils:
+                assert selenium_utils.driver is drivers[0]
+        assert drivers[0].urls == ['https://www.fake.com/'] * 3
+        assert (pool.stats.startups, pool.stats.reuses, pool.stats.navigations) == (1, 2, 3)
+        pool.close()
+        assert drivers[0].quitted
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_failed_browsers_are_discarded(self) -> None:
+        """Validate that a browser that failed while in use is quit and
+        replaced by a new one.
+        """
+        pool = BrowserPool(size=1, create_driver=FakeDriver)
+        with pytest.raises(ValueError):
+            with pool.browser() as driver:
+                raise ValueError()
+        assert driver.quitted
+        with pool.browser() as other:
+            assert other is not driver
+        assert pool.stats.startups == 2
+
+    def test_users_wait_for_a_browser(self) -> None:
+        """Validate that no more browsers than the pool size are started.
+        """
+        pool = BrowserPool(size=2, create_driver=FakeDriver)
+        in_use, max_in_use = [0], [0]
+        lock = threading.Lock()
+
+        def use_browser() -> None:
+            with pool.browser():
+                with lock:
+                    in_use[0] += 1
+                    max_in_use[0] = max(max_in_use[0], in_use[0])
+                time.sleep(0.01)
+                with lock:
+                    in_use[0] -= 1
+
+        threads = [threading.Thread(target=use_browser) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert max_in_use[0] == 2
+        assert pool.stats.startups == 2
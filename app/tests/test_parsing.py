@@ -0,0 +1,122 @@
+"""
+HTML parsing tests.
+"""
+
+# Python
+from typing import List
+
+# Pytest
+import pytest
+
+# App
+from models import PageCategory
+from pages import FalabellaPage, SodimacPage
+from parsing import PARSER_BACKENDS, get_parser_backend
+
+
+def get_saved_page(page) -> str:
+    """Read the saved category page of a web page.
+
+    Parameters
+    ----------
+    page : BasePage
+        Page to read the saved category page from.
+
+    Return
+    ------
+    str : HTML content.
+    """
+    with open(f'./tests/mocks/html/{page.get_page_name().lower()}-category.html') as file:
+        return file.read()
+
+
+def extract_products(page, backend: str, parse_only: bool) -> List[tuple]:
+    """Parse the saved category page of a page with the given backend.
+
+    Parameters
+    ----------
+    page : BasePage
+        Page to parse the saved category page from.
+
+    backend : str
+        Name of the parser backend.
+
+    parse_only : bool
+        Whether to build only the products elements.
+
+    Return
+    ------
+    List[tuple] : Values of every product found.
+    """
+    page.soup = get_parser_backend(backend).parse(
+        get_saved_page(page), page.PRODUCTS_LOOKUP if parse_only else None
+    )
+    plan = page.get_product_extraction_plan()
+    return [
+        tuple(sorted(plan.extract(product).items()))
+        for product in page.get_products_in_page()
+    ]
+
+
+class TestParserBackends:
+    """Parser backends unit tests.
+    """
+
+    @pytest.fixture(params=[FalabellaPage, SodimacPage])
+    def page(self, request):
+        return request.param()
+
+    @pytest.mark.parametrize('backend', list(PARSER_BACKENDS))
+    @pytest.mark.parametrize('parse_only', [True, False])
+    def test_backends_find_same_products(self, page, backend, parse_only) -> None:
+        """Validate that every backend extracts the same products.
+        """
+        if backend != 'html.parser':
+            pytest.importorskip('selectolax' if backend == 'selectolax' else backend)
+        expected = extract_products(page, 'html.parser', parse_only=False)
+        assert len(expected) == 48
+        assert extract_products(page, backend, parse_only) == expected
+
+    def test_extracted_fields(self, page) -> None:
+        """Validate the values extracted from the first product.
+        """
+        page.soup = get_parser_backend('html.parser').parse(get_saved_page(page))
+        fields = page.get_product_extraction_plan().extract(page.get_products_in_page()[0])
+        assert fields['product_url'].endswith(f"/{fields['product_id']}")
+        assert fields['product_name'].endswith(' 0')
+        assert isinstance(fields['product_price'], float)
+
+    @pytest.mark.parametrize('backend', list(PARSER_BACKENDS))
+    def test_multi_class_fields(self, backend) -> None:
+        """Validate that fields looked up by a single class are found in
+        elements with more classes, like find() does.
+        """
+        if backend != 'html.parser':
+            pytest.importorskip('selectolax' if backend == 'selectolax' else backend)
+        page = FalabellaPage()
+        html = get_saved_page(page)\
+            .replace('class="pod-subTitle"', 'class="copy2 pod-subTitle"')\
+            .replace('class="price-0"', 'class="price-0 prices-main"')
+        page.soup = get_parser_backend(backend).parse(html)
+        plan = page.get_product_extraction_plan()
+        products = [plan.extract(product) for product in page.get_products_in_page()]
+        assert len(products) == 48
+        assert products[0]['product_name'].endswith(' 0')
+        assert isinstance(products[0]['product_price'], float)
+
+    def test_malformed_products_are_skipped(self, page) -> None:
+        """Validate that products without some field are skipped.
+        """
+        name_field = page.get_product_extraction_plan().fields[1]
+        name_class = name_field.path[0][1]['class']
+        html = get_saved_page(page).replace(f'"{name_class}"', '"renamed"', 1)
+        category = PageCategory(page.get_page_name(), 'saved', 'www.fake.com', 'saved')
+        products = list(page.parse_category_products(category, html))
+        assert len(products) == 47
+        assert page.run_summary.counters['malformed_products'] == 1
+
+    def test_unknown_backend(self) -> None:
+        """Validate that unknown backends are reported.
+        """
+        with pytest.raises(ValueError):
+            get_parser_backend('fake')
@@ -0,0 +1,83 @@
+"""
+Tasks scheduler tests.
+"""
+
+# Python
+import time
+
+# Pytest
+import pytest
+
+# App
+from utils.scheduler import Scheduler
+
+
+class FakePage:
+    """Page whose tasks take as long as they are told to.
+    """
+
+    def __init__(self) -> None:
+        self.finished = []
+
+    def first(self, seconds: float = 0.0) -> None:
+        time.sleep(seconds)
+        self.finished.append('first')
+
+    def second(self, seconds: float = 0.0) -> None:
+        if self.finished != ['first']:  # Must run on the same page object
+            raise RuntimeError('First task state not found')
+        time.sleep(seconds)
+
+
+class SlowFirstPage(FakePage):
+
+    def first(self, seconds: float = 0.0) -> None:
+        super().first(0.6)
+
+
+class SlowSecondPage(FakePage):
+
+    def second(self, seconds: float = 0.0) -> None:
+        super().second(0.6)
+
+
+REGISTRY = {'slowfirst': SlowFirstPage, 'slowsecond': SlowSecondPage, 'fake': FakePage}
+
+
+class TestScheduler:
+    """Pages tasks scheduler unit tests.
+    """
+
+    def test_chains_dont_wait_each_other(self) -> None:
+        """Validate that a page starts its next task without waiting for the
+        current task of other pages, keeping its page object between tasks.
+        """
+        scheduler = Scheduler(REGISTRY)
+        times = scheduler.run(['slowfirst', 'slowsecond'], [('first', {}), ('second', {})])
+        for page_times in times.values():
+            assert page_times.started
+            assert [(method, succeeded) for method, _, succeeded in page_times.tasks] == [
+                ('first', True), ('second', True)
+            ]
+        assert scheduler.wall_time < 1.1  # Both slow tasks would add up with barriers
+        assert scheduler.get_critical_path().total >= 0.6
+
+    def test_workers_limit(self) -> None:
+        """Validate that pages wait for a free worker.
+        """
+        scheduler = Scheduler(REGISTRY, workers=1)
+        scheduler.run(['slowfirst', 'slowsecond'], [('first', {}), ('second', {})])
+        assert scheduler.wall_time >= 1.2
+
+    def test_failed_task(self) -> None:
+        """Validate that a failed task is reported and the chain goes on.
+        """
+        scheduler = Scheduler(REGISTRY)
+        times = scheduler.run(['fake'], [('second', {}), ('first', {'seconds': 0})])
+        assert [(method, succeeded) for method, _, succeeded in times['fake'].tasks] == [
+            ('second', False), ('first', True)
+        ]
+
+    def test_unknown_page(self) -> None:
+        with pytest.raises(KeyError):
+            Scheduler(REGISTRY).run(['fake', 'unknown'], [('first', {})])
@@ -0,0 +1,545 @@
+"""
+Snapshots storage tests.
+"""
+
+# Python
+from datetime import date, timedelta
+import os
+import random
+import threading
+from typing import Dict, List
+
+# NumPy
+import numpy as np
+
+# Pytest
+import pytest
+
+# App
+from models import PageProduct
+from pages import FalabellaPage, SodimacPage
+from settings import get_csv_reader, get_csv_writer
+from storage import (
+    CATEGORIES,
+    PRODUCTS,
+    ColumnarHistory,
+    CSVStorage,
+    DeltaSnapshots,
+    PriceIndex,
+    PriceRollups,
+    ProductsJournal,
+    SnapshotManifest,
+    SQLiteStorage,
+    diff_products,
+    write_diff
+)
+
+FIRST_DAY = date(2021, 4, 19)
+
+
+def get_day_rows(day: int) -> List[List[str]]:
+    """Build the product rows of a fake day, where every day a product is
+    added, one is removed and one changes its price.
+
+    Parameters
+    ----------
+    day : int
+        Number of days since the first day.
+
+    Return
+    ------
+    List[List[str]] : Product rows.
+    """
+    rows = []
+    for number in range(day, day + 20):
+        price = 100.0 + number + (day if number % 7 == 0 else 0)
+        rows.append([
+            'Falabella', f'cat{number % 3}', f'prd{number}', f'www.fake.com/{number}',
+            f'product {number}', str(price)
+        ])
+    return rows
+
+
+def write_full_snapshot(path: str, day: date, rows: List[List[str]]) -> None:
+    """Store the rows of a day as store_products does.
+    """
+    with open(f'{path}falabella-products-{day}.csv', mode='w') as file:
+        writer = get_csv_writer(file)
+        writer.writerow(['STORE_NAME', 'CATEGORY_ID', 'PRODUCT_ID', 'PRODUCT_NAME', 'PRODUCT_PRICE'])
+        writer.writerows(rows)
+
+
+class TestDeltaSnapshots:
+    """Delta snapshots storage unit tests.
+    """
+
+    @pytest.fixture
+    def stored_days(self, tmp_path) -> Dict[date, List[List[str]]]:
+        """Store 10 days as a daily run would, compacting the previous day.
+        """
+        snapshots = DeltaSnapshots('falabella-products', f'{tmp_path}/', base_interval=4)
+        days = {}
+        for number in range(10):
+            day = FIRST_DAY + timedelta(days=number)
+            days[day] = get_day_rows(number)
+            write_full_snapshot(f'{tmp_path}/', day, days[day])
+            snapshots.manifests[False].record(day)
+            snapshots.compact(day)
+        return days
+
+    def test_bases_and_deltas(self, stored_days, tmp_path) -> None:
+        """Validate that only base days and the latest day are kept in full.
+        """
+        snapshots = DeltaSnapshots('falabella-products', f'{tmp_path}/', base_interval=4)
+        full_dates = [(day - FIRST_DAY).days for day in snapshots.get_dates()]
+        delta_dates = [(day - FIRST_DAY).days for day in snapshots.get_dates(delta=True)]
+        assert full_dates == [0, 4, 8, 9]
+        assert delta_dates == [1, 2, 3, 5, 6, 7]
+        delta_size = os.path.getsize(snapshots.get_filename(FIRST_DAY + timedelta(days=1), delta=True))
+        full_size = os.path.getsize(snapshots.get_filename(FIRST_DAY))
+        assert delta_size < full_size / 2
+
+    def test_rebuild_every_day(self, stored_days, tmp_path) -> None:
+        """Validate that every stored day is rebuilt with all its products.
+        """
+        snapshots = DeltaSnapshots('falabella-products', f'{tmp_path}/', base_interval=4)
+        for day, rows in stored_days.items():
+            products = [
+                [product.page_name, product.category_id, product.product_id,
+                 product.product_url, product.product_name, product.product_price]
+                for product in snapshots.read(day)
+            ]
+            assert sorted(products) == sorted(rows)
+        assert snapshots.rebuild(FIRST_DAY - timedelta(days=1)) is None
+
+
+class TestSnapshotManifest:
+    """Snapshots manifest unit tests.
+    """
+
+    @pytest.fixture
+    def manifest(self, tmp_path) -> SnapshotManifest:
+        """Store every other day of 30 days before the manifest exists.
+        """
+        for number in range(0, 30, 2):
+            day = FIRST_DAY + timedelta(days=number)
+            write_full_snapshot(f'{tmp_path}/', day, get_day_rows(number))
+        return SnapshotManifest(f'{tmp_path}/', 'falabella-products', 'Falabella', PRODUCTS)
+
+    def test_bootstrap_and_lookups(self, manifest) -> None:
+        """Validate that a missing manifest is built from the stored files and
+        that snapshots are found on and before any date.
+        """
+        assert manifest.get_dates() == [FIRST_DAY + timedelta(days=number) for number in range(0, 30, 2)]
+        latest = manifest.get_latest()
+        assert latest.day == FIRST_DAY + timedelta(days=28)
+        assert (latest.page, latest.kind, latest.rows) == ('Falabella', PRODUCTS, 20)
+        assert manifest.get_as_of(FIRST_DAY + timedelta(days=5)).day == FIRST_DAY + timedelta(days=4)
+        assert manifest.get_as_of(FIRST_DAY + timedelta(days=4)).day == FIRST_DAY + timedelta(days=4)
+        assert manifest.get_as_of(FIRST_DAY - timedelta(days=1)) is None
+        assert manifest.get(FIRST_DAY + timedelta(days=1)) is None
+        assert manifest.verify(FIRST_DAY)
+
+    def test_record_and_discard(self, manifest, tmp_path, monkeypatch) -> None:
+        """Validate that stored snapshots are found without listing the
+        directory again, and that removed ones are dropped.
+        """
+        manifest.get_dates()
+        monkeypatch.setattr(os, 'listdir', lambda path: pytest.fail('Directory listed'))
+        day = FIRST_DAY + timedelta(days=30)
+        write_full_snapshot(f'{tmp_path}/', day, get_day_rows(1))
+        manifest.record(day)
+        other = SnapshotManifest(f'{tmp_path}/', 'falabella-products', 'Falabella', PRODUCTS)
+        assert other.get_latest().day == day
+        os.remove(manifest.get_filename(day))
+        assert other.get_latest().day == FIRST_DAY + timedelta(days=28)
+        assert day not in manifest.get_dates()
+        with open(manifest.get_filename(FIRST_DAY), mode='a') as file:
+            file.write('Falabella,cat0,prd0,www.fake.com/0,product 0,1.0\n')
+        assert not manifest.verify(FIRST_DAY)
+
+
+class TestAsOfReader:
+    """Pages as-of-date snapshots reader unit tests.
+    """
+
+    @pytest.fixture(params=['csv', 'delta', 'sqlite'])
+    def page(self, request, tmp_path) -> FalabellaPage:
+        """Store every other day of 20 days in every storage backend.
+        """
+        page = FalabellaPage()
+        if request.param == 'sqlite':
+            page._storage = SQLiteStorage(page, database=f'{tmp_path}/burner.sqlite3')
+        else:
+            page._storage = CSVStorage(
+                page, products_path=f'{tmp_path}/', categories_path=f'{tmp_path}/',
+                mode='delta' if request.param == 'delta' else 'full'
+            )
+            page._storage.deltas.base_interval = 6
+        for number in range(0, 20, 2):
+            page._storage.write_products(FIRST_DAY + timedelta(days=number), [
+                PageProduct.from_csv_row(row) for row in get_day_rows(number)
+            ])
+        return page
+
+    def test_products_as_of(self, page) -> None:
+        """Validate that the products of the latest day on or before every
+        date are read.
+        """
+        for number in range(-1, 22):
+            products = list(page.get_products_as_of(FIRST_DAY + timedelta(days=number)))
+            if number < 0:
+                assert products == []
+                continue
+            stored = min(number - number % 2, 18)
+            assert sorted(product.product_id for product in products) == sorted(
+                row[2] for row in get_day_rows(stored)
+            )
+        assert page.get_categories_as_of(FIRST_DAY) == []
+
+    def test_thousands_of_snapshots(self, tmp_path, monkeypatch) -> None:
+        """Validate that snapshots are found among thousands of days without
+        listing the directory once the manifest is built.
+        """
+        page = FalabellaPage()
+        page._storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        for number in range(0, 3000, 2):
+            write_full_snapshot(f'{tmp_path}/', FIRST_DAY + timedelta(days=number), [
+                ['Falabella', 'cat0', f'prd{number}', f'www.fake.com/{number}', 'product', '1.0']
+            ])
+        assert page.storage.get_latest_date(PRODUCTS) == FIRST_DAY + timedelta(days=2998)
+        monkeypatch.setattr(os, 'listdir', lambda path: pytest.fail('Directory listed'))
+        for number in range(1, 3000, 97):
+            products = list(page.get_products_as_of(FIRST_DAY + timedelta(days=number)))
+            assert [product.product_id for product in products] == [f'prd{number - number % 2}']
+
+
+class TestPriceIndex:
+    """Products price index unit tests.
+    """
+
+    @staticmethod
+    def get_products(day: int) -> List[PageProduct]:
+        """Build the products of a fake day, where the price of every third
+        product doesn't change, the others drop a bit more every day and the
+        last one is only listed on even days.
+        """
+        return [
+            PageProduct(
+                'Falabella', 'cat0', f'prd{number}', f'www.fake.com/{number}',
+                f'product {number}', 100.0 - day * (number % 3)
+            )
+            for number in range(10)
+            if number < 9 or day % 2 == 0
+        ]
+
+    @pytest.fixture
+    def index(self, tmp_path) -> PriceIndex:
+        page = FalabellaPage()
+        storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        for day in range(5):
+            storage.write_products(FIRST_DAY + timedelta(days=day), self.get_products(day))
+        index = PriceIndex(page, storage, database=f'{tmp_path}/prices.sqlite3')
+        assert index.update() == 5
+        return index
+
+    def test_incremental_update(self, index, monkeypatch) -> None:
+        """Validate that only the days stored after the latest indexed one are
+        read, and that every day is read again if an older one is stored.
+        """
+        read_days = []
+        read_products = index.storage.read_products
+        monkeypatch.setattr(
+            index.storage, 'read_products', lambda day: read_days.append(day) or read_products(day)
+        )
+        assert index.update() == 0
+        for day in (5, 6):
+            index.storage.write_products(FIRST_DAY + timedelta(days=day), self.get_products(day))
+        assert index.update() == 2
+        assert read_days == [FIRST_DAY + timedelta(days=5), FIRST_DAY + timedelta(days=6)]
+        index.storage.write_products(FIRST_DAY - timedelta(days=1), self.get_products(0))
+        assert index.update() == 8
+        assert index.get_indexed_dates()[0] == FIRST_DAY - timedelta(days=1)
+
+    def test_same_day_rerun(self, index) -> None:
+        """Validate that the latest day stored again is indexed again from
+        the prices of the day before, and an older one from scratch.
+        """
+        last_day = FIRST_DAY + timedelta(days=4)
+        index.storage.write_products(last_day, self.get_products(1))
+        assert index.update(last_day) == 1
+        assert index.get_series('prd2')[-2:] == [
+            (FIRST_DAY + timedelta(days=3), 94.0), (last_day, 98.0)
+        ]
+        assert index.get_series('prd9')[-1] == (FIRST_DAY + timedelta(days=3), None)
+        assert index.get_series('prd0') == [(FIRST_DAY, 100.0)]
+        index.storage.write_products(last_day + timedelta(days=1), self.get_products(5))
+        assert index.update() == 1
+        assert index.get_series('prd2')[-1] == (last_day + timedelta(days=1), 90.0)
+        assert index.update(FIRST_DAY) == 6
+        assert index.get_indexed_dates()[-1] == last_day + timedelta(days=1)
+
+    def test_queries(self, index) -> None:
+        """Validate the series, changes and drops of the indexed prices.
+        """
+        assert index.get_series('prd0') == [(FIRST_DAY, 100.0)]
+        assert index.get_series('prd2') == [
+            (FIRST_DAY + timedelta(days=day), 100.0 - day * 2) for day in range(5)
+        ]
+        assert index.get_series('prd9') == [
+            (FIRST_DAY + timedelta(days=day), None if day % 2 else 100.0) for day in range(5)
+        ]
+        changes = index.get_changes(FIRST_DAY + timedelta(days=1), FIRST_DAY + timedelta(days=3))
+        assert sorted(
+            (change.product_id, change.previous_price, change.price) for change in changes
+        ) == [
+            (f'prd{number}', 100.0 - number % 3, 100.0 - 3 * (number % 3))
+            for number in range(10) if number % 3
+        ]
+        drops = index.get_top_drops(limit=3, days=3)
+        assert sorted((drop.product_id, drop.ratio) for drop in drops) == [
+            ('prd2', -6 / 98), ('prd5', -6 / 98), ('prd8', -6 / 98)
+        ]
+        assert index.get_top_drops(days=7) == []
+        assert 'prd9' not in index.get_prices_as_of(FIRST_DAY + timedelta(days=1))
+
+
+class TestColumnarHistory:
+    """Columnar products history unit tests.
+    """
+
+    def test_restored_day_is_compacted_again(self, tmp_path) -> None:
+        """Validate that the latest compacted day stored again has the
+        prices of its new snapshot.
+        """
+        page = FalabellaPage()
+        storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        filename = f'{tmp_path}/columnar/falabella-products.npz'
+        for day in range(2):
+            storage.write_products(FIRST_DAY + timedelta(days=day), TestPriceIndex.get_products(day))
+        ColumnarHistory.compact(storage, filename)
+        storage.write_products(FIRST_DAY + timedelta(days=1), TestPriceIndex.get_products(5))
+        history = ColumnarHistory.compact(storage, filename)
+        assert history.get_dates() == [FIRST_DAY, FIRST_DAY + timedelta(days=1)]
+        assert len(history) == 10 + 9  # The last product is listed on even days
+        _, prices = ColumnarHistory.load(filename).get_series('prd2')
+        assert list(prices) == [100.0, 90.0]
+
+    def test_compact_and_stats(self, tmp_path, monkeypatch) -> None:
+        """Validate that only new days are compacted and that the aggregates
+        match the stored prices.
+        """
+        page = FalabellaPage()
+        storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        filename = f'{tmp_path}/columnar/falabella-products.npz'
+        for day in range(6):
+            storage.write_products(FIRST_DAY + timedelta(days=day), TestPriceIndex.get_products(day))
+        history = ColumnarHistory.compact(storage, filename)
+        assert len(history) == 6 * 9 + 3
+        read_products = storage.read_products
+        monkeypatch.setattr(storage, 'read_products', lambda day: (
+            # The latest compacted day is compacted again
+            pytest.fail('Compacted day read') if day < FIRST_DAY + timedelta(days=5)
+            else read_products(day)
+        ))
+        storage.write_products(FIRST_DAY + timedelta(days=6), TestPriceIndex.get_products(6))
+        history = ColumnarHistory.compact(storage, filename)
+        assert history.get_dates() == [FIRST_DAY + timedelta(days=day) for day in range(7)]
+
+        stats = ColumnarHistory.load(filename).get_product_stats(
+            FIRST_DAY + timedelta(days=2), FIRST_DAY + timedelta(days=5)
+        )
+        stats = {
+            product_id: tuple(stats[name][index] for name in ('count', 'min', 'max', 'mean', 'change'))
+            for index, product_id in enumerate(stats['product_id'])
+        }
+        for number in range(10):
+            prices = [
+                100.0 - day * (number % 3) for day in range(2, 6) if number < 9 or day % 2 == 0
+            ]
+            expected = (
+                len(prices), min(prices), max(prices), sum(prices) / len(prices),
+                (prices[-1] - prices[0]) / prices[0] * 100
+            )
+            assert np.allclose(stats[f'prd{number}'], expected)
+        dates, prices = history.get_series('prd9')
+        assert list(dates.astype(str)) == [str(FIRST_DAY + timedelta(days=day)) for day in (0, 2, 4, 6)]
+        assert list(prices) == [100.0] * 4
+
+
+class TestDiffProducts:
+    """Products snapshots diff unit tests.
+    """
+
+    @staticmethod
+    def get_products(seed: int) -> List[PageProduct]:
+        """Build a shuffled random snapshot, with some products listed in two
+        categories.
+        """
+        generator = random.Random(seed)
+        products = []
+        for number in generator.sample(range(200), 120):
+            price = float(generator.choice([100, 200]))
+            for category in range(1 + (number % 10 == 0)):
+                products.append(PageProduct(
+                    'Falabella', f'cat{category}', f'prd{number}', f'www.fake.com/{number}',
+                    f'product {number}', price
+                ))
+        generator.shuffle(products)
+        return products
+
+    @pytest.mark.parametrize('chunk_size', [7, 1000])
+    def test_diff_matches_dicts(self, chunk_size, tmp_path) -> None:
+        """Validate that the changes found with sorted runs of any size are
+        the ones found comparing both snapshots in memory.
+        """
+        previous, current = self.get_products(1), self.get_products(2)
+        previous_prices = {product.product_id: product.product_price for product in previous}
+        current_prices = {product.product_id: product.product_price for product in current}
+        expected = sorted(
+            [('REMOVED', product_id) for product_id in previous_prices.keys() - current_prices.keys()]
+            + [('ADDED', product_id) for product_id in current_prices.keys() - previous_prices.keys()]
+            + [
+                ('PRICE_CHANGED', product_id) for product_id in previous_prices.keys() & current_prices.keys()
+                if previous_prices[product_id] != current_prices[product_id]
+            ], key=lambda change: change[1]
+        )
+        changes = list(diff_products(previous, current, chunk_size=chunk_size))
+        assert [(change, (row or previous_row)[2]) for change, previous_row, row in changes] == expected
+
+        filename = f'{tmp_path}/diffs/falabella-products-diff.csv'
+        assert write_diff(filename, iter(changes)) == len(expected)
+        with open(filename) as file:
+            rows = list(get_csv_reader(file))
+        assert rows[0][0] == 'CHANGE' and len(rows) == len(expected) + 1
+        price_changed = next(row for row in rows if row[0] == 'PRICE_CHANGED')
+        assert float(price_changed[6]) == previous_prices[price_changed[3]]
+        assert float(price_changed[7]) == current_prices[price_changed[3]]
+
+
+class TestPriceRollups:
+    """Daily and weekly price rollups unit tests.
+    """
+
+    @pytest.fixture
+    def rollups(self, tmp_path) -> PriceRollups:
+        """Store 10 days, from Monday 2021-04-19 to Wednesday 2021-04-28.
+        """
+        page = FalabellaPage()
+        storage = CSVStorage(page, products_path=f'{tmp_path}/')
+        for day in range(10):
+            storage.write_products(FIRST_DAY + timedelta(days=day), TestPriceIndex.get_products(day))
+        return PriceRollups(page, storage, database=f'{tmp_path}/rollups.sqlite3')
+
+    def test_update_and_rebuild(self, rollups) -> None:
+        """Validate the daily and weekly aggregates, updated day by day or
+        rebuilt in worker processes.
+        """
+        assert rollups.update() == 10
+        assert rollups.update() == 0
+        assert rollups.update(FIRST_DAY) == 1  # Stored again, not counted twice
+        updated = {
+            (period, scope): rollups.get_rollups(period, scope)
+            for period in ('daily', 'weekly') for scope in ('category', 'product')
+        }
+        assert rollups.rebuild(workers=2) == 10
+        for (period, scope), rows in updated.items():
+            assert rollups.get_rollups(period, scope) == rows
+
+        weeks = rollups.get_rollups('weekly', 'product', key='prd2')
+        assert weeks == [
+            ('prd2', '2021-W16', 88.0, 100.0, 94.0, 7),
+            ('prd2', '2021-W17', 82.0, 86.0, 84.0, 3),
+        ]
+        days = rollups.get_rollups('daily', 'category', start='2021-04-27', end='2021-04-28')
+        assert [(row[1], row[2], row[3], row[5]) for row in days] == [
+            ('2021-04-27', 84.0, 100.0, 10), ('2021-04-28', 82.0, 100.0, 9),
+        ]
+        with pytest.raises(ValueError):
+            rollups.get_rollups('monthly', 'product')
+
+    def test_rebuild_with_warm_page(self, rollups) -> None:
+        """Validate that a page holding objects that can't be sent to other
+        processes, like the session of a page that already collected, can
+        rebuild its rollups.
+        """
+        rollups.storage.page.lock = threading.Lock()
+        assert rollups.rebuild(workers=2) == 10
+        assert len(rollups.get_rollups('daily', 'category')) == 10
+
+
+class TestSQLiteStorage:
+    """SQLite storage backend unit tests.
+    """
+
+    @pytest.fixture(params=[FalabellaPage, SodimacPage])
+    def page(self, request):
+        return request.param()
+
+    def test_import_csv_history(self, page, tmp_path) -> None:
+        """Validate that every CSV snapshot is imported with all its rows.
+        """
+        source = CSVStorage(page)
+        storage = SQLiteStorage(page, database=f'{tmp_path}/burner.sqlite3', batch_size=7)
+        imported = storage.import_history(source)
+        assert imported == len(source.get_dates(PRODUCTS)) + len(source.get_dates(CATEGORIES))
+        for kind in (PRODUCTS, CATEGORIES):
+            assert storage.get_dates(kind) == source.get_dates(kind)
+        for day in source.get_dates(PRODUCTS):
+            expected = [
+                (product.category_id, product.product_id, float(product.product_price))
+                for product in source.read_products(day)
+            ]
+            assert [
+                (product.category_id, product.product_id, product.product_price)
+                for product in storage.read_products(day)
+            ] == expected
+        latest = source.get_latest_date(CATEGORIES)
+        assert [category.category_url for category in storage.read_categories(latest)] == [
+            category.category_url for category in source.read_categories(latest)
+        ]
+
+    def test_failed_write_keeps_snapshot(self, page, tmp_path) -> None:
+        """Validate that a snapshot that fails to be written halfway
+        leaves the previous snapshot of the day untouched.
+        """
+        storage = SQLiteStorage(page, database=f'{tmp_path}/burner.sqlite3', batch_size=3)
+        products = [PageProduct.from_csv_row(row) for row in get_day_rows(0)]
+        storage.write_products(FIRST_DAY, products)
+
+        def failing_products():
+            yield from products[:7]
+            raise RuntimeError('Collection failed')
+
+        with pytest.raises(RuntimeError):
+            storage.write_products(FIRST_DAY, failing_products())
+        assert [product.product_id for product in storage.read_products(FIRST_DAY)] == [
+            product.product_id for product in products
+        ]
+
+
+class TestProductsJournal:
+    """Products journal unit tests.
+    """
+
+    def test_partial_category_is_dropped(self, tmp_path) -> None:
+        """Validate that a reopened journal keeps the complete categories
+        only, and appends after them.
+        """
+        products = [PageProduct.from_csv_row(row) for row in get_day_rows(0)]
+        filename = f'{tmp_path}/falabella-products-{FIRST_DAY}.journal'
+        journal = ProductsJournal(filename)
+        assert journal.open() == {}
+        journal.append_category('cat0', products[:5], 'fingerprint0')
+        journal.append_category('cat1', products[5:10])
+        with open(filename, 'a') as file:  # A run died while appending cat2
+            file.write('P,Falabella,cat2,prd10,www.fake.com/10,product 10,110.0\r\nP,Falab')
+
+        journal = ProductsJournal(filename)
+        assert journal.open() == {'cat0': 'fingerprint0', 'cat1': ''}
+        journal.append_category('cat2', products[10:])
+        assert [product.product_id for product in journal.read_products()] == [
+            product.product_id for product in products
+        ]
+        journal.remove()
+        assert not os.path.exists(filename)
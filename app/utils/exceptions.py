@@ -8,3 +8,10 @@ class CommandExecutionException(Exception):
     format errors.
     """
     pass
+
+
+class MalformedProductException(Exception):
+    """Thrown when a product in a page lacks some of its fields or they can't
+    be read.
+    """
+    pass
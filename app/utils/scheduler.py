@@ -0,0 +1,198 @@
+"""
+Pages tasks scheduling.
+
+The tasks of a page are a chain, run in order, but the chains of different
+pages don't wait for each other: every page gets a long-lived worker process
+that creates its page object once and runs the whole chain with it, keeping
+its HTTP session and caches warm between tasks. At most a given amount of
+workers run at once, and a new page starts as soon as a worker finishes.
+"""
+
+# Python
+from multiprocessing import Process, Queue
+from queue import Empty
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+# App
+from settings import SCHEDULER_WORKERS
+
+# Worker messages
+READY = 'ready'
+TASK = 'task'
+DONE = 'done'
+
+# Page method name and keyword arguments
+Task = Tuple[str, Dict[str, Any]]
+
+
+def run_page_worker(page_name: str, page_class: type, tasks: List[Task],
+                    results: Queue) -> None:
+    """Create a page object and run its tasks in order, in a worker process.
+
+    Parameters
+    ----------
+    page_name : str
+        Name the page was scheduled with.
+
+    page_class : type
+        Page class to create the page object from.
+
+    tasks : List[Task]
+        Page methods to run in order, with their keyword arguments.
+
+    results : Queue
+        Queue where the worker reports its startup and every finished task.
+    """
+    try:
+        page = page_class()
+    except Exception:
+        traceback.print_exc()
+        results.put((DONE, page_name, None, False))
+        return
+    results.put((READY, page_name, None, True))
+    for method, kwargs in tasks:
+        start = time.perf_counter()
+        try:
+            getattr(page, method)(**kwargs)
+            succeeded = True
+        except Exception:  # Keep running the chain, like separate processes would
+            traceback.print_exc()
+            succeeded = False
+        results.put((TASK, page_name, (method, time.perf_counter() - start), succeeded))
+    results.put((DONE, page_name, None, True))
+
+
+class PageTimes:
+    """Wall times of the worker of a page.
+    """
+
+    def __init__(self, page_name: str) -> None:
+        self.page_name = page_name
+        self.startup = 0.0
+        self.tasks: List[Tuple[str, float, bool]] = []
+        self.started = False
+
+    @property
+    def total(self) -> float:
+        return self.startup + sum(seconds for _, seconds, _ in self.tasks)
+
+    def __str__(self) -> str:
+        tasks = ', '.join(
+            f'{method} {seconds:.2f}s' + ('' if succeeded else ' (failed)')
+            for method, seconds, succeeded in self.tasks
+        )
+        startup = f'{self.startup:.2f}s' if self.started else 'failed'
+        return f'worker startup {startup}, {tasks or "no tasks"}, total {self.total:.2f}s'
+
+
+class Scheduler:
+    """Run the tasks chain of every page on a pool of page workers.
+    """
+
+    def __init__(self, registry: Dict[str, type], workers: Optional[int] = None) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        registry : Dict[str, type]
+            Page class of every page name.
+
+        workers : int
+            Pages running their chain at once, SCHEDULER_WORKERS by default,
+            every page at once if None.
+        """
+        self.registry = registry
+        self.workers = SCHEDULER_WORKERS if workers is None else workers
+        self.times: Dict[str, PageTimes] = {}
+        self.wall_time = 0.0
+
+    def run(self, pages: List[str], tasks: List[Task]) -> Dict[str, PageTimes]:
+        """Run the tasks chain of every page, starting the next page as soon
+        as a worker finishes.
+
+        Parameters
+        ----------
+        pages : List[str]
+            Names of the pages, in the order they are started.
+
+        tasks : List[Task]
+            Page methods every page runs in order, with their keyword
+            arguments.
+
+        Return
+        ------
+        Dict[str, PageTimes] : Wall times of every page.
+        """
+        for page_name in pages:
+            if page_name not in self.registry:
+                raise KeyError(f'Page {page_name} not found, options: {list(self.registry)}')
+        start = time.perf_counter()
+        results = Queue()
+        pending = list(pages)
+        running: Dict[str, Tuple[Process, float]] = {}
+        self.times = {page_name: PageTimes(page_name) for page_name in pages}
+        workers = self.workers or len(pages)
+        while pending or running:
+            while pending and len(running) < workers:
+                page_name = pending.pop(0)
+                process = Process(
+                    target=run_page_worker,
+                    args=(page_name, self.registry[page_name], tasks, results)
+                )
+                running[page_name] = (process, time.perf_counter())
+                process.start()
+            self.receive(results, running)
+        self.wall_time = time.perf_counter() - start
+        return self.times
+
+    def receive(self, results: Queue, running: Dict[str, Tuple[Process, float]]) -> None:
+        """Wait for a message of a worker, joining it if it finished.
+        """
+        try:
+            message, page_name, value, succeeded = results.get(timeout=1)
+        except Empty:  # Check that no worker died silently
+            for page_name, (process, _) in list(running.items()):
+                if not process.is_alive():
+                    process.join()
+                    running.pop(page_name)
+            return
+        if page_name not in running:  # Already found dead
+            return
+        process, started = running[page_name]
+        times = self.times[page_name]
+        if message == READY:
+            times.startup = time.perf_counter() - started
+            times.started = True
+        elif message == TASK:
+            times.tasks.append(value + (succeeded, ))
+        else:
+            process.join()
+            running.pop(page_name)
+
+    def get_critical_path(self) -> Optional[PageTimes]:
+        """Get the page whose chain took the longest, which bounds the wall
+        time of the run however many workers there are.
+        """
+        return max(self.times.values(), key=lambda times: times.total, default=None)
+
+    def print(self) -> None:
+        """Display the wall times of every page and task in terminal.
+        """
+        for page_name, times in self.times.items():
+            print(f' * Scheduler {page_name}: {times}')
+        task_times: Dict[str, float] = {}
+        for times in self.times.values():
+            for method, seconds, _ in times.tasks:
+                task_times[method] = task_times.get(method, 0.0) + seconds
+        for method, seconds in task_times.items():
+            print(f' * Scheduler task {method}: {seconds:.2f}s across pages')
+        startup = sum(times.startup for times in self.times.values())
+        print(f' * Scheduler workers startup: {startup:.2f}s across pages')
+        critical_path = self.get_critical_path()
+        if critical_path is not None:
+            print(
+                f' * Scheduler critical path: {critical_path.page_name} '
+                f'{critical_path.total:.2f}s of {self.wall_time:.2f}s wall time'
+            )
@@ -0,0 +1,118 @@
+"""
+Run summaries.
+"""
+
+# Python
+from collections import Counter
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict
+
+
+class RunSummary:
+    """Thread safe collection of counters and per category records gathered
+    while a page task runs, to be displayed when it finishes.
+    """
+
+    def __init__(self, page_name: str) -> None:
+        """Constructor.
+
+        Parameters
+        ----------
+        page_name : str
+            Name of the page the run belongs to.
+        """
+        self.page_name = page_name
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.categories: Dict[str, Dict[str, Any]] = {}
+        self.metrics: Dict[str, Any] = {}
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        """Add an amount to a counter.
+
+        Parameters
+        ----------
+        counter : str
+            Name of the counter.
+
+        amount : int
+            Amount to add.
+        """
+        with self.lock:
+            self.counters[counter] += amount
+
+    def set_category(self, category_id: str, **values) -> None:
+        """Set values in the record of a category.
+
+        Parameters
+        ----------
+        category_id : str
+            ID of the category the values belong to.
+
+        values
+            Values to set in the category record.
+        """
+        with self.lock:
+            self.categories.setdefault(category_id, {}).update(values)
+
+    def set_metric(self, metric: str, value: Any) -> None:
+        """Set a run metric, E.G. the rate limits history.
+
+        Parameters
+        ----------
+        metric : str
+            Name of the metric.
+
+        value : Any
+            JSON serializable value of the metric.
+        """
+        with self.lock:
+            self.metrics[metric] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the whole summary as plain data.
+
+        Return
+        ------
+        Dict[str, Any] : Counters, category records and metrics.
+        """
+        with self.lock:
+            return {
+                'page_name': self.page_name,
+                'counters': dict(self.counters),
+                'categories': {
+                    category_id: dict(record)
+                    for category_id, record in self.categories.items()
+                },
+                'metrics': dict(self.metrics),
+            }
+
+    def save(self, filename: str) -> None:
+        """Store the whole summary in a JSON file, replacing it atomically.
+
+        Parameters
+        ----------
+        filename : str
+            JSON file path.
+        """
+        path = os.path.dirname(filename) or '.'
+        os.makedirs(path, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.to_dict(), file, indent=1)
+        os.replace(temporary, filename)
+
+    def print(self) -> None:
+        """Display counters and category records in terminal.
+        """
+        summary = self.to_dict()
+        counters = ', '.join(
+            f'{counter}: {value}' for counter, value in sorted(summary['counters'].items())
+        )
+        print(f' * Summary {self.page_name}: {counters}')
+        for category_id, record in summary['categories'].items():
+            values = ', '.join(f'{key}: {value}' for key, value in record.items())
+            print(f'   - {category_id}: {values}')